@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Generator
+from typing import Callable, Generator
 
 from fastapi import Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.security import SecurityError, decode_jwt
 from app.db.session import SessionLocal
+from app.services.query_budget_service import QueryBudgetExceeded, new_budget, record_exhausted, register_endpoint
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -22,6 +24,36 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def budgeted_db(endpoint: str, *, read_only: bool = False) -> Callable[[], Generator[Session, None, None]]:
+    # heavy read endpoints run under an execution budget: SQLite interrupts the statement once it is spent.
+    # Read-only ones also read one snapshot for the whole request and end with a rollback instead of a commit
+    register_endpoint(endpoint)
+
+    def dependency() -> Generator[Session, None, None]:
+        budget = new_budget(endpoint)
+        info: dict = {"query_budget": budget} if budget else {}
+        snapshot = read_only and settings.READ_ONLY_SESSIONS_ENABLED
+        if snapshot:
+            info["read_only"] = True
+        db = SessionLocal(info=info)
+        try:
+            yield db
+            if snapshot:
+                db.rollback()
+            else:
+                db.commit()
+        except Exception as exc:
+            db.rollback()
+            if budget is not None and budget.exhausted:
+                record_exhausted(budget)
+                raise QueryBudgetExceeded(budget) from exc
+            raise
+        finally:
+            db.close()
+
+    return dependency
+
+
 @dataclass(frozen=True)
 class AuthCtx:
     user_id: int
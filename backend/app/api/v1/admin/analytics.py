@@ -1,33 +1,47 @@
 from __future__ import annotations
 
+import json
 import time
+from functools import partial
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import and_, case, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import String, and_, case, cast, func, select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_roles
+from app.api.deps import budgeted_db, get_db, require_roles
+from app.core.config import settings
+from app.core.executors import pooled_route
+from app.db.session import begin_read_snapshot, run_parallel_reads
 from app.models import (
     AppPageEvent,
-    Appointment,
-    Client,
     ClientAnalytics,
     CommunicationCampaign,
     CommunicationRecipient,
     ControlTowerPolicy,
     ControlTowerProfile,
+    Employee,
     Feedback,
-    Operation,
+    ForecastModel,
     OutcomeCatalogItem,
     ProcessKPIConfig,
     Product,
     ReferralProgramGenerationRule,
     ReferralProgramSetting,
-    StockBalance,
     TrafficChannel,
 )
 from app.schemas.analytics import (
+    AnalyticsBatchItem,
+    AnalyticsBatchRequest,
+    AnalyticsBatchResponse,
+    AnalyticsBatchTab,
+    AnalyticsCacheStatsResponse,
     AppVisitsAnalyticsResponse,
+    BookingBreakdownItem,
+    BookingHeatmapCell,
+    BookingsAnalyticsResponse,
+    CohortCell,
+    CohortRow,
+    CohortsAnalyticsResponse,
     ControlTowerActionItem,
     ControlTowerAnalyticsResponse,
     ControlTowerBookingStats,
@@ -42,9 +56,13 @@ from app.schemas.analytics import (
     FinanceCategoryBreakdownItem,
     LevelsAnalyticsItem,
     LevelsAnalyticsResponse,
+    LevelsConfigRequest,
+    LevelsConfigResponse,
     MarketingAnalyticsResponse,
     MarketingAutomationStats,
     MarketingChannelStats,
+    MarketingForecastModel,
+    MarketingForecastModelPoint,
     MarketingForecastPoint,
     MarketingFunnelStage,
     MarketingSegment,
@@ -58,12 +76,61 @@ from app.schemas.analytics import (
     PromotionForecastGeneration,
     PromotionForecastRequest,
     PromotionForecastResponse,
+    PromotionScenarioItem,
+    PromotionSimulationInfo,
+    QueryBudgetItem,
+    QueryBudgetStatsResponse,
     RatingAnalyticsResponse,
+    RatingObjectItem,
+    RfmAnalyticsResponse,
     SeriesPoint,
     VerticalPresetResponse,
 )
+from app.services.analytics_cache_service import analytics_cache
+from app.services.analytics_loads_service import (
+    AnalyticsLoads,
+    get_level_bounds,
+    level_labels,
+    set_level_bounds,
+)
+from app.services.analytics_mirror_service import mirror_covers, mirror_query
+from app.services.app_visits_service import estimate_distinct, load_visit_days, merge_registers
+from app.services.booking_analytics_service import load_booking_cells
+from app.services.cohorts_service import (
+    CohortCellTotals,
+    load_cohort_cells,
+    month_label,
+)
+from app.services.control_tower_service import (
+    build_control_tower_metrics,
+    control_tower_reads,
+    get_snapshot,
+    is_snapshot_stale,
+    refresh_snapshot_detached,
+)
+from app.services.forecast_service import FORECAST_METRICS, evaluate_model
+from app.services.local_calendar_service import (
+    bucket_key,
+    bucket_key_expr,
+    month_first_key,
+    month_of_key,
+    salon_calendar,
+)
+from app.services.operation_rollups_service import OperationDayTotals
+from app.services.promotion_forecast_service import (
+    PromotionScenario,
+    fit_promotion_inputs,
+    simulate_promotion_grid,
+    simulation_max_cells,
+)
+from app.services.query_budget_service import budget_limits, budget_stats
+from app.services.rfm_service import recompute_client_scores, rfm_summary
+from app.services.security_service import write_audit
+
+router = APIRouter(prefix="/admin/analytics", tags=["admin.analytics"], route_class=pooled_route("reports"))
 
-router = APIRouter(prefix="/admin/analytics", tags=["admin.analytics"])
+FORECAST_HORIZON_DAYS = 28
+FORECAST_MAX_WINDOW_DAYS = 366
 
 
 def _range_bounds(date_from: int | None, date_to: int | None) -> tuple[int, int]:
@@ -73,21 +140,51 @@ def _range_bounds(date_from: int | None, date_to: int | None) -> tuple[int, int]
     return start_ts, end_ts
 
 
-def _age_bucket(birth_year: int | None) -> str:
-    if birth_year is None:
-        return "Не указан"
-    age = time.gmtime().tm_year - birth_year
-    if 18 <= age <= 24:
-        return "18-24"
-    if 25 <= age <= 34:
-        return "25-34"
-    if 35 <= age <= 44:
-        return "35-44"
-    if 45 <= age <= 54:
-        return "45-54"
-    if age >= 55:
-        return "55+"
-    return "Не указан"
+def _cache_window(date_from: int | None, date_to: int | None) -> tuple[int, int | None]:
+    # open-ended windows slide with the clock, so they are keyed by length; writes bump the salon
+    # version and the TTL bounds the drift of the window start
+    start_ts, end_ts = _range_bounds(date_from, date_to)
+    if date_to is None:
+        return (start_ts - end_ts if date_from is None else start_ts, None)
+    return start_ts, end_ts
+
+
+def _compare_window(start_ts: int, end_ts: int, compare: str | None) -> tuple[int, int] | None:
+    if compare is None:
+        return None
+    if compare == "previous":
+        return start_ts - (end_ts - start_ts) - 1, start_ts - 1
+    if end_ts - start_ts >= 365 * 86400:
+        raise HTTPException(status_code=400, detail="Сравнение с прошлым годом доступно для периода короче года")
+    return start_ts - 365 * 86400, end_ts - 365 * 86400
+
+
+def _compare_fields(compare_window: tuple[int, int] | None) -> dict[str, int | None]:
+    if compare_window is None:
+        return {}
+    return {"compare_from": compare_window[0], "compare_to": compare_window[1]}
+
+
+def _apply_compare(cards: list[MetricCard], previous: dict[str, float | int]) -> None:
+    for card in cards:
+        if card.code not in previous:
+            continue
+        card.previous_value = previous[card.code]
+        card.delta = round(card.value - card.previous_value, 2)
+        card.delta_percent = round(card.delta / abs(card.previous_value) * 100, 2) if card.previous_value else None
+
+
+def _age_bucket_expr(birth_year_col):
+    age = time.gmtime().tm_year - birth_year_col
+    return case(
+        (birth_year_col.is_(None), "Не указан"),
+        (age.between(18, 24), "18-24"),
+        (age.between(25, 34), "25-34"),
+        (age.between(35, 44), "35-44"),
+        (age.between(45, 54), "45-54"),
+        (age >= 55, "55+"),
+        else_="Не указан",
+    )
 
 
 def _percent(numerator: int, denominator: int) -> float:
@@ -160,157 +257,86 @@ def _vertical_presets() -> dict[str, VerticalPresetResponse]:
     }
 
 
-@router.get("/customers", response_model=CustomersAnalyticsResponse)
-def customers_analytics(
-    created_from: int | None = Query(default=None),
-    created_to: int | None = Query(default=None),
-    ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
-) -> CustomersAnalyticsResponse:
-    start_ts, end_ts = _range_bounds(created_from, created_to)
-
-    total_clients = db.execute(
-        select(func.count()).where(Client.salon_id == ctx.salon_id)
-    ).scalar_one()
-
-    buyers_q = (
-        select(func.count(func.distinct(Operation.client_id)))
-        .where(
-            and_(
-                Operation.salon_id == ctx.salon_id,
-                Operation.op_type == "purchase",
-                Operation.created_at >= start_ts,
-                Operation.created_at <= end_ts,
-            )
-        )
-    )
-    buyers_count = int(db.execute(buyers_q).scalar_one() or 0)
-
-    digitized_clients = int(
-        db.execute(
-            select(func.count()).where(and_(Client.salon_id == ctx.salon_id, Client.tg_id.is_not(None)))
-        ).scalar_one()
-        or 0
-    )
-
-    turnover = int(
-        db.execute(
-            select(func.coalesce(func.sum(Operation.amount_rub), 0)).where(
-                and_(
-                    Operation.salon_id == ctx.salon_id,
-                    Operation.created_at >= start_ts,
-                    Operation.created_at <= end_ts,
-                )
-            )
-        ).scalar_one()
-        or 0
-    )
-    income = int(
-        db.execute(
-            select(
-                func.coalesce(
-                    func.sum(Operation.amount_rub - Operation.discount_rub - Operation.referral_discount_rub), 0
-                )
-            ).where(
-                and_(
-                    Operation.salon_id == ctx.salon_id,
-                    Operation.created_at >= start_ts,
-                    Operation.created_at <= end_ts,
-                )
-            )
-        ).scalar_one()
-        or 0
-    )
-    discount = int(
-        db.execute(
-            select(func.coalesce(func.sum(Operation.discount_rub + Operation.referral_discount_rub), 0)).where(
-                and_(
-                    Operation.salon_id == ctx.salon_id,
-                    Operation.created_at >= start_ts,
-                    Operation.created_at <= end_ts,
-                )
-            )
-        ).scalar_one()
-        or 0
-    )
+def _customers_period_values(daily: list[OperationDayTotals], buyers_count: int) -> dict[str, float | int]:
+    turnover = sum(row.turnover_rub for row in daily)
+    discount = sum(row.discount_rub for row in daily)
+    income = turnover - discount
+    purchases_count = sum(row.operations_count for row in daily if row.op_type == "purchase")
+    return {
+        "buyers": buyers_count,
+        "avg_check": round(turnover / purchases_count, 2) if purchases_count else 0,
+        "turnover": turnover,
+        "income": income,
+        "discount": discount,
+        "purchases_count": purchases_count,
+        "refunds": sum(row.operations_count for row in daily if row.op_type == "refund"),
+        "avg_income": round(income / buyers_count, 2) if buyers_count else 0,
+    }
 
-    purchases_count = int(
-        db.execute(
-            select(func.count()).where(
-                and_(
-                    Operation.salon_id == ctx.salon_id,
-                    Operation.op_type == "purchase",
-                    Operation.created_at >= start_ts,
-                    Operation.created_at <= end_ts,
-                )
-            )
-        ).scalar_one()
-        or 0
-    )
-    avg_check = round(turnover / purchases_count, 2) if purchases_count else 0
 
-    balance_points = int(
-        db.execute(
-            select(func.coalesce(func.sum(Client.total_spent_rub / 100), 0)).where(Client.salon_id == ctx.salon_id)
-        ).scalar_one()
-        or 0
-    )
-    repeat_purchases = int(
-        db.execute(
-            select(func.count())
-            .select_from(select(Client.id).where(and_(Client.salon_id == ctx.salon_id, Client.visits_count >= 2)).subquery())
-        ).scalar_one()
-        or 0
-    )
-    refunds = int(
-        db.execute(
-            select(func.count()).where(
-                and_(
-                    Operation.salon_id == ctx.salon_id,
-                    Operation.op_type == "refund",
-                    Operation.created_at >= start_ts,
-                    Operation.created_at <= end_ts,
-                )
-            )
-        ).scalar_one()
-        or 0
+def _customers_analytics(
+    db: Session,
+    salon_id: int,
+    start_ts: int,
+    end_ts: int,
+    compare_window: tuple[int, int] | None = None,
+    loads: AnalyticsLoads | None = None,
+) -> CustomersAnalyticsResponse:
+    loads = loads or AnalyticsLoads(db, salon_id)
+    windows = [(start_ts, end_ts), *([compare_window] if compare_window else [])]
+    daily_by_window = loads.operation_daily_windows(windows)
+    buyers_by_window = loads.buyers_counts(windows)
+    period = _customers_period_values(daily_by_window[0], buyers_by_window[0])
+
+    client_groups = loads.clients()
+    total_clients = sum(row.clients for row in client_groups)
+    digitized_clients = sum(row.with_tg for row in client_groups)
+    balance_points = int(sum(row.points for row in client_groups))
+    repeat_purchases = sum(row.repeat for row in client_groups)
+
+    analytics_range = and_(
+        ClientAnalytics.salon_id == salon_id,
+        ClientAnalytics.created_at >= start_ts,
+        ClientAnalytics.created_at <= end_ts,
     )
-    avg_income = round(income / buyers_count, 2) if buyers_count else 0
-
-    analytics_rows = db.execute(
-        select(ClientAnalytics).where(
-            and_(
-                ClientAnalytics.salon_id == ctx.salon_id,
-                ClientAnalytics.created_at >= start_ts,
-                ClientAnalytics.created_at <= end_ts,
-            )
-        )
-    ).scalars().all()
+    gender_col = case(
+        (ClientAnalytics.gender.in_(["male", "female"]), ClientAnalytics.gender),
+        else_="unknown",
+    ).label("gender")
+    age_col = _age_bucket_expr(ClientAnalytics.birth_year).label("age_bucket")
 
     gender_map = {"male": 0, "female": 0, "unknown": 0}
     age_map = {"18-24": 0, "25-34": 0, "35-44": 0, "45-54": 0, "55+": 0, "Не указан": 0}
-    daily_new: dict[int, int] = {}
-
-    for row in analytics_rows:
-        gender_map[row.gender if row.gender in gender_map else "unknown"] += 1
-        age_map[_age_bucket(row.birth_year)] += 1
-        day = row.created_at - (row.created_at % 86400)
-        daily_new[day] = daily_new.get(day, 0) + 1
+    for gender, age_bucket, count in db.execute(
+        select(gender_col, age_col, func.count()).where(analytics_range).group_by(gender_col, age_col)
+    ):
+        gender_map[gender] += int(count)
+        age_map[age_bucket] += int(count)
+
+    calendar = salon_calendar(db, salon_id)
+    daily_new = {
+        calendar.day_start(int(day)): int(count)
+        for day, count in db.execute(
+            select(ClientAnalytics.day_key, func.count()).where(analytics_range).group_by(ClientAnalytics.day_key)
+        )
+    }
 
     cards = [
-        MetricCard(code="total_clients", title="Всего клиентов", value=int(total_clients)),
-        MetricCard(code="buyers", title="Покупателей", value=buyers_count),
+        MetricCard(code="total_clients", title="Всего клиентов", value=total_clients),
+        MetricCard(code="buyers", title="Покупателей", value=period["buyers"]),
         MetricCard(code="digitized", title="Оцифрованных клиентов", value=digitized_clients),
-        MetricCard(code="avg_check", title="Средний чек", value=avg_check),
-        MetricCard(code="turnover", title="Оборот", value=turnover),
-        MetricCard(code="income", title="Доход", value=income),
-        MetricCard(code="discount", title="Скидка", value=discount),
+        MetricCard(code="avg_check", title="Средний чек", value=period["avg_check"]),
+        MetricCard(code="turnover", title="Оборот", value=period["turnover"]),
+        MetricCard(code="income", title="Доход", value=period["income"]),
+        MetricCard(code="discount", title="Скидка", value=period["discount"]),
         MetricCard(code="points", title="Баллов у клиентов", value=balance_points),
-        MetricCard(code="purchases_count", title="Количество покупок", value=purchases_count),
+        MetricCard(code="purchases_count", title="Количество покупок", value=period["purchases_count"]),
         MetricCard(code="repeat_purchases", title="Повторные покупки", value=repeat_purchases),
-        MetricCard(code="refunds", title="Возвраты", value=refunds),
-        MetricCard(code="avg_income", title="Средний доход", value=avg_income),
+        MetricCard(code="refunds", title="Возвраты", value=period["refunds"]),
+        MetricCard(code="avg_income", title="Средний доход", value=period["avg_income"]),
     ]
+    if compare_window:
+        _apply_compare(cards, _customers_period_values(daily_by_window[1], buyers_by_window[1]))
 
     gender_distribution = [
         DistributionItem(label="Мужчины", value=gender_map["male"]),
@@ -325,91 +351,138 @@ def customers_analytics(
         gender_distribution=gender_distribution,
         age_distribution=age_distribution,
         new_clients_series=new_clients_series,
+        **_compare_fields(compare_window),
     )
 
 
-@router.get("/operations", response_model=OperationsAnalyticsResponse)
-def operations_analytics(
-    date_from: int | None = Query(default=None),
-    date_to: int | None = Query(default=None),
+@router.get("/customers", response_model=CustomersAnalyticsResponse)
+def customers_analytics(
+    created_from: int | None = Query(default=None),
+    created_to: int | None = Query(default=None),
+    compare: str | None = Query(default=None, pattern="^(previous|year_ago)$"),
     ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
-) -> OperationsAnalyticsResponse:
-    start_ts, end_ts = _range_bounds(date_from, date_to)
-    rows = db.execute(
-        select(Operation).where(
-            and_(
-                Operation.salon_id == ctx.salon_id,
-                Operation.created_at >= start_ts,
-                Operation.created_at <= end_ts,
-            )
-        )
-    ).scalars().all()
-
-    turnover = sum(x.amount_rub for x in rows)
-    income = sum(max(x.amount_rub - x.discount_rub - x.referral_discount_rub, 0) for x in rows)
-    discount = sum(x.discount_rub + x.referral_discount_rub for x in rows)
-    purchases = [x for x in rows if x.op_type == "purchase"]
-    orders = [x for x in rows if x.op_type == "order"]
-    refunds = [x for x in rows if x.op_type == "refund"]
-    avg_check = round(turnover / len(purchases), 2) if purchases else 0
+    db: Session = Depends(budgeted_db("customers", read_only=True)),
+) -> CustomersAnalyticsResponse:
+    start_ts, end_ts = _range_bounds(created_from, created_to)
+    compare_window = _compare_window(start_ts, end_ts, compare)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "customers",
+        (*_cache_window(created_from, created_to), compare),
+        lambda: _customers_analytics(db, ctx.salon_id, start_ts, end_ts, compare_window),
+    )
 
-    daily_counts: dict[int, int] = {}
-    for row in rows:
-        day = row.created_at - (row.created_at % 86400)
-        daily_counts[day] = daily_counts.get(day, 0) + 1
 
-    cards = [
+def _operations_cards(rows: list[OperationDayTotals]) -> list[MetricCard]:
+    turnover = sum(x.turnover_rub for x in rows)
+    income = sum(x.income_rub for x in rows)
+    discount = sum(x.discount_rub for x in rows)
+    purchases_count = sum(x.operations_count for x in rows if x.op_type == "purchase")
+    orders_count = sum(x.operations_count for x in rows if x.op_type == "order")
+    refunds_count = sum(x.operations_count for x in rows if x.op_type == "refund")
+    avg_check = round(turnover / purchases_count, 2) if purchases_count else 0
+    return [
         MetricCard(code="turnover", title="Оборот", value=turnover),
         MetricCard(code="income", title="Доход", value=income),
         MetricCard(code="discount", title="Скидка", value=discount),
         MetricCard(code="avg_check", title="Средний чек", value=avg_check),
-        MetricCard(code="operations_purchase", title="Операций покупок", value=len(purchases)),
-        MetricCard(code="cash_purchases", title="Покупки на кассе", value=len(purchases)),
-        MetricCard(code="orders", title="Заказы", value=len(orders)),
-        MetricCard(code="refunds", title="Возвраты", value=len(refunds)),
+        MetricCard(code="operations_purchase", title="Операций покупок", value=purchases_count),
+        MetricCard(code="cash_purchases", title="Покупки на кассе", value=purchases_count),
+        MetricCard(code="orders", title="Заказы", value=orders_count),
+        MetricCard(code="refunds", title="Возвраты", value=refunds_count),
     ]
 
+
+def _operations_analytics(
+    db: Session,
+    salon_id: int,
+    start_ts: int,
+    end_ts: int,
+    compare_window: tuple[int, int] | None = None,
+    loads: AnalyticsLoads | None = None,
+) -> OperationsAnalyticsResponse:
+    windows = [(start_ts, end_ts), *([compare_window] if compare_window else [])]
+    rows_by_window = (loads or AnalyticsLoads(db, salon_id)).operation_daily_windows(windows)
+    rows = rows_by_window[0]
+
+    daily_counts: dict[int, int] = {}
+    for row in rows:
+        daily_counts[row.day_ts] = daily_counts.get(row.day_ts, 0) + row.operations_count
+
+    cards = _operations_cards(rows)
+    if compare_window:
+        _apply_compare(cards, {card.code: card.value for card in _operations_cards(rows_by_window[1])})
+
     return OperationsAnalyticsResponse(
         cards=cards,
         operations_series=[SeriesPoint(ts=k, value=v) for k, v in sorted(daily_counts.items())],
+        **_compare_fields(compare_window),
     )
 
 
-@router.get("/finance", response_model=FinanceAnalyticsResponse)
-def finance_analytics(
+@router.get("/operations", response_model=OperationsAnalyticsResponse)
+def operations_analytics(
     date_from: int | None = Query(default=None),
     date_to: int | None = Query(default=None),
-    detailing: str = Query(default="day", pattern="^(day|week|month)$"),
+    compare: str | None = Query(default=None, pattern="^(previous|year_ago)$"),
     ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
-) -> FinanceAnalyticsResponse:
+    db: Session = Depends(budgeted_db("operations", read_only=True)),
+) -> OperationsAnalyticsResponse:
     start_ts, end_ts = _range_bounds(date_from, date_to)
-    rows = db.execute(
-        select(Operation).where(
-            and_(
-                Operation.salon_id == ctx.salon_id,
-                Operation.created_at >= start_ts,
-                Operation.created_at <= end_ts,
-            )
-        )
-    ).scalars().all()
+    compare_window = _compare_window(start_ts, end_ts, compare)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "operations",
+        (*_cache_window(date_from, date_to), compare),
+        lambda: _operations_analytics(db, ctx.salon_id, start_ts, end_ts, compare_window),
+    )
 
-    incomes = [row for row in rows if row.op_type in {"purchase", "order"}]
-    refunds = [row for row in rows if row.op_type == "refund"]
 
-    purchase_income = sum(row.amount_rub for row in incomes if row.op_type == "purchase")
-    order_income = sum(row.amount_rub for row in incomes if row.op_type == "order")
-    income_total = purchase_income + order_income
-    discount_total = sum(row.discount_rub + row.referral_discount_rub for row in rows)
-    refund_total = sum(row.amount_rub for row in refunds)
+def _finance_cards(rows: list[OperationDayTotals]) -> list[MetricCard]:
+    income_total = sum(row.turnover_rub for row in rows if row.op_type in {"purchase", "order"})
+    discount_total = sum(row.discount_rub for row in rows)
+    refund_total = sum(row.turnover_rub for row in rows if row.op_type == "refund")
     net_income = income_total - discount_total - refund_total
+    operations_count = sum(row.operations_count for row in rows)
+    return [
+        MetricCard(code="income_total", title="Доходы", value=income_total),
+        MetricCard(code="discount_total", title="Скидки", value=discount_total),
+        MetricCard(code="refund_total", title="Возвраты", value=refund_total),
+        MetricCard(code="net_income", title="Чистый доход", value=net_income),
+        MetricCard(code="operations_count", title="Операций", value=operations_count),
+        MetricCard(
+            code="avg_income_per_operation",
+            title="Средний доход на операцию",
+            value=round(net_income / operations_count, 2) if operations_count else 0,
+        ),
+    ]
+
+
+def _finance_analytics(
+    db: Session,
+    salon_id: int,
+    start_ts: int,
+    end_ts: int,
+    detailing: str,
+    compare_window: tuple[int, int] | None = None,
+    loads: AnalyticsLoads | None = None,
+) -> FinanceAnalyticsResponse:
+    windows = [(start_ts, end_ts), *([compare_window] if compare_window else [])]
+    rows_by_window = (loads or AnalyticsLoads(db, salon_id)).operation_daily_windows(windows)
+    rows = rows_by_window[0]
+
+    purchase_income = sum(row.turnover_rub for row in rows if row.op_type == "purchase")
+    order_income = sum(row.turnover_rub for row in rows if row.op_type == "order")
+    income_total = purchase_income + order_income
+    discount_total = sum(row.discount_rub for row in rows)
+    refund_total = sum(row.turnover_rub for row in rows if row.op_type == "refund")
 
-    bucket_seconds = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400}[detailing]
+    # rows are already per local day, only the calendar week or month has to be picked for each of them
+    calendar = salon_calendar(db, salon_id)
     bucket_map: dict[int, int] = {}
     for row in rows:
-        ts = row.created_at - (row.created_at % bucket_seconds)
-        signed_amount = row.amount_rub if row.op_type in {"purchase", "order"} else -row.amount_rub
+        ts = calendar.day_start(bucket_key(row.day_key, detailing))
+        signed_amount = row.turnover_rub if row.op_type in {"purchase", "order"} else -row.turnover_rub
         bucket_map[ts] = bucket_map.get(ts, 0) + signed_amount
 
     total_income_for_share = income_total or 1
@@ -446,87 +519,141 @@ def finance_analytics(
         ),
     ]
 
-    cards = [
-        MetricCard(code="income_total", title="Доходы", value=income_total),
-        MetricCard(code="discount_total", title="Скидки", value=discount_total),
-        MetricCard(code="refund_total", title="Возвраты", value=refund_total),
-        MetricCard(code="net_income", title="Чистый доход", value=net_income),
-        MetricCard(code="operations_count", title="Операций", value=len(rows)),
-        MetricCard(
-            code="avg_income_per_operation",
-            title="Средний доход на операцию",
-            value=round(net_income / len(rows), 2) if rows else 0,
-        ),
-    ]
+    cards = _finance_cards(rows)
+    if compare_window:
+        _apply_compare(cards, {card.code: card.value for card in _finance_cards(rows_by_window[1])})
 
     return FinanceAnalyticsResponse(
         cards=cards,
         cashflow_series=[SeriesPoint(ts=k, value=v) for k, v in sorted(bucket_map.items())],
         income_by_source=income_by_source,
         expenses_by_source=expenses_by_source,
+        **_compare_fields(compare_window),
     )
 
 
-@router.get("/ratings", response_model=RatingAnalyticsResponse)
-def ratings_analytics(
-    mode: str = Query(default="payments", pattern="^(payments|recommendations)$"),
+@router.get("/finance", response_model=FinanceAnalyticsResponse)
+def finance_analytics(
     date_from: int | None = Query(default=None),
     date_to: int | None = Query(default=None),
+    detailing: str = Query(default="day", pattern="^(day|week|month)$"),
+    compare: str | None = Query(default=None, pattern="^(previous|year_ago)$"),
     ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
-) -> RatingAnalyticsResponse:
+    db: Session = Depends(budgeted_db("finance", read_only=True)),
+) -> FinanceAnalyticsResponse:
     start_ts, end_ts = _range_bounds(date_from, date_to)
+    compare_window = _compare_window(start_ts, end_ts, compare)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "finance",
+        (*_cache_window(date_from, date_to), detailing, compare),
+        lambda: _finance_analytics(db, ctx.salon_id, start_ts, end_ts, detailing, compare_window),
+    )
+
+
+def _rating_summary(counts: dict[int | None, int]) -> tuple[float, int, list[DistributionItem]]:
+    distribution_map = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+    rated_total = 0
+    rated_sum = 0
+    for rating, count in sorted(counts.items(), key=lambda item: (item[0] is None, item[0] or 0)):
+        if rating is None:
+            continue
+        distribution_map[str(rating)] = distribution_map.get(str(rating), 0) + count
+        rated_total += count
+        rated_sum += rating * count
+
+    average = round(rated_sum / rated_total, 2) if rated_total else 0.0
+    distribution = [DistributionItem(label=k, value=v) for k, v in distribution_map.items()]
+    return average, sum(counts.values()), distribution
+
+
+def _ratings_analytics(
+    db: Session,
+    salon_id: int,
+    start_ts: int,
+    end_ts: int,
+    mode: str,
+    by_object: bool = False,
+    object_type: str | None = None,
+    object_id: int | None = None,
+) -> RatingAnalyticsResponse:
     feedback_type = "rating" if mode == "payments" else "suggestion"
 
+    filters = [
+        Feedback.salon_id == salon_id,
+        Feedback.feedback_type == feedback_type,
+        Feedback.created_at >= start_ts,
+        Feedback.created_at <= end_ts,
+    ]
+    if object_type is not None:
+        filters.append(Feedback.object_type == object_type)
+    if object_id is not None:
+        filters.append(Feedback.object_id == object_id)
+    group_cols = [Feedback.object_type, Feedback.object_id] if by_object else []
     rows = db.execute(
-        select(Feedback).where(
-            and_(
-                Feedback.salon_id == ctx.salon_id,
-                Feedback.feedback_type == feedback_type,
-                Feedback.created_at >= start_ts,
-                Feedback.created_at <= end_ts,
+        select(*group_cols, Feedback.rating, func.count())
+        .where(and_(*filters))
+        .group_by(*group_cols, Feedback.rating)
+    ).all()
+
+    totals: dict[int | None, int] = {}
+    per_object: dict[tuple[str, int | None], dict[int | None, int]] = {}
+    for row in rows:
+        rating, count = row[-2], int(row[-1])
+        totals[rating] = totals.get(rating, 0) + count
+        if by_object:
+            per_object.setdefault((row[0], row[1]), {})[rating] = count
+
+    objects = []
+    for (obj_type, obj_id), counts in per_object.items():
+        obj_average, obj_total, obj_distribution = _rating_summary(counts)
+        objects.append(
+            RatingObjectItem(
+                object_type=obj_type,
+                object_id=obj_id,
+                average_rating=obj_average,
+                total_reviews=obj_total,
+                distribution=obj_distribution,
             )
         )
-    ).scalars().all()
-
-    distribution_map = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
-    rated = [x.rating for x in rows if x.rating is not None]
-    for r in rated:
-        distribution_map[str(r)] = distribution_map.get(str(r), 0) + 1
+    objects.sort(key=lambda item: (-item.total_reviews, item.object_type, item.object_id or 0))
 
-    average = round(sum(rated) / len(rated), 2) if rated else 0.0
+    average, total, distribution = _rating_summary(totals)
     return RatingAnalyticsResponse(
         mode=mode,
         average_rating=average,
-        total_reviews=len(rows),
-        distribution=[DistributionItem(label=k, value=v) for k, v in distribution_map.items()],
+        total_reviews=total,
+        distribution=distribution,
+        objects=objects,
     )
 
 
-@router.get("/levels", response_model=LevelsAnalyticsResponse)
-def levels_analytics(
+@router.get("/ratings", response_model=RatingAnalyticsResponse)
+def ratings_analytics(
+    mode: str = Query(default="payments", pattern="^(payments|recommendations)$"),
+    date_from: int | None = Query(default=None),
+    date_to: int | None = Query(default=None),
+    by_object: bool = Query(default=False),
+    object_type: str | None = Query(default=None, pattern="^(service|product)$"),
+    object_id: int | None = Query(default=None),
     ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
-) -> LevelsAnalyticsResponse:
-    rows = db.execute(select(Client).where(Client.salon_id == ctx.salon_id)).scalars().all()
+    db: Session = Depends(budgeted_db("ratings", read_only=True)),
+) -> RatingAnalyticsResponse:
+    start_ts, end_ts = _range_bounds(date_from, date_to)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "ratings",
+        (*_cache_window(date_from, date_to), mode, by_object, object_type, object_id),
+        lambda: _ratings_analytics(db, ctx.salon_id, start_ts, end_ts, mode, by_object, object_type, object_id),
+    )
 
-    levels = {
-        "0-999": {"all": 0, "bought": 0},
-        "1000-4999": {"all": 0, "bought": 0},
-        "5000+": {"all": 0, "bought": 0},
-    }
 
-    for row in rows:
-        spent = row.total_spent_rub
-        if spent < 1000:
-            key = "0-999"
-        elif spent < 5000:
-            key = "1000-4999"
-        else:
-            key = "5000+"
-        levels[key]["all"] += 1
-        if row.visits_count > 0:
-            levels[key]["bought"] += 1
+def _levels_analytics(db: Session, salon_id: int, loads: AnalyticsLoads | None = None) -> LevelsAnalyticsResponse:
+    loads = loads or AnalyticsLoads(db, salon_id)
+    levels = {key: {"all": 0, "bought": 0} for key in level_labels(loads.level_bounds)}
+    for row in loads.clients():
+        levels[row.level]["all"] += row.clients
+        levels[row.level]["bought"] += row.visited
 
     items = [
         LevelsAnalyticsItem(
@@ -540,40 +667,313 @@ def levels_analytics(
     return LevelsAnalyticsResponse(items=items)
 
 
-@router.get("/page-go", response_model=AppVisitsAnalyticsResponse)
-def page_go_analytics(
-    mode: str = Query(default="views", pattern="^(views|visitors)$"),
-    date_from: int | None = Query(default=None),
-    date_to: int | None = Query(default=None),
-    detailing: str = Query(default="day", pattern="^(day|week|month)$"),
+@router.get("/levels", response_model=LevelsAnalyticsResponse)
+def levels_analytics(
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(budgeted_db("levels", read_only=True)),
+) -> LevelsAnalyticsResponse:
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "levels",
+        get_level_bounds(db, ctx.salon_id),
+        lambda: _levels_analytics(db, ctx.salon_id),
+    )
+
+
+@router.get("/levels/config", response_model=LevelsConfigResponse)
+def get_levels_config(
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
-) -> AppVisitsAnalyticsResponse:
-    start_ts, end_ts = _range_bounds(date_from, date_to)
-    rows = db.execute(
-        select(AppPageEvent).where(
-            and_(
-                AppPageEvent.salon_id == ctx.salon_id,
-                AppPageEvent.created_at >= start_ts,
-                AppPageEvent.created_at <= end_ts,
+) -> LevelsConfigResponse:
+    bounds = get_level_bounds(db, ctx.salon_id)
+    return LevelsConfigResponse(bounds=list(bounds), levels=level_labels(bounds))
+
+
+@router.put("/levels/config", response_model=LevelsConfigResponse)
+def update_levels_config(
+    req: LevelsConfigRequest,
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(get_db),
+) -> LevelsConfigResponse:
+    bounds = tuple(req.bounds)
+    if bounds[0] <= 0 or any(low >= high for low, high in zip(bounds, bounds[1:])):
+        raise HTTPException(status_code=400, detail="Границы уровней должны быть положительными и возрастать")
+
+    set_level_bounds(db, ctx.salon_id, bounds)
+    write_audit(
+        db,
+        salon_id=ctx.salon_id,
+        actor_user_id=ctx.user_id,
+        action="analytics.levels_config.update",
+        entity="system_settings",
+        meta_json=json.dumps({"bounds": list(bounds)}, ensure_ascii=False),
+    )
+    return LevelsConfigResponse(bounds=list(bounds), levels=level_labels(bounds))
+
+
+def _cohorts_analytics(
+    db: Session, salon_id: int, months: int, now_ts: int, refresh: bool = False
+) -> CohortsAnalyticsResponse:
+    calendar = salon_calendar(db, salon_id)
+    last_month = month_of_key(calendar.day_key(now_ts))
+    first_month = last_month - months + 1
+    cells, computed = load_cohort_cells(
+        db, salon_id=salon_id, first_month=first_month, last_month=last_month, now_ts=now_ts, refresh=refresh
+    )
+
+    by_cohort: dict[int, dict[int, CohortCellTotals]] = {}
+    for cell in cells:
+        if cell.cohort_month >= first_month:
+            by_cohort.setdefault(cell.cohort_month, {})[cell.activity_month] = cell
+
+    cohorts = []
+    for cohort_month in sorted(by_cohort):
+        row = by_cohort[cohort_month]
+        size = row[cohort_month].clients if cohort_month in row else 0
+        cohorts.append(
+            CohortRow(
+                cohort_month=month_label(cohort_month),
+                cohort_start_ts=calendar.day_start(month_first_key(cohort_month)),
+                clients=size,
+                revenue_rub=sum(cell.revenue_rub for cell in row.values()),
+                cells=[
+                    CohortCell(
+                        months_since=activity_month - cohort_month,
+                        clients=cell.clients,
+                        retention_percent=_percent(cell.clients, size),
+                        purchases=cell.purchases,
+                        revenue_rub=cell.revenue_rub,
+                    )
+                    for activity_month, cell in sorted(row.items())
+                ],
             )
         )
-    ).scalars().all()
+    return CohortsAnalyticsResponse(
+        months=months,
+        date_from=calendar.day_start(month_first_key(first_month)),
+        date_to=calendar.day_start(month_first_key(last_month + 1)) - 1,
+        cohorts=cohorts,
+        computed_months=computed,
+    )
 
-    bucket_seconds = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400}[detailing]
-    bucket: dict[int, int] = {}
-    visitors_set: dict[int, set[str]] = {}
 
-    for row in rows:
-        ts = row.created_at - (row.created_at % bucket_seconds)
-        if mode == "views":
-            bucket[ts] = bucket.get(ts, 0) + 1
-        else:
-            visitors_set.setdefault(ts, set()).add(row.visitor_key or f"client:{row.client_id or 0}")
+@router.get("/cohorts", response_model=CohortsAnalyticsResponse)
+def cohorts_analytics(
+    months: int = Query(default=12, ge=1, le=60),
+    refresh: bool = Query(default=False),
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(budgeted_db("cohorts")),
+) -> CohortsAnalyticsResponse:
+    now_ts = int(time.time())
+    if refresh:
+        return _cohorts_analytics(db, ctx.salon_id, months, now_ts, refresh=True)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "cohorts",
+        (months, month_of_key(salon_calendar(db, ctx.salon_id).day_key(now_ts))),
+        lambda: _cohorts_analytics(db, ctx.salon_id, months, now_ts),
+    )
+
+
+@router.get("/rfm", response_model=RfmAnalyticsResponse)
+def rfm_analytics(
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(get_db),
+) -> RfmAnalyticsResponse:
+    return RfmAnalyticsResponse(**rfm_summary(db, salon_id=ctx.salon_id))
+
+
+@router.post("/rfm/recompute", response_model=RfmAnalyticsResponse)
+def recompute_rfm(
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(get_db),
+) -> RfmAnalyticsResponse:
+    scored = recompute_client_scores(db, salon_id=ctx.salon_id)
+    write_audit(
+        db,
+        salon_id=ctx.salon_id,
+        actor_user_id=ctx.user_id,
+        action="analytics.rfm_recompute",
+        entity="client_scores",
+        meta_json=json.dumps({"scored": scored}),
+    )
+    return RfmAnalyticsResponse(**rfm_summary(db, salon_id=ctx.salon_id))
+
+
+def _booking_breakdown(
+    totals: dict[int, list[int]], titles: dict[int, str], empty_title: str, missing_title: str
+) -> list[BookingBreakdownItem]:
+    items = [
+        BookingBreakdownItem(
+            id=key or None,
+            title=empty_title if not key else titles.get(key, f"{missing_title} #{key}"),
+            appointments=appointments,
+            completed=completed,
+            cancelled=cancelled,
+            completion_rate_percent=_percent(completed, appointments),
+            cancel_rate_percent=_percent(cancelled, appointments),
+        )
+        for key, (appointments, completed, cancelled) in totals.items()
+    ]
+    items.sort(key=lambda item: (-item.appointments, item.id or 0))
+    return items
+
+
+def _bookings_analytics(
+    db: Session,
+    salon_id: int,
+    start_ts: int,
+    end_ts: int,
+    employee_id: int | None,
+    service_id: int | None,
+    refresh: bool = False,
+) -> BookingsAnalyticsResponse:
+    calendar = salon_calendar(db, salon_id)
+    cells, rollup_months = load_booking_cells(
+        db,
+        salon_id=salon_id,
+        start_ts=start_ts,
+        end_ts=end_ts,
+        calendar=calendar,
+        employee_id=employee_id,
+        service_id=service_id,
+        refresh=refresh,
+    )
+
+    heatmap: dict[tuple[int, int], list[int]] = {}
+    by_employee: dict[int, list[int]] = {}
+    by_service: dict[int, list[int]] = {}
+    for cell in cells:
+        for bucket in (
+            heatmap.setdefault((cell.weekday, cell.hour), [0, 0, 0]),
+            by_employee.setdefault(cell.employee_id, [0, 0, 0]),
+            by_service.setdefault(cell.service_id, [0, 0, 0]),
+        ):
+            bucket[0] += cell.appointments
+            bucket[1] += cell.completed
+            bucket[2] += cell.cancelled
+
+    employee_titles = dict(
+        db.execute(
+            select(Employee.id, Employee.full_name).where(
+                and_(Employee.salon_id == salon_id, Employee.id.in_([key for key in by_employee if key]))
+            )
+        ).all()
+    )
+    service_titles = dict(
+        db.execute(
+            select(Product.id, Product.name).where(
+                and_(Product.salon_id == salon_id, Product.id.in_([key for key in by_service if key]))
+            )
+        ).all()
+    )
+
+    appointments = sum(values[0] for values in by_employee.values())
+    completed = sum(values[1] for values in by_employee.values())
+    cancelled = sum(values[2] for values in by_employee.values())
+    return BookingsAnalyticsResponse(
+        date_from=start_ts,
+        date_to=end_ts,
+        timezone=calendar.timezone,
+        appointments=appointments,
+        completed=completed,
+        cancelled=cancelled,
+        completion_rate_percent=_percent(completed, appointments),
+        cancel_rate_percent=_percent(cancelled, appointments),
+        heatmap=[
+            BookingHeatmapCell(
+                weekday=weekday,
+                hour=hour,
+                appointments=total,
+                completed=done,
+                cancelled=lost,
+                cancel_rate_percent=_percent(lost, total),
+            )
+            for (weekday, hour), (total, done, lost) in sorted(heatmap.items())
+        ],
+        employees=_booking_breakdown(by_employee, employee_titles, "Без мастера", "Сотрудник"),
+        services=_booking_breakdown(by_service, service_titles, "Без услуги", "Услуга"),
+        rollup_months=rollup_months,
+    )
+
+
+@router.get("/bookings", response_model=BookingsAnalyticsResponse)
+def bookings_analytics(
+    date_from: int | None = Query(default=None),
+    date_to: int | None = Query(default=None),
+    employee_id: int | None = Query(default=None, ge=1),
+    service_id: int | None = Query(default=None, ge=1),
+    refresh: bool = Query(default=False),
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(budgeted_db("bookings")),
+) -> BookingsAnalyticsResponse:
+    start_ts, end_ts = _range_bounds(date_from, date_to)
+    if start_ts > end_ts:
+        raise HTTPException(status_code=400, detail="Начало периода позже конца")
+    if refresh:
+        return _bookings_analytics(db, ctx.salon_id, start_ts, end_ts, employee_id, service_id, refresh=True)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "bookings",
+        (*_cache_window(date_from, date_to), employee_id, service_id),
+        lambda: _bookings_analytics(db, ctx.salon_id, start_ts, end_ts, employee_id, service_id),
+    )
 
-    if mode == "visitors":
-        for ts, values in visitors_set.items():
-            bucket[ts] = len(values)
+
+def _page_go_analytics(
+    db: Session, salon_id: int, start_ts: int, end_ts: int, mode: str, detailing: str, exact: bool
+) -> AppVisitsAnalyticsResponse:
+    # buckets are keyed by the local day key of their first day and reported as its start in the salon timezone
+    calendar = salon_calendar(db, salon_id)
+    bucket: dict[int, int] = {}
+
+    if mode == "visitors" and exact and mirror_covers(db, "app_page_events", end_ts):
+        bucket_sql = {
+            "day": "day_key",
+            "week": "day_key - (day_key + 3) % 7",
+            "month": "day_key - day(DATE '1970-01-01' + CAST(day_key AS INTEGER)) + 1",
+        }[detailing]
+        for key, count in mirror_query(
+            f"""
+            SELECT {bucket_sql},
+                   count(DISTINCT CASE WHEN visitor_key <> '' THEN visitor_key
+                                       ELSE 'client:' || CAST(coalesce(client_id, 0) AS VARCHAR) END)
+            FROM {{app_page_events}}
+            WHERE salon_id = ? AND created_at BETWEEN ? AND ?
+            GROUP BY 1
+            """,
+            [salon_id, start_ts, end_ts],
+        ):
+            bucket[calendar.day_start(int(key))] = int(count)
+    elif mode == "visitors" and exact:
+        bucket_col = bucket_key_expr(AppPageEvent.day_key, detailing).label("bucket")
+        key_col = case(
+            (AppPageEvent.visitor_key != "", AppPageEvent.visitor_key),
+            else_="client:" + cast(func.coalesce(AppPageEvent.client_id, 0), String),
+        )
+        for key, count in db.execute(
+            select(bucket_col, func.count(func.distinct(key_col)))
+            .where(
+                and_(
+                    AppPageEvent.salon_id == salon_id,
+                    AppPageEvent.created_at >= start_ts,
+                    AppPageEvent.created_at <= end_ts,
+                )
+            )
+            .group_by(bucket_col)
+        ):
+            bucket[calendar.day_start(int(key))] = int(count)
+    else:
+        days = load_visit_days(db, salon_id=salon_id, start_ts=start_ts, end_ts=end_ts)
+        registers_by_bucket: dict[int, list[bytes]] = {}
+        for day in days:
+            ts = calendar.day_start(bucket_key(calendar.day_key(day.day_ts), detailing))
+            if mode == "views":
+                bucket[ts] = bucket.get(ts, 0) + day.views
+            else:
+                registers_by_bucket.setdefault(ts, []).append(day.registers)
+        for ts, items in registers_by_bucket.items():
+            bucket[ts] = estimate_distinct(merge_registers(items))
 
     info_text = (
         "Просмотры — общее количество просмотров страницы компании в UDS app."
@@ -584,78 +984,101 @@ def page_go_analytics(
     return AppVisitsAnalyticsResponse(
         mode=mode,
         detailing=detailing,
-        timezone="GMT+03:00",
+        timezone=calendar.gmt_label(end_ts),
         info_text=info_text,
         series=[SeriesPoint(ts=k, value=v) for k, v in sorted(bucket.items())],
+        approximate=mode == "visitors" and not exact,
     )
 
 
-@router.get("/marketing", response_model=MarketingAnalyticsResponse)
-def marketing_analytics(
+@router.get("/page-go", response_model=AppVisitsAnalyticsResponse)
+def page_go_analytics(
+    mode: str = Query(default="views", pattern="^(views|visitors)$"),
     date_from: int | None = Query(default=None),
     date_to: int | None = Query(default=None),
+    detailing: str = Query(default="day", pattern="^(day|week|month)$"),
+    exact: bool = Query(default=False),
     ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
-) -> MarketingAnalyticsResponse:
+    db: Session = Depends(budgeted_db("page-go")),
+) -> AppVisitsAnalyticsResponse:
     start_ts, end_ts = _range_bounds(date_from, date_to)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "page-go",
+        (*_cache_window(date_from, date_to), mode, detailing, exact),
+        lambda: _page_go_analytics(db, ctx.salon_id, start_ts, end_ts, mode, detailing, exact),
+    )
 
-    clients = db.execute(
-        select(Client).where(Client.salon_id == ctx.salon_id)
-    ).scalars().all()
-    operations = db.execute(
-        select(Operation).where(
-            and_(
-                Operation.salon_id == ctx.salon_id,
-                Operation.created_at >= start_ts,
-                Operation.created_at <= end_ts,
-            )
-        )
-    ).scalars().all()
-    channels = db.execute(
-        select(TrafficChannel).where(TrafficChannel.salon_id == ctx.salon_id)
-    ).scalars().all()
 
-    clients_by_id = {row.id: row for row in clients}
-    channels_by_id = {row.id: row for row in channels}
+def _marketing_windows(start_ts: int, end_ts: int) -> tuple[tuple[int, int], tuple[int, int]]:
+    forecast_start = max(0, start_ts - (end_ts - start_ts))
+    return (start_ts, end_ts), (forecast_start, start_ts - 1)
 
-    purchases = [row for row in operations if row.op_type == "purchase"]
-    buyers_ids = {row.client_id for row in purchases}
-    new_clients = [row for row in clients if start_ts <= (row.last_visit_at or 0) <= end_ts]
-    retained_clients = [row for row in clients if row.visits_count >= 2]
 
-    card_total_clients = len(clients)
-    card_buyers = len(buyers_ids)
-    card_conversion = _percent(card_buyers, card_total_clients)
-    card_revenue = int(sum(row.amount_rub for row in purchases))
-    card_avg_check = round(card_revenue / len(purchases), 2) if purchases else 0.0
+def _marketing_analytics(
+    db: Session,
+    salon_id: int,
+    start_ts: int,
+    end_ts: int,
+    compare_window: tuple[int, int] | None = None,
+    loads: AnalyticsLoads | None = None,
+) -> MarketingAnalyticsResponse:
+    loads = loads or AnalyticsLoads(db, salon_id)
+    purchase_windows = [(start_ts, end_ts), *([compare_window] if compare_window else [])]
+    purchases_by_window = loads.purchases_windows(purchase_windows)
+    current_window, prev_window = _marketing_windows(start_ts, end_ts)
 
-    channel_stats: list[MarketingChannelStats] = []
-    channel_client_map: dict[int | None, list[Client]] = {None: []}
-    for row in channels:
-        channel_client_map[row.id] = []
+    channels = db.execute(
+        select(TrafficChannel.id, TrafficChannel.name).where(TrafficChannel.salon_id == salon_id)
+    ).all()
+    channel_names = {row.id: row.name for row in channels}
 
-    for client in clients:
-        channel_client_map.setdefault(client.acquisition_channel_id, []).append(client)
+    channel_clients: dict[int | None, int] = {None: 0}
+    for row in channels:
+        channel_clients[row.id] = 0
+    card_total_clients = engaged_clients = retained_clients = 0
+    consent_clients = tg_clients = 0
+    for group in loads.clients():
+        channel_clients[group.channel_id] = channel_clients.get(group.channel_id, 0) + group.clients
+        card_total_clients += group.clients
+        engaged_clients += group.visited
+        retained_clients += group.repeat
+        consent_clients += group.consent
+        tg_clients += group.with_tg
+    current_new_clients, prev_new_clients = loads.new_clients_counts([current_window, prev_window])
+
+    channel_purchases: dict[int | None, list[int]] = {}
+    segment_buyers = {"consent": 0, "no_consent": 0, "tg": 0, "no_tg": 0}
+    card_buyers = purchases_count = card_revenue = 0
+    for group in purchases_by_window[0]:
+        totals = channel_purchases.setdefault(group.channel_id, [0, 0, 0])
+        totals[0] += group.buyers
+        totals[1] += group.purchases
+        totals[2] += group.revenue_rub
+        card_buyers += group.buyers
+        purchases_count += group.purchases
+        card_revenue += group.revenue_rub
+        if group.consent is not None:
+            segment_buyers["consent" if group.consent else "no_consent"] += group.buyers
+        if group.with_tg is not None:
+            segment_buyers["tg" if group.with_tg else "no_tg"] += group.buyers
 
-    purchases_by_channel: dict[int | None, list[Operation]] = {key: [] for key in channel_client_map.keys()}
-    for row in purchases:
-        client = clients_by_id.get(row.client_id)
-        channel_id = client.acquisition_channel_id if client is not None else None
-        purchases_by_channel.setdefault(channel_id, []).append(row)
+    card_conversion = _percent(card_buyers, card_total_clients)
+    card_avg_check = round(card_revenue / purchases_count, 2) if purchases_count else 0.0
 
-    for channel_id, channel_clients in channel_client_map.items():
-        channel_purchases = purchases_by_channel.get(channel_id, [])
-        channel_buyers = {row.client_id for row in channel_purchases}
-        channel_name = channels_by_id[channel_id].name if channel_id in channels_by_id else "Без источника"
+    channel_stats: list[MarketingChannelStats] = []
+    for channel_id in channel_clients:
+        clients_total = channel_clients.get(channel_id, 0)
+        buyers, purchases, revenue = channel_purchases.get(channel_id, [0, 0, 0])
         channel_stats.append(
             MarketingChannelStats(
                 channel_id=channel_id,
-                channel_name=channel_name,
-                clients_total=len(channel_clients),
-                buyers_total=len(channel_buyers),
-                purchases_total=len(channel_purchases),
-                revenue_rub=int(sum(row.amount_rub for row in channel_purchases)),
-                conversion_to_purchase_percent=_percent(len(channel_buyers), len(channel_clients)),
+                channel_name=channel_names.get(channel_id, "Без источника"),
+                clients_total=clients_total,
+                buyers_total=buyers,
+                purchases_total=purchases,
+                revenue_rub=revenue,
+                conversion_to_purchase_percent=_percent(buyers, clients_total),
             )
         )
 
@@ -671,8 +1094,8 @@ def marketing_analytics(
         MarketingFunnelStage(
             code="engaged",
             title="Вовлечённые (минимум 1 визит)",
-            clients=len([row for row in clients if row.visits_count > 0]),
-            conversion_percent=_percent(len([row for row in clients if row.visits_count > 0]), card_total_clients),
+            clients=engaged_clients,
+            conversion_percent=_percent(engaged_clients, card_total_clients),
         ),
         MarketingFunnelStage(
             code="buyers",
@@ -683,77 +1106,110 @@ def marketing_analytics(
         MarketingFunnelStage(
             code="retained",
             title="Повторные покупки (retention)",
-            clients=len(retained_clients),
-            conversion_percent=_percent(len(retained_clients), card_total_clients),
+            clients=retained_clients,
+            conversion_percent=_percent(retained_clients, card_total_clients),
         ),
     ]
 
-    segmentation_map: dict[str, list[Client]] = {
-        "Согласие на маркетинг": [row for row in clients if row.consent_marketing],
-        "Без согласия на маркетинг": [row for row in clients if not row.consent_marketing],
-        "Есть Telegram": [row for row in clients if row.tg_id is not None],
-        "Нет Telegram": [row for row in clients if row.tg_id is None],
-    }
-
-    segments: list[MarketingSegment] = []
-    for name, group_clients in segmentation_map.items():
-        group_ids = {row.id for row in group_clients}
-        buyers_in_group = len(group_ids & buyers_ids)
-        segments.append(
-            MarketingSegment(
-                segment=name,
-                clients_total=len(group_clients),
-                buyers_total=buyers_in_group,
-                conversion_percent=_percent(buyers_in_group, len(group_clients)),
-            )
+    segmentation = [
+        ("Согласие на маркетинг", consent_clients, segment_buyers["consent"]),
+        ("Без согласия на маркетинг", card_total_clients - consent_clients, segment_buyers["no_consent"]),
+        ("Есть Telegram", tg_clients, segment_buyers["tg"]),
+        ("Нет Telegram", card_total_clients - tg_clients, segment_buyers["no_tg"]),
+    ]
+    segments = [
+        MarketingSegment(
+            segment=name,
+            clients_total=clients_total,
+            buyers_total=buyers,
+            conversion_percent=_percent(buyers, clients_total),
         )
+        for name, clients_total, buyers in segmentation
+    ]
 
-    campaign_ids = db.execute(
-        select(CommunicationCampaign.id).where(
+    campaigns_total, sent_total, opened_total, clicked_total, converted_total = db.execute(
+        select(
+            func.count(func.distinct(CommunicationCampaign.id)),
+            func.count(CommunicationRecipient.sent_at),
+            func.count(CommunicationRecipient.opened_at),
+            func.count(CommunicationRecipient.clicked_at),
+            func.count(CommunicationRecipient.converted_at),
+        )
+        .select_from(CommunicationCampaign)
+        .outerjoin(CommunicationRecipient, CommunicationRecipient.campaign_id == CommunicationCampaign.id)
+        .where(
             and_(
-                CommunicationCampaign.salon_id == ctx.salon_id,
+                CommunicationCampaign.salon_id == salon_id,
                 CommunicationCampaign.created_at >= start_ts,
                 CommunicationCampaign.created_at <= end_ts,
             )
         )
-    ).scalars().all()
-
-    recipient_rows: list[CommunicationRecipient] = []
-    if campaign_ids:
-        recipient_rows = db.execute(
-            select(CommunicationRecipient).where(CommunicationRecipient.campaign_id.in_(campaign_ids))
-        ).scalars().all()
-
-    sent_total = len([row for row in recipient_rows if row.sent_at is not None])
-    opened_total = len([row for row in recipient_rows if row.opened_at is not None])
-    clicked_total = len([row for row in recipient_rows if row.clicked_at is not None])
-    converted_total = len([row for row in recipient_rows if row.converted_at is not None])
+    ).one()
 
     automation = MarketingAutomationStats(
-        campaigns_total=len(campaign_ids),
-        sent_total=sent_total,
-        opened_total=opened_total,
-        clicked_total=clicked_total,
-        converted_total=converted_total,
-        open_rate_percent=_percent(opened_total, sent_total),
-        click_rate_percent=_percent(clicked_total, sent_total),
-        conversion_rate_percent=_percent(converted_total, sent_total),
+        campaigns_total=int(campaigns_total),
+        sent_total=int(sent_total),
+        opened_total=int(opened_total),
+        clicked_total=int(clicked_total),
+        converted_total=int(converted_total),
+        open_rate_percent=_percent(int(opened_total), int(sent_total)),
+        click_rate_percent=_percent(int(clicked_total), int(sent_total)),
+        conversion_rate_percent=_percent(int(converted_total), int(sent_total)),
     )
 
-    forecast_start = max(0, start_ts - (end_ts - start_ts))
-    prev_new_clients = len([row for row in clients if forecast_start <= (row.last_visit_at or 0) < start_ts])
-    current_new_clients = len(new_clients)
     trend = current_new_clients - prev_new_clients
 
+    # fitted offline by tools/fit_forecast_models.py; the straight line is kept for salons without a model
+    models = {
+        row.metric: row
+        for row in db.execute(select(ForecastModel).where(ForecastModel.salon_id == salon_id)).scalars().all()
+    }
+    new_clients_model = models.get("new_clients")
+    calendar = salon_calendar(db, salon_id)
     forecast: list[MarketingForecastPoint] = []
     period_seconds = max(1, end_ts - start_ts)
     for idx in range(1, 5):
         point_ts = end_ts + idx * period_seconds
+        if new_clients_model is not None:
+            window_start = point_ts - period_seconds
+            days = list(range(calendar.day_key(window_start), calendar.day_key(point_ts - 1) + 1))
+            days = days[:FORECAST_MAX_WINDOW_DAYS]
+            # days cut by the window edges count proportionally to their overlap
+            bounds = [(calendar.day_start(day), calendar.day_start(day + 1)) for day in days]
+            overlaps = [(min(end, point_ts) - max(start, window_start)) / (end - start) for start, end in bounds]
+            values = evaluate_model(new_clients_model, calendar, days)
+            predicted = int(round(sum(value * share for value, share in zip(values, overlaps))))
+        else:
+            predicted = max(0, current_new_clients + trend * idx)
         forecast.append(
             MarketingForecastPoint(
                 ts=point_ts,
                 new_clients_actual=current_new_clients,
-                new_clients_forecast=max(0, current_new_clients + trend * idx),
+                new_clients_forecast=predicted,
+            )
+        )
+
+    forecast_models = []
+    for metric in FORECAST_METRICS:
+        row = models.get(metric)
+        if row is None:
+            continue
+        last_day = calendar.day_key(row.last_day_ts)
+        days = [last_day + idx + 1 for idx in range(FORECAST_HORIZON_DAYS)]
+        forecast_models.append(
+            MarketingForecastModel(
+                metric=row.metric,
+                method=row.method,
+                fitted_at=row.fitted_at,
+                last_day_ts=row.last_day_ts,
+                observations=row.observations,
+                backtest_days=row.backtest_days,
+                backtest_mae=row.backtest_mae,
+                backtest_smape_percent=row.backtest_smape_percent,
+                points=[
+                    MarketingForecastModelPoint(day_ts=calendar.day_start(day), value=round(value, 2))
+                    for day, value in zip(days, evaluate_model(row, calendar, days))
+                ],
             )
         )
 
@@ -762,24 +1218,129 @@ def marketing_analytics(
         f"Сквозная аналитика: лидирующий источник по выручке — {top_channel}.",
         f"Конверсия в покупку: {card_conversion}% ({card_buyers} из {card_total_clients} клиентов).",
         f"CRM-маркетинг: open rate {automation.open_rate_percent}%, click rate {automation.click_rate_percent}%.",
-        f"Удержание: доля клиентов с повторными покупками — {_percent(len(retained_clients), card_total_clients)}%.",
+        f"Удержание: доля клиентов с повторными покупками — {_percent(retained_clients, card_total_clients)}%.",
         "Прогноз: используйте динамику новых клиентов для перераспределения бюджета в эффективные каналы.",
     ]
 
+    cards = [
+        MetricCard(code="clients_total", title="Клиенты", value=card_total_clients),
+        MetricCard(code="buyers_total", title="Покупатели", value=card_buyers),
+        MetricCard(code="conversion_to_purchase", title="Конверсия в покупку, %", value=card_conversion),
+        MetricCard(code="revenue", title="Выручка, ₽", value=card_revenue),
+        MetricCard(code="avg_check", title="Средний чек, ₽", value=card_avg_check),
+    ]
+    if compare_window:
+        prev_buyers = sum(group.buyers for group in purchases_by_window[1])
+        prev_purchases = sum(group.purchases for group in purchases_by_window[1])
+        prev_revenue = sum(group.revenue_rub for group in purchases_by_window[1])
+        _apply_compare(
+            cards,
+            {
+                "buyers_total": prev_buyers,
+                "conversion_to_purchase": _percent(prev_buyers, card_total_clients),
+                "revenue": prev_revenue,
+                "avg_check": round(prev_revenue / prev_purchases, 2) if prev_purchases else 0.0,
+            },
+        )
+
     return MarketingAnalyticsResponse(
-        cards=[
-            MetricCard(code="clients_total", title="Клиенты", value=card_total_clients),
-            MetricCard(code="buyers_total", title="Покупатели", value=card_buyers),
-            MetricCard(code="conversion_to_purchase", title="Конверсия в покупку, %", value=card_conversion),
-            MetricCard(code="revenue", title="Выручка, ₽", value=card_revenue),
-            MetricCard(code="avg_check", title="Средний чек, ₽", value=card_avg_check),
-        ],
+        cards=cards,
         channels=channel_stats,
         funnel=funnel_stages,
         segments=segments,
         automation=automation,
         forecast=forecast,
+        forecast_method=new_clients_model.method if new_clients_model is not None else "linear",
+        forecast_models=forecast_models,
         insights=insights,
+        **_compare_fields(compare_window),
+    )
+
+
+@router.get("/marketing", response_model=MarketingAnalyticsResponse)
+def marketing_analytics(
+    date_from: int | None = Query(default=None),
+    date_to: int | None = Query(default=None),
+    compare: str | None = Query(default=None, pattern="^(previous|year_ago)$"),
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(budgeted_db("marketing", read_only=True)),
+) -> MarketingAnalyticsResponse:
+    start_ts, end_ts = _range_bounds(date_from, date_to)
+    compare_window = _compare_window(start_ts, end_ts, compare)
+    return analytics_cache.get_or_compute(
+        ctx.salon_id,
+        "marketing",
+        (*_cache_window(date_from, date_to), compare),
+        lambda: _marketing_analytics(db, ctx.salon_id, start_ts, end_ts, compare_window),
+    )
+
+
+def _batch_payload(  # type: ignore[no-untyped-def]
+    loads: AnalyticsLoads, tab: AnalyticsBatchTab, start_ts: int, end_ts: int, version: int
+):
+    db, salon_id = loads.db, loads.salon_id
+    window = _cache_window(tab.date_from, tab.date_to)
+    compare_window = _compare_window(start_ts, end_ts, tab.compare)
+    if tab.tab == "customers":
+        key = (*window, tab.compare)
+        compute = partial(_customers_analytics, db, salon_id, start_ts, end_ts, compare_window, loads)
+    elif tab.tab == "operations":
+        key = (*window, tab.compare)
+        compute = partial(_operations_analytics, db, salon_id, start_ts, end_ts, compare_window, loads)
+    elif tab.tab == "finance":
+        key = (*window, tab.detailing, tab.compare)
+        compute = partial(_finance_analytics, db, salon_id, start_ts, end_ts, tab.detailing, compare_window, loads)
+    elif tab.tab == "ratings":
+        key = (*window, tab.mode, False, None, None)
+        compute = partial(_ratings_analytics, db, salon_id, start_ts, end_ts, tab.mode)
+    elif tab.tab == "levels":
+        key, compute = loads.level_bounds, partial(_levels_analytics, db, salon_id, loads)
+    else:
+        key = (*window, tab.compare)
+        compute = partial(_marketing_analytics, db, salon_id, start_ts, end_ts, compare_window, loads)
+    return analytics_cache.get_or_compute(salon_id, tab.tab, key, compute, version=version)
+
+
+@router.post("/batch", response_model=AnalyticsBatchResponse)
+def analytics_batch(
+    req: AnalyticsBatchRequest,
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(budgeted_db("batch")),
+) -> AnalyticsBatchResponse:
+    # all tabs read one snapshot and share the operations/clients scans through AnalyticsLoads. The cache
+    # version is taken before the snapshot is pinned: every tab is stored under it, never under a version
+    # bumped by a write the snapshot does not see
+    version = analytics_cache.version(ctx.salon_id)
+    begin_read_snapshot(db)
+    loads = AnalyticsLoads(db, ctx.salon_id)
+    ranges = [_range_bounds(tab.date_from, tab.date_to) for tab in req.tabs]
+
+    # marketing runs first so that customers reuse its purchase groups for the buyers count
+    order = sorted(range(len(req.tabs)), key=lambda idx: req.tabs[idx].tab != "marketing")
+    payloads = {idx: _batch_payload(loads, req.tabs[idx], *ranges[idx], version) for idx in order}
+    return AnalyticsBatchResponse(
+        items=[AnalyticsBatchItem(tab=tab.tab, payload=payloads[idx]) for idx, tab in enumerate(req.tabs)]
+    )
+
+
+@router.get("/cache-stats", response_model=AnalyticsCacheStatsResponse)
+def analytics_cache_stats(
+    ctx=Depends(require_roles("owner", "admin")),
+) -> AnalyticsCacheStatsResponse:
+    return AnalyticsCacheStatsResponse(salon_version=analytics_cache.version(ctx.salon_id), **analytics_cache.stats())
+
+
+@router.get("/query-budget", response_model=QueryBudgetStatsResponse)
+def query_budget_stats(
+    ctx=Depends(require_roles("owner", "admin")),
+) -> QueryBudgetStatsResponse:
+    return QueryBudgetStatsResponse(
+        enabled=settings.QUERY_BUDGET_ENABLED,
+        items=[
+            QueryBudgetItem(endpoint=endpoint, max_seconds=seconds, max_steps=steps, exhausted=exhausted)
+            for endpoint, exhausted in sorted(budget_stats().items())
+            for seconds, steps in [budget_limits(endpoint)]
+        ],
     )
 
 
@@ -787,7 +1348,7 @@ def marketing_analytics(
 def promotion_forecast(
     req: PromotionForecastRequest,
     ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
+    db: Session = Depends(budgeted_db("promotion-forecast")),
 ) -> PromotionForecastResponse:
     setting = db.execute(
         select(ReferralProgramSetting).where(ReferralProgramSetting.salon_id == ctx.salon_id)
@@ -847,6 +1408,13 @@ def promotion_forecast(
         break_even_new_clients = int(round(reward_cost / per_client_profit)) if per_client_profit else 0
         break_even_conversion_rate = round((break_even_new_clients / max(req.initial_clients, 1)) * 100, 2)
 
+    scenarios: list[PromotionScenarioItem] = []
+    simulation = None
+    if req.draws > 0 and (generation_rows or req.reward_percents or req.generation_depths):
+        scenarios, simulation = _promotion_scenarios(
+            db, ctx.salon_id, req, [row.reward_percent for row in generation_rows], reward_unit
+        )
+
     return PromotionForecastResponse(
         period_days=req.period_days,
         projected_clients_total=total_new_clients,
@@ -857,136 +1425,124 @@ def promotion_forecast(
         break_even_new_clients=break_even_new_clients,
         break_even_conversion_rate_percent=break_even_conversion_rate,
         generations=generations,
+        scenarios=scenarios,
+        simulation=simulation,
     )
 
 
-@router.get("/control-tower", response_model=ControlTowerAnalyticsResponse)
-def control_tower_analytics(
-    date_from: int | None = Query(default=None),
-    date_to: int | None = Query(default=None),
-    ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
-) -> ControlTowerAnalyticsResponse:
-    start_ts, end_ts = _range_bounds(date_from, date_to)
-    now_ts = int(time.time())
-
-    clients = db.execute(select(Client).where(Client.salon_id == ctx.salon_id)).scalars().all()
-    operations = db.execute(
-        select(Operation).where(
-            and_(
-                Operation.salon_id == ctx.salon_id,
-                Operation.created_at >= start_ts,
-                Operation.created_at <= end_ts,
+def _promotion_scenarios(
+    db: Session, salon_id: int, req: PromotionForecastRequest, rule_percents: list[float], reward_unit: str
+) -> tuple[list[PromotionScenarioItem], PromotionSimulationInfo]:
+    if any(x < 0 for x in req.budgets_rub) or any(not 0 <= x <= 100 for x in req.reward_percents):
+        raise HTTPException(status_code=400, detail="Бюджеты и проценты вознаграждения должны быть неотрицательными")
+    if any(not 1 <= x <= 10 for x in req.generation_depths):
+        raise HTTPException(status_code=400, detail="Глубина поколений должна быть от 1 до 10")
+
+    depths = req.generation_depths or [max(len(rule_percents), 1)]
+    budgets: list[float | None] = list(req.budgets_rub) or [None]
+    grid = []
+    for budget in budgets:
+        for depth in depths:
+            if req.reward_percents:
+                percent_sets = [(percent,) * depth for percent in req.reward_percents]
+            else:
+                # generations beyond the configured rules repeat the last rule
+                padded = (rule_percents or [0.0]) + [rule_percents[-1] if rule_percents else 0.0] * depth
+                percent_sets = [tuple(padded[:depth])]
+            grid.extend(
+                PromotionScenario(budget_rub=budget, generations=depth, reward_percents=percents)
+                for percents in percent_sets
             )
+    max_cells = simulation_max_cells()
+    if len(grid) * req.draws > max_cells:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком большая сетка сценариев: сценарии × draws не должно превышать {max_cells}",
         )
-    ).scalars().all()
-    appointments = db.execute(
-        select(Appointment).where(
-            and_(
-                Appointment.salon_id == ctx.salon_id,
-                Appointment.starts_at >= start_ts,
-                Appointment.starts_at <= end_ts,
-            )
-        )
-    ).scalars().all()
-
-    stock_rows = db.execute(
-        select(Product, StockBalance).join(
-            StockBalance,
-            and_(
-                StockBalance.product_id == Product.id,
-                StockBalance.salon_id == Product.salon_id,
-            ),
-        )
-        .where(Product.salon_id == ctx.salon_id)
-    ).all()
-
-    purchases = [row for row in operations if row.op_type == "purchase"]
-    buyers_ids = {row.client_id for row in purchases}
-    conversion_purchase = _percent(len(buyers_ids), len(clients))
-
-    revenue_total = int(sum(row.amount_rub for row in purchases))
-    avg_check = round(revenue_total / len(purchases), 2) if purchases else 0
-
-    appointments_total = len(appointments)
-    appointments_completed = len([row for row in appointments if row.status == "completed"])
-    appointments_cancelled = len([row for row in appointments if row.status == "cancelled"])
-    no_show_risk = _percent(appointments_cancelled, appointments_total)
-
-    future_bookings = [row for row in appointments if row.starts_at > now_ts and row.status == "scheduled"]
-    future_bookings_total = len(future_bookings)
-    future_revenue_forecast = int(round(future_bookings_total * avg_check))
 
-    sku_totals: dict[int, dict[str, int | str]] = {}
-    for product, stock in stock_rows:
-        item = sku_totals.setdefault(
-            product.id,
-            {"name": product.name, "quantity": 0, "price_rub": int(product.price_rub)},
+    started = time.perf_counter()
+    inputs = fit_promotion_inputs(
+        db, salon_id=salon_id, now_ts=int(time.time()), fallback_check_rub=req.avg_check_rub
+    )
+    results = simulate_promotion_grid(
+        inputs,
+        grid,
+        initial_clients=req.initial_clients,
+        conversion_rate=req.conversion_rate_percent / 100,
+        margin=req.gross_margin_percent / 100,
+        reward_unit=reward_unit,
+        draws=req.draws,
+        seed=req.seed,
+    )
+    items = [
+        PromotionScenarioItem(
+            budget_rub=x.scenario.budget_rub,
+            generations=x.scenario.generations,
+            reward_percents=list(x.scenario.reward_percents),
+            new_clients_p50=round(x.new_clients_p50, 2),
+            net_effect_p10_rub=round(x.net_effect_p10, 2),
+            net_effect_p50_rub=round(x.net_effect_p50, 2),
+            net_effect_p90_rub=round(x.net_effect_p90, 2),
+            break_even_new_clients_p10=round(x.break_even_p10, 2),
+            break_even_new_clients_p50=round(x.break_even_p50, 2),
+            break_even_new_clients_p90=round(x.break_even_p90, 2),
+            profit_probability_percent=round(x.profit_probability * 100, 2),
         )
-        item["quantity"] = int(item["quantity"]) + int(stock.quantity)
-
-    inventory_valuation = sum(int(item["quantity"]) * int(item["price_rub"]) for item in sku_totals.values())
-    low_stock_positions = len([item for item in sku_totals.values() if 0 < int(item["quantity"]) <= 5])
-    out_of_stock_positions = len([item for item in sku_totals.values() if int(item["quantity"]) <= 0])
-
-    top_stock_items = sorted(sku_totals.values(), key=lambda item: int(item["quantity"]), reverse=True)[:5]
-
-    repeat_clients = len([row for row in clients if row.visits_count >= 2])
-    clients_with_visit = len([row for row in clients if row.visits_count > 0])
-
-    cards = [
-        MetricCard(code="revenue_total", title="Выручка", value=revenue_total),
-        MetricCard(code="avg_check", title="Средний чек", value=avg_check),
-        MetricCard(code="clients_total", title="Клиенты в базе", value=len(clients)),
-        MetricCard(code="conversion_purchase", title="Конверсия в покупку", value=conversion_purchase),
-        MetricCard(code="future_bookings_revenue", title="План выручки по записям", value=future_revenue_forecast),
-        MetricCard(code="inventory_valuation", title="Оценка склада", value=inventory_valuation),
-    ]
-
-    sales_funnel = [
-        ControlTowerSalesFunnelStage(
-            code="clients",
-            title="Клиенты в базе",
-            clients=len(clients),
-            conversion_percent=100.0 if clients else 0.0,
-        ),
-        ControlTowerSalesFunnelStage(
-            code="engaged",
-            title="С визитом",
-            clients=clients_with_visit,
-            conversion_percent=_percent(clients_with_visit, len(clients)),
-        ),
-        ControlTowerSalesFunnelStage(
-            code="buyers",
-            title="Покупатели",
-            clients=len(buyers_ids),
-            conversion_percent=conversion_purchase,
-        ),
-        ControlTowerSalesFunnelStage(
-            code="repeat",
-            title="Повторные",
-            clients=repeat_clients,
-            conversion_percent=_percent(repeat_clients, len(clients)),
-        ),
+        for x in results
     ]
+    simulation = PromotionSimulationInfo(
+        draws=req.draws,
+        avg_check_mean_rub=round(inputs.check_mean_rub, 2),
+        avg_check_sd_rub=round(inputs.check_sd_rub, 2),
+        conversion_cv=round(inputs.conversion_cv, 4),
+        purchases_observed=inputs.purchases_observed,
+        fitted_from_operations=inputs.fitted,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+    return items, simulation
 
-    profile = db.execute(select(ControlTowerProfile).where(ControlTowerProfile.salon_id == ctx.salon_id)).scalar_one()
-    policy = db.execute(select(ControlTowerPolicy).where(ControlTowerPolicy.salon_id == ctx.salon_id)).scalar_one()
-    process_rows = db.execute(
-        select(ProcessKPIConfig)
-        .where(ProcessKPIConfig.salon_id == ctx.salon_id)
-        .order_by(ProcessKPIConfig.priority_rank.asc())
-    ).scalars().all()
 
-    current_by_code = {
-        "visit_conversion": no_show_risk,
-        "booking_confirmation": _percent(appointments_completed + max(appointments_total - appointments_cancelled - appointments_completed, 0), max(appointments_total, 1)),
-        "sales_conversion": conversion_purchase,
-        "repeat_sales": _percent(repeat_clients, len(clients)),
-        "inventory_health": _percent(out_of_stock_positions, max(len(sku_totals), 1)),
-        "campaign_roi": 125.0,
-        "lead_capture": _percent(clients_with_visit, len(clients)),
+@router.get("/control-tower", response_model=ControlTowerAnalyticsResponse)
+def control_tower_analytics(
+    date_from: int | None = Query(default=None),
+    date_to: int | None = Query(default=None),
+    refresh: bool = Query(default=False),
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(budgeted_db("control-tower", read_only=True)),
+) -> ControlTowerAnalyticsResponse:
+    now_ts = int(time.time())
+    config_reads = {
+        "profile": lambda session: session.execute(
+            select(ControlTowerProfile).where(ControlTowerProfile.salon_id == ctx.salon_id)
+        ).scalar_one(),
+        "policy": lambda session: session.execute(
+            select(ControlTowerPolicy).where(ControlTowerPolicy.salon_id == ctx.salon_id)
+        ).scalar_one(),
+        "processes": lambda session: session.execute(
+            select(ProcessKPIConfig)
+            .where(ProcessKPIConfig.salon_id == ctx.salon_id)
+            .order_by(ProcessKPIConfig.priority_rank.asc())
+        ).scalars().all(),
     }
+    if date_from is None and date_to is None:
+        # default window is served from the materialized snapshot kept fresh by the background refresher
+        snapshot = None if refresh else get_snapshot(db, salon_id=ctx.salon_id)
+        if snapshot is None:
+            snapshot = refresh_snapshot_detached(salon_id=ctx.salon_id, info=db.info)
+        metrics = json.loads(snapshot.payload_json)
+        computed_at = snapshot.computed_at
+        is_stale = is_snapshot_stale(snapshot, now_ts)
+        results = {key: read(db) for key, read in config_reads.items()}
+    else:
+        start_ts, end_ts = _range_bounds(date_from, date_to)
+        # metric and config statements are independent and fan out together before the session's first read
+        metric_reads = control_tower_reads(salon_id=ctx.salon_id, start_ts=start_ts, end_ts=end_ts, now_ts=now_ts)
+        results = run_parallel_reads(db, {**metric_reads, **config_reads})
+        metrics = build_control_tower_metrics(results)
+        computed_at = now_ts
+        is_stale = False
+    current_by_code = metrics["current_by_code"]
+    profile, policy, process_rows = results["profile"], results["policy"], results["processes"]
 
     process_kpis: list[ProcessKPIItem] = []
     action_plan: list[ControlTowerActionItem] = []
@@ -1036,30 +1592,10 @@ def control_tower_analytics(
         )
 
     return ControlTowerAnalyticsResponse(
-        cards=cards,
-        sales_funnel=sales_funnel,
-        bookings=ControlTowerBookingStats(
-            appointments_total=appointments_total,
-            appointments_completed=appointments_completed,
-            appointments_cancelled=appointments_cancelled,
-            no_show_risk_percent=no_show_risk,
-            future_bookings_total=future_bookings_total,
-            future_bookings_revenue_forecast_rub=future_revenue_forecast,
-        ),
-        inventory=ControlTowerInventoryStats(
-            sku_total=len(sku_totals),
-            inventory_valuation_rub=int(inventory_valuation),
-            low_stock_positions=low_stock_positions,
-            out_of_stock_positions=out_of_stock_positions,
-            top_stock_items=[
-                MetricCard(
-                    code=f"stock_item_{idx + 1}",
-                    title=str(item["name"]),
-                    value=int(item["quantity"]),
-                )
-                for idx, item in enumerate(top_stock_items)
-            ],
-        ),
+        cards=[MetricCard(**item) for item in metrics["cards"]],
+        sales_funnel=[ControlTowerSalesFunnelStage(**item) for item in metrics["sales_funnel"]],
+        bookings=ControlTowerBookingStats(**metrics["bookings"]),
+        inventory=ControlTowerInventoryStats(**metrics["inventory"]),
         action_plan=action_plan,
         process_kpis=process_kpis,
         policy=_serialize_policy(policy),
@@ -1069,6 +1605,9 @@ def control_tower_analytics(
             dashboard_focus=profile.dashboard_focus,
             onboarding_completed=profile.onboarding_completed,
         ),
+        computed_at=computed_at,
+        staleness_seconds=max(now_ts - computed_at, 0),
+        is_stale=is_stale,
     )
 
 
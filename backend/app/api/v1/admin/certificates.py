@@ -3,15 +3,17 @@ from __future__ import annotations
 import time
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, require_roles
+from app.core.executors import pooled_route
 from app.models import Certificate
 from app.schemas.certificates import CertificateCreateRequest, CertificateListResponse, CertificateOut
+from app.services.pagination_service import paginate
 from app.services.security_service import write_audit
 
-router = APIRouter(prefix="/admin/certificates", tags=["admin.certificates"])
+router = APIRouter(prefix="/admin/certificates", tags=["admin.certificates"], route_class=pooled_route("interactive"))
 
 
 @router.get("", response_model=CertificateListResponse)
@@ -19,21 +21,29 @@ def list_certificates(
     status: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
 ) -> CertificateListResponse:
     q = select(Certificate).where(Certificate.salon_id == ctx.salon_id)
     if status:
         q = q.where(Certificate.status == status)
-    q = q.order_by(Certificate.created_at.desc())
-
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    rows = db.execute(q.offset((page - 1) * page_size).limit(page_size)).scalars().all()
+    result = paginate(
+        db,
+        q,
+        order=[(Certificate.created_at, True), (Certificate.id, True)],
+        key=lambda x: (x.created_at, x.id),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+    )
     return CertificateListResponse(
-        items=[CertificateOut.model_validate(x, from_attributes=True) for x in rows],
+        items=[CertificateOut.model_validate(x, from_attributes=True) for x in result.rows],
         page=page,
         page_size=page_size,
-        total=int(total),
+        **result.meta(),
     )
 
 
@@ -1,31 +1,44 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, require_roles
+from app.core.config import settings
+from app.core.executors import iterate_in_pool, run_in_pool
+from app.models.client_score import RFM_SEGMENT_PATTERN
 from app.schemas.clients import (
     ClientCardOut,
     ClientCreateRequest,
     ClientGroupRuleInput,
     ClientGroupRuleOut,
     ClientGroupRulesResponse,
+    ClientImportJobOut,
     ClientListResponse,
     ClientOut,
     ClientUpdateRequest,
 )
+from app.services.client_import_service import (
+    client_import_out,
+    get_client_import,
+    import_format,
+    save_import_upload,
+    start_client_import,
+)
 from app.services.clients_service import (
-    client_to_dict,
+    CLIENT_EXPORT_HEADER,
+    clients_out,
     create_client,
     get_client,
     get_client_card,
+    iter_client_export_batches,
     list_clients,
     list_group_rules,
-    render_clients_export_csv,
     replace_group_rules,
     update_client,
 )
+from app.services.export_stream_service import stream_csv, stream_xlsx
 
 router = APIRouter(prefix="/admin/clients", tags=["admin.clients"])
 
@@ -35,15 +48,29 @@ def get_clients(
     q: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    rfm_segment: str | None = Query(default=None, pattern=RFM_SEGMENT_PATTERN),
+    sort: str = Query(default="new", pattern="^(new|relevance)$"),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
 ) -> ClientListResponse:
-    items, total = list_clients(db, salon_id=ctx.salon_id, query=q, page=page, page_size=page_size)
+    result = list_clients(
+        db,
+        salon_id=ctx.salon_id,
+        query=q,
+        page=page,
+        page_size=page_size,
+        rfm_segment=rfm_segment,
+        sort=sort,
+        cursor=cursor,
+        with_total=with_total,
+    )
     return ClientListResponse(
-        items=[ClientOut(**client_to_dict(db, x)) for x in items],
+        items=clients_out(db, result.rows),
         page=page,
         page_size=page_size,
-        total=total,
+        **result.meta(),
     )
 
 
@@ -83,20 +110,64 @@ def post_create_client(
         children=[x.model_dump() for x in req.children],
         loyalty_programs=[x.model_dump() for x in req.loyalty_programs],
     )
-    return ClientOut(**client_to_dict(db, row))
+    return clients_out(db, [row])[0]
 
 
-@router.get("/export.csv", response_class=PlainTextResponse)
+@router.get("/export.csv", response_class=StreamingResponse)
+@run_in_pool("reports")
 def get_export_csv(
+    gzip: bool = Query(default=False),
+    ctx=Depends(require_roles("owner", "admin")),
+) -> StreamingResponse:
+    batches = iter_client_export_batches(salon_id=ctx.salon_id, batch_size=settings.CLIENT_EXPORT_BATCH_SIZE)
+    filename = "clients_export.csv.gz" if gzip else "clients_export.csv"
+    return StreamingResponse(
+        iterate_in_pool("reports", stream_csv(CLIENT_EXPORT_HEADER, batches, compress=gzip)),
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@router.get("/export.xlsx", response_class=StreamingResponse)
+@run_in_pool("reports")
+def get_export_xlsx(
+    ctx=Depends(require_roles("owner", "admin")),
+) -> StreamingResponse:
+    batches = iter_client_export_batches(salon_id=ctx.salon_id, batch_size=settings.CLIENT_EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        iterate_in_pool("reports", stream_xlsx(CLIENT_EXPORT_HEADER, batches, sheet_name="Клиенты")),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": "attachment; filename=clients_export.xlsx"},
+    )
+
+
+@router.post("/import", response_model=ClientImportJobOut, status_code=202)
+def post_import_clients(
+    file: UploadFile = File(...),
+    file_format: str | None = Query(default=None, alias="format", pattern="^(csv|jsonl)$"),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
-) -> PlainTextResponse:
-    payload = render_clients_export_csv(db, salon_id=ctx.salon_id)
-    return PlainTextResponse(
-        content=payload,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=clients_export.csv"},
+) -> ClientImportJobOut:
+    filename = file.filename or ""
+    path = save_import_upload(file.file)
+    job = start_client_import(
+        db,
+        salon_id=ctx.salon_id,
+        actor_user_id=ctx.user_id,
+        filename=filename,
+        file_format=import_format(filename, file_format),
+        path=path,
     )
+    return client_import_out(job)
+
+
+@router.get("/import/{job_id}", response_model=ClientImportJobOut)
+def get_import_job(
+    job_id: int,
+    ctx=Depends(require_roles("owner", "admin")),
+    db: Session = Depends(get_db),
+) -> ClientImportJobOut:
+    return client_import_out(get_client_import(db, salon_id=ctx.salon_id, job_id=job_id))
 
 
 @router.get("/groups/rules", response_model=ClientGroupRulesResponse)
@@ -146,7 +217,7 @@ def get_client_by_id(
     db: Session = Depends(get_db),
 ) -> ClientOut:
     row = get_client(db, salon_id=ctx.salon_id, client_id=client_id)
-    return ClientOut(**client_to_dict(db, row))
+    return clients_out(db, [row])[0]
 
 
 @router.get("/{client_id}/card", response_model=ClientCardOut)
@@ -196,4 +267,4 @@ def put_update_client(
         children=[x.model_dump() for x in req.children] if req.children is not None else None,
         loyalty_programs=[x.model_dump() for x in req.loyalty_programs] if req.loyalty_programs is not None else None,
     )
-    return ClientOut(**client_to_dict(db, row))
+    return clients_out(db, [row])[0]
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import time
+from typing import Any, Callable
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import and_, case, func, select
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_roles
-from app.models import Client, Operation, Salon, SystemSettings
+from app.api.deps import budgeted_db, get_db, require_roles
+from app.core.executors import pooled_route
+from app.db.session import run_parallel_reads
+from app.models import Client, Salon, SystemSettings
 from app.schemas.dashboard import (
     BuyersStats,
     DashboardAlert,
@@ -18,51 +21,52 @@ from app.schemas.dashboard import (
     FinanceStats,
     OperationsStats,
 )
+from app.services.local_calendar_service import salon_calendar
+from app.services.operation_rollups_service import load_operation_daily
 
-router = APIRouter(prefix="/admin/dashboard", tags=["admin.dashboard"])
+router = APIRouter(prefix="/admin/dashboard", tags=["admin.dashboard"], route_class=pooled_route("reports"))
 
 
-def _get_summary(db: Session, salon_id: int) -> DashboardSummaryResponse:
+def _today(db: Session, salon_id: int) -> tuple[int, int]:
     now = int(time.time())
-    start_day = now - (now % 86400)
-
-    finance_q = db.execute(
-        select(
-            func.coalesce(func.sum(Operation.amount_rub), 0),
-            func.coalesce(func.sum(Operation.amount_rub - Operation.discount_rub - Operation.referral_discount_rub), 0),
-            func.coalesce(func.sum(Operation.discount_rub + Operation.referral_discount_rub), 0),
-        ).where(and_(Operation.salon_id == salon_id, Operation.created_at >= start_day))
-    ).one()
-
-    operations_q = db.execute(
-        select(
-            func.coalesce(func.sum(case((Operation.op_type == "purchase", 1), else_=0)), 0),
-            func.coalesce(func.sum(case((Operation.op_type == "order", 1), else_=0)), 0),
-            func.coalesce(func.sum(case((Operation.op_type == "refund", 1), else_=0)), 0),
-        ).where(and_(Operation.salon_id == salon_id, Operation.created_at >= start_day))
-    ).one()
-
-    clients_total = db.execute(
-        select(func.count()).select_from(select(Client.id).where(Client.salon_id == salon_id).subquery())
-    ).scalar_one()
-    buyers_new = db.execute(
-        select(func.count()).select_from(
-            select(Client.id)
-            .where(and_(Client.salon_id == salon_id, Client.last_visit_at.is_not(None), Client.last_visit_at >= start_day))
-            .subquery()
-        )
-    ).scalar_one()
-    buyers_digitized = db.execute(
-        select(func.count()).select_from(
-            select(Client.id).where(and_(Client.salon_id == salon_id, Client.tg_id.is_not(None))).subquery()
-        )
-    ).scalar_one()
+    calendar = salon_calendar(db, salon_id)
+    return now, calendar.day_start(calendar.day_key(now))
+
+
+def _summary_reads(salon_id: int, now: int, start_day: int) -> dict[str, Callable[[Session], Any]]:
+    return {
+        "day_rows": lambda db: load_operation_daily(db, salon_id=salon_id, start_ts=start_day, end_ts=now),
+        "clients_total": lambda db: db.execute(
+            select(func.count()).select_from(select(Client.id).where(Client.salon_id == salon_id).subquery())
+        ).scalar_one(),
+        "buyers_new": lambda db: db.execute(
+            select(func.count()).select_from(
+                select(Client.id)
+                .where(and_(Client.salon_id == salon_id, Client.last_visit_at.is_not(None), Client.last_visit_at >= start_day))
+                .subquery()
+            )
+        ).scalar_one(),
+        "buyers_digitized": lambda db: db.execute(
+            select(func.count()).select_from(
+                select(Client.id).where(and_(Client.salon_id == salon_id, Client.tg_id.is_not(None))).subquery()
+            )
+        ).scalar_one(),
+    }
+
+
+def _build_summary(results: dict[str, Any]) -> DashboardSummaryResponse:
+    day_rows = results["day_rows"]
+    turnover = sum(x.turnover_rub for x in day_rows)
+    discount = sum(x.discount_rub for x in day_rows)
+    clients_total = results["clients_total"]
+    buyers_new = results["buyers_new"]
+    buyers_digitized = results["buyers_digitized"]
 
     return DashboardSummaryResponse(
         finance=FinanceStats(
-            turnover_rub=int(finance_q[0] or 0),
-            income_rub=int(finance_q[1] or 0),
-            discount_rub=int(finance_q[2] or 0),
+            turnover_rub=turnover,
+            income_rub=turnover - discount,
+            discount_rub=discount,
         ),
         buyers=BuyersStats(
             total=int(clients_total or 0),
@@ -70,14 +74,18 @@ def _get_summary(db: Session, salon_id: int) -> DashboardSummaryResponse:
             digitized=int(buyers_digitized or 0),
         ),
         operations=OperationsStats(
-            purchases_count=int(operations_q[0] or 0),
-            orders_count=int(operations_q[1] or 0),
-            refunds_count=int(operations_q[2] or 0),
+            purchases_count=sum(x.operations_count for x in day_rows if x.op_type == "purchase"),
+            orders_count=sum(x.operations_count for x in day_rows if x.op_type == "order"),
+            refunds_count=sum(x.operations_count for x in day_rows if x.op_type == "refund"),
         ),
         clients_count=int(clients_total or 0),
     )
 
 
+def _get_summary(db: Session, salon_id: int) -> DashboardSummaryResponse:
+    return _build_summary(run_parallel_reads(db, _summary_reads(salon_id, *_today(db, salon_id))))
+
+
 @router.get("/summary", response_model=DashboardSummaryResponse)
 def get_summary(
     ctx=Depends(require_roles("owner", "admin")),
@@ -89,13 +97,22 @@ def get_summary(
 @router.get("/full", response_model=DashboardFullResponse)
 def get_full_dashboard(
     ctx=Depends(require_roles("owner", "admin")),
-    db: Session = Depends(get_db),
+    db: Session = Depends(budgeted_db("dashboard")),
 ) -> DashboardFullResponse:
-    summary = _get_summary(db, ctx.salon_id)
-    salon = db.execute(select(Salon).where(Salon.id == ctx.salon_id)).scalar_one()
-    settings = db.execute(
-        select(SystemSettings).where(SystemSettings.salon_id == ctx.salon_id)
-    ).scalar_one_or_none()
+    # summary counters, the salon and its settings are independent reads and fan out together
+    results = run_parallel_reads(
+        db,
+        {
+            **_summary_reads(ctx.salon_id, *_today(db, ctx.salon_id)),
+            "salon": lambda session: session.execute(select(Salon).where(Salon.id == ctx.salon_id)).scalar_one(),
+            "settings": lambda session: session.execute(
+                select(SystemSettings).where(SystemSettings.salon_id == ctx.salon_id)
+            ).scalar_one_or_none(),
+        },
+    )
+    summary = _build_summary(results)
+    salon = results["salon"]
+    settings = results["settings"]
 
     alerts: list[DashboardAlert] = []
     if salon.subscription_ends_at is None or salon.subscription_ends_at - int(time.time()) < 7 * 86400:
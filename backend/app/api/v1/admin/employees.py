@@ -7,6 +7,7 @@ from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, require_roles
+from app.core.executors import run_in_pool
 from app.schemas.employees import (
     EmployeeCategoryCreateRequest,
     EmployeeCategoryOut,
@@ -359,6 +360,7 @@ def get_export_json(
 
 
 @router.get("/export.csv", response_class=PlainTextResponse)
+@run_in_pool("reports")
 def get_export_csv(
     full_name: str | None = Query(default=None),
     period_start: date = Query(...),
@@ -33,10 +33,14 @@ def get_dialogues(
     q: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin", "operator")),
     db: Session = Depends(get_db),
 ) -> DialogueListResponse:
-    rows, total = list_dialogues(db, salon_id=ctx.salon_id, query=q, page=page, page_size=page_size)
+    result = list_dialogues(
+        db, salon_id=ctx.salon_id, query=q, page=page, page_size=page_size, cursor=cursor, with_total=with_total
+    )
     items = [
         DialogueItem(
             client_id=r[0],
@@ -47,9 +51,9 @@ def get_dialogues(
             last_message_text=r[5] or "",
             last_message_channel=r[6] or "telegram",
         )
-        for r in rows
+        for r in result.rows
     ]
-    return DialogueListResponse(items=items, page=page, page_size=page_size, total=total)
+    return DialogueListResponse(items=items, page=page, page_size=page_size, **result.meta())
 
 
 @router.get("/messages", response_model=MessageRegistryResponse)
@@ -62,10 +66,12 @@ def get_messages_registry(
     channel: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=25, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin", "operator")),
     db: Session = Depends(get_db),
 ) -> MessageRegistryResponse:
-    rows, total = list_messages_registry(
+    result = list_messages_registry(
         db,
         salon_id=ctx.salon_id,
         message_date=message_date,
@@ -76,6 +82,8 @@ def get_messages_registry(
         channel=channel,
         page=page,
         page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
     )
     items = [
         MessageRegistryItem(
@@ -90,9 +98,9 @@ def get_messages_registry(
             created_at=r[8],
             scheduled_for=r[9],
         )
-        for r in rows
+        for r in result.rows
     ]
-    return MessageRegistryResponse(items=items, page=page, page_size=page_size, total=total)
+    return MessageRegistryResponse(items=items, page=page, page_size=page_size, **result.meta())
 
 
 @router.get("/{client_id}", response_model=DialogueHistoryResponse)
@@ -17,6 +17,7 @@ from app.schemas.news import (
     NewsStatsOut,
     NewsTrackRequest,
 )
+from app.services.pagination_service import paginate
 from app.services.security_service import write_audit
 
 router = APIRouter(prefix="/admin/news", tags=["admin.news"])
@@ -27,20 +28,29 @@ def list_news(
     status: str | None = Query(default=None, pattern="^(active|archived|draft)$"),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
 ) -> NewsListResponse:
     q = select(NewsPost).where(NewsPost.salon_id == ctx.salon_id)
     if status:
         q = q.where(NewsPost.status == status)
-    q = q.order_by(NewsPost.id.desc())
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    rows = db.execute(q.offset((page - 1) * page_size).limit(page_size)).scalars().all()
+    result = paginate(
+        db,
+        q,
+        order=[(NewsPost.id, True)],
+        key=lambda x: (x.id,),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+    )
     return NewsListResponse(
-        items=[NewsPostOut.model_validate(x, from_attributes=True) for x in rows],
+        items=[NewsPostOut.model_validate(x, from_attributes=True) for x in result.rows],
         page=page,
         page_size=page_size,
-        total=int(total),
+        **result.meta(),
     )
 
 
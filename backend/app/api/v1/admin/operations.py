@@ -3,15 +3,18 @@ from __future__ import annotations
 import time
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, require_roles
+from app.core.executors import pooled_route
 from app.models import Client, Operation
 from app.schemas.operations import OperationCreateRequest, OperationListResponse, OperationOut
+from app.services.operation_rollups_service import apply_operation
+from app.services.pagination_service import paginate
 from app.services.security_service import write_audit
 
-router = APIRouter(prefix="/admin/operations", tags=["admin.operations"])
+router = APIRouter(prefix="/admin/operations", tags=["admin.operations"], route_class=pooled_route("interactive"))
 
 
 @router.get("", response_model=OperationListResponse)
@@ -21,6 +24,8 @@ def list_ops(
     op_type: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
 ) -> OperationListResponse:
@@ -31,15 +36,21 @@ def list_ops(
         q = q.where(Operation.created_at <= date_to)
     if op_type:
         q = q.where(Operation.op_type == op_type)
-    q = q.order_by(Operation.created_at.desc())
-
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    items = db.execute(q.offset((page - 1) * page_size).limit(page_size)).scalars().all()
+    result = paginate(
+        db,
+        q,
+        order=[(Operation.created_at, True), (Operation.id, True)],
+        key=lambda x: (x.created_at, x.id),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+    )
     return OperationListResponse(
-        items=[OperationOut.model_validate(x, from_attributes=True) for x in items],
+        items=[OperationOut.model_validate(x, from_attributes=True) for x in result.rows],
         page=page,
         page_size=page_size,
-        total=int(total),
+        **result.meta(),
     )
 
 
@@ -64,11 +75,14 @@ def create_op(
         created_at=int(time.time()),
     )
     db.add(row)
+    apply_operation(db, row)
 
     if req.op_type in {"purchase", "order"}:
         client.visits_count += 1
         client.total_spent_rub += max(req.amount_rub - req.discount_rub - req.referral_discount_rub, 0)
         client.last_visit_at = row.created_at
+    if req.op_type == "purchase" and client.first_purchase_at is None:
+        client.first_purchase_at = row.created_at
 
     write_audit(
         db,
@@ -3,7 +3,7 @@ from __future__ import annotations
 import time
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, require_roles
@@ -30,6 +30,7 @@ from app.schemas.products import (
     StockMovementListResponse,
     StockMovementOut,
 )
+from app.services.pagination_service import paginate
 from app.services.security_service import write_audit
 
 router = APIRouter(prefix="/admin/products", tags=["admin.products"])
@@ -111,6 +112,8 @@ def list_products(
     item_type: str | None = Query(default=None, pattern=r"^(product|service)$"),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
 ) -> ProductListResponse:
@@ -128,15 +131,21 @@ def list_products(
         query = query.where(Product.category == category)
     if item_type:
         query = query.where(Product.item_type == item_type)
-    query = query.order_by(Product.id.desc())
-
-    total = db.execute(select(func.count()).select_from(query.subquery())).scalar_one()
-    items = db.execute(query.offset((page - 1) * page_size).limit(page_size)).scalars().all()
+    result = paginate(
+        db,
+        query,
+        order=[(Product.id, True)],
+        key=lambda x: (x.id,),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+    )
     return ProductListResponse(
-        items=[_product_out(db, x) for x in items],
+        items=[_product_out(db, x) for x in result.rows],
         page=page,
         page_size=page_size,
-        total=int(total),
+        **result.meta(),
     )
 
 
@@ -269,6 +278,8 @@ def list_movements(
     date_to: int | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
 ) -> StockMovementListResponse:
@@ -284,14 +295,21 @@ def list_movements(
     if date_to is not None:
         query = query.where(StockMovement.occurred_at <= date_to)
 
-    query = query.order_by(StockMovement.id.desc())
-    total = db.execute(select(func.count()).select_from(query.subquery())).scalar_one()
-    rows = db.execute(query.offset((page - 1) * page_size).limit(page_size)).scalars().all()
+    result = paginate(
+        db,
+        query,
+        order=[(StockMovement.id, True)],
+        key=lambda row: (row.id,),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+    )
     return StockMovementListResponse(
-        items=[_movement_out(db, row) for row in rows],
+        items=[_movement_out(db, row) for row in result.rows],
         page=page,
         page_size=page_size,
-        total=int(total),
+        **result.meta(),
     )
 
 
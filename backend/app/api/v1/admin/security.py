@@ -14,10 +14,14 @@ router = APIRouter(prefix="/admin/audit-log", tags=["admin.security"])
 def get_audit(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=True),
     ctx=Depends(require_roles("owner", "admin")),
     db: Session = Depends(get_db),
 ) -> AuditLogListResponse:
-    items, total = list_audit(db, salon_id=ctx.salon_id, page=page, page_size=page_size)
+    result = list_audit(
+        db, salon_id=ctx.salon_id, page=page, page_size=page_size, cursor=cursor, with_total=with_total
+    )
     out = [
         AuditLogOut(
             id=x.id,
@@ -28,6 +32,6 @@ def get_audit(
             meta_json=x.meta_json,
             created_at=x.created_at,
         )
-        for x in items
+        for x in result.rows
     ]
-    return AuditLogListResponse(items=out, page=page, page_size=page_size, total=total)
\ No newline at end of file
+    return AuditLogListResponse(items=out, page=page, page_size=page_size, **result.meta())
\ No newline at end of file
@@ -7,6 +7,7 @@ from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.core.executors import pooled_route
 from app.core.security import SecurityError, verify_telegram_init_data
 from app.models import Appointment, Employee, Product, Salon
 from app.schemas.appointments import (
@@ -22,7 +23,7 @@ from app.schemas.appointments import (
 from app.services.appointments_service import create_client_booking
 from app.services.clients_service import get_or_create_client_by_tg_id
 
-router = APIRouter(prefix="/app/appointments", tags=["app.appointments"])
+router = APIRouter(prefix="/app/appointments", tags=["app.appointments"], route_class=pooled_route("interactive"))
 
 
 def _resolve_salon_id(db: Session) -> int:
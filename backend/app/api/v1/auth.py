@@ -4,11 +4,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.core.executors import pooled_route
 from app.core.security import SecurityError, verify_telegram_init_data
 from app.schemas.auth import VerifyInitDataRequest, VerifyInitDataResponse
 from app.services.auth_service import login_with_telegram
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=pooled_route("interactive"))
 
 
 @router.post("/telegram/verify", response_model=VerifyInitDataResponse)
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.core.executors import pooled_route
 from app.core.security import SecurityError, verify_telegram_init_data
 from app.models import Feedback, Message, Salon
 from app.schemas.app_feedback import (
@@ -17,7 +18,7 @@ from app.schemas.app_feedback import (
 )
 from app.services.clients_service import get_or_create_client_by_tg_id
 
-router = APIRouter(prefix="/feedback/app", tags=["app.feedback"])
+router = APIRouter(prefix="/feedback/app", tags=["app.feedback"], route_class=pooled_route("interactive"))
 
 
 def _resolve_salon_id(db: Session) -> int:
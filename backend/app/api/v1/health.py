@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from fastapi import APIRouter
 
+from app.core.config import settings
+from app.core.executors import executor_stats
 from app.db.session import db_healthcheck
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -10,3 +12,8 @@ router = APIRouter(prefix="/health", tags=["health"])
 @router.get("")
 def health() -> dict:
     return {"status": "ok", "db": "ok" if db_healthcheck() else "fail"}
+
+
+@router.get("/pools")
+def pools() -> dict:
+    return {"enabled": settings.EXECUTOR_POOLS_ENABLED, "pools": executor_stats()}
@@ -28,6 +28,37 @@ class Settings(BaseSettings):
 
     CORS_ALLOW_ORIGINS: str = "*"
 
+    ANALYTICS_CACHE_ENABLED: bool = True
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 512
+    ANALYTICS_CACHE_TTL_SECONDS: int = 60
+
+    CONTROL_TOWER_REFRESHER_ENABLED: bool = True
+    CONTROL_TOWER_SNAPSHOT_MAX_AGE_SECONDS: int = 300
+    CONTROL_TOWER_REFRESH_POLL_SECONDS: int = 15
+
+    QUERY_FANOUT_ENABLED: bool = True
+    QUERY_FANOUT_MAX_WORKERS: int = 4
+    QUERY_FANOUT_TIMEOUT_SECONDS: float = 5.0
+    READ_ONLY_SESSIONS_ENABLED: bool = True
+    PAGINATION_COUNT_LIMIT: int = 10_000  # totals of cursor pages are counted up to this many rows
+    CLIENT_EXPORT_BATCH_SIZE: int = 1000
+    CLIENT_IMPORT_BATCH_SIZE: int = 2000
+    CLIENT_IMPORT_MAX_BYTES: int = 200 * 1024 * 1024
+    CLIENT_IMPORT_MAX_ERRORS: int = 100  # rejected rows reported back per import job
+
+    EXECUTOR_POOLS_ENABLED: bool = True
+    EXECUTOR_POOLS: str = "reports=4:16,interactive=8"  # name=workers[:max_queue],...
+
+    QUERY_BUDGET_ENABLED: bool = True
+    QUERY_BUDGET_SECONDS: float = 5.0
+    QUERY_BUDGET_MAX_STEPS: int = 500_000_000  # SQLite VM instructions per request
+    QUERY_BUDGET_OVERRIDES: str = "batch=15:1500000000"  # endpoint=seconds[:steps],...
+
+    ANALYTICS_ENGINE: str = "sqlite"  # sqlite/columnar; columnar needs the optional duckdb dependency
+    ANALYTICS_MIRROR_DIR: str = "../data/analytics_mirror"
+    ANALYTICS_MIRROR_EXPORT_SECONDS: int = 600
+    ANALYTICS_MIRROR_BATCH_ROWS: int = 50_000
+
     @field_validator("DATABASE_URL")
     @classmethod
     def validate_db_url(cls, value: str) -> str:
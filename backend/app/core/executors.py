@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from fastapi import Request, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+_DONE = object()
+
+
+class PoolSaturated(Exception):
+    def __init__(self, pool: str, queued: int) -> None:
+        super().__init__(f"executor pool {pool} is saturated")
+        self.pool = pool
+        self.queued = queued
+
+    def payload(self) -> dict:
+        return {
+            "code": "pool_saturated",
+            "message": "Сервер перегружен, повторите запрос позже",
+            "pool": self.pool,
+            "queued": self.queued,
+        }
+
+
+class NamedExecutor:
+    # a dedicated thread pool for one class of sync endpoints; max_queue == 0 means an unbounded queue
+    def __init__(self, name: str, workers: int, max_queue: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=f"pool-{self.name}")
+            return self._pool
+
+    async def run(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+        return await self._submit(fn, args, kwargs, bounded=True)
+
+    async def iterate(self, chunks: Iterator[Any]) -> AsyncIterator[Any]:
+        # every step of a sync iterator runs here; steps of an admitted stream skip the queue limit,
+        # so a download is never cut off halfway by a busy pool
+        try:
+            while True:
+                chunk = await self._submit(next, (chunks, _DONE), {}, bounded=False)
+                if chunk is _DONE:
+                    return
+                yield chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    async def _submit(self, fn: Callable[..., Any], args: tuple, kwargs: dict[str, Any], *, bounded: bool) -> Any:
+        with self._lock:
+            if bounded and self.max_queue and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(self.name, self.queued)
+            self.queued += 1
+        submitted = time.monotonic()
+        claimed = False
+
+        def task() -> Any:
+            nonlocal claimed
+            waited = time.monotonic() - submitted
+            with self._lock:
+                if claimed:
+                    return None
+                claimed = True
+                self.queued -= 1
+                self.active += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        context = contextvars.copy_context()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), context.run, task)
+        except asyncio.CancelledError:
+            # a request dropped while still queued gives its place back and never runs
+            with self._lock:
+                if not claimed:
+                    claimed = True
+                    self.queued -= 1
+            raise
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_avg_ms": round(self.wait_total / started * 1000, 2) if started else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 2),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_pools(raw: str) -> dict[str, NamedExecutor]:
+    # EXECUTOR_POOLS="reports=4:16,interactive=8" -> name=workers[:max_queue]
+    pools: dict[str, NamedExecutor] = {}
+    for item in raw.split(","):
+        name, _, value = item.strip().partition("=")
+        if not name or not value:
+            continue
+        workers, _, max_queue = value.partition(":")
+        pools[name] = NamedExecutor(name, max(int(workers), 1), int(max_queue or 0))
+    return pools
+
+
+EXECUTORS = _parse_pools(settings.EXECUTOR_POOLS)
+_REQUEST_PARAM = "_pool_request"
+
+
+def render_response(route: APIRoute | None, content: Any) -> Any:
+    # validation and serialization against the route's response model, done by the caller's thread; FastAPI
+    # would do it on the event loop for an async endpoint. A Response passes through untouched
+    if isinstance(content, Response) or route is None:
+        return content
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    field = route.response_field
+    if field is None:
+        return response_class(jsonable_encoder(content), status_code=route.status_code or 200)
+    value, errors = field.validate(content, {}, loc=("response",))
+    if errors:
+        raise ResponseValidationError(errors, body=content)
+    payload = field.serialize(
+        value,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+    return response_class(payload, status_code=route.status_code or 200)
+
+
+def run_in_pool(pool: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    # sync endpoints marked with a pool run there instead of the shared default threadpool, together with
+    # the validation and serialization of their result; an unknown or disabled pool leaves the endpoint
+    # untouched. Sync dependencies are still resolved by FastAPI on its default threadpool
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        executor = EXECUTORS.get(pool)
+        if executor is None or not settings.EXECUTOR_POOLS_ENABLED or asyncio.iscoroutinefunction(fn):
+            return fn
+
+        def call(request: Request, args: tuple, kwargs: dict[str, Any]) -> Any:
+            route = request.scope.get("route")
+            return render_response(route if isinstance(route, APIRoute) else None, fn(*args, **kwargs))
+
+        @functools.wraps(fn)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            request = kwargs.pop(_REQUEST_PARAM)
+            return await executor.run(call, request, args, kwargs)
+
+        # the request is injected under a private name so the route it matched can be read back
+        signature = inspect.signature(fn)
+        endpoint.__signature__ = signature.replace(  # type: ignore[attr-defined]
+            parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ]
+        )
+        return endpoint
+
+    return decorate
+
+
+def iterate_in_pool(pool: str, chunks: Iterator[Any]) -> AsyncIterator[Any] | Iterator[Any]:
+    # body of a streaming response produced step by step on a pool; without one Starlette iterates the
+    # sync iterator on its default threadpool
+    executor = EXECUTORS.get(pool)
+    if executor is None or not settings.EXECUTOR_POOLS_ENABLED:
+        return chunks
+    return executor.iterate(chunks)
+
+
+def pooled_route(pool: str) -> type[APIRoute]:
+    # route class for routers whose endpoints all belong to one pool
+    class PooledRoute(APIRoute):
+        def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+            super().__init__(path, run_in_pool(pool)(endpoint), **kwargs)
+
+    return PooledRoute
+
+
+def executor_stats() -> dict[str, dict[str, Any]]:
+    return {name: executor.stats() for name, executor in EXECUTORS.items()}
+
+
+def shutdown_executors() -> None:
+    for executor in EXECUTORS.values():
+        executor.shutdown()
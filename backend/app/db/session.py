@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
 from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
 
@@ -31,6 +37,141 @@ def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:  # type: ig
         pass
 
 
+def begin_read_snapshot(db: Session) -> None:
+    # pysqlite opens a transaction only before the first write; pin one WAL snapshot for the reads that follow
+    raw = db.connection().connection.driver_connection
+    if not raw.in_transaction:
+        raw.execute("BEGIN")
+
+
+@event.listens_for(Session, "after_begin")
+def _pin_read_only_snapshot(session: Session, transaction, connection) -> None:  # type: ignore[no-untyped-def]
+    # a read-only session keeps one deferred read transaction for the whole request: it takes no lock,
+    # the WAL snapshot is fixed by the first statement and released by the closing rollback
+    if session.info.get("read_only") and connection.dialect.name == "sqlite":
+        raw = connection.connection.driver_connection
+        if not raw.in_transaction:
+            raw.execute("BEGIN")
+
+
+@event.listens_for(Session, "before_flush")
+def _refuse_read_only_flush(session: Session, flush_context, instances) -> None:  # type: ignore[no-untyped-def]
+    if session.info.get("read_only"):
+        raise InvalidRequestError("read-only session cannot flush changes")
+
+
+_fanout_lock = threading.Lock()
+_fanout_pool: ThreadPoolExecutor | None = None
+_fanout_idle = 0
+
+
+def _reserve_fanout_threads(wanted: int) -> int:
+    # lanes only go to idle threads of the shared pool: a lane queued behind the lanes of another request
+    # would keep its barrier waiting until the timeout
+    global _fanout_pool, _fanout_idle
+    with _fanout_lock:
+        if _fanout_pool is None:
+            _fanout_pool = ThreadPoolExecutor(settings.QUERY_FANOUT_MAX_WORKERS, thread_name_prefix="db-fanout")
+            _fanout_idle = settings.QUERY_FANOUT_MAX_WORKERS
+        taken = min(wanted, _fanout_idle)
+        if taken < 2:
+            return 0
+        _fanout_idle -= taken
+        return taken
+
+
+def _release_fanout_threads(count: int) -> None:
+    global _fanout_idle
+    with _fanout_lock:
+        _fanout_idle += count
+
+
+def stop_parallel_reads() -> None:
+    global _fanout_pool, _fanout_idle
+    with _fanout_lock:
+        pool, _fanout_pool, _fanout_idle = _fanout_pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def run_parallel_reads(db: Session, reads: dict[str, Callable[[Session], Any]]) -> dict[str, Any]:
+    # independent read-only statements are spread over a few pooled connections and run concurrently.
+    # Every worker pins its own WAL snapshot without taking any lock; when PRAGMA data_version of the
+    # request connection shows that no commit landed while they were pinning, all of them see the same
+    # state. Otherwise, or on any hiccup, the reads run in sequence on `db`. A read-only session pins its
+    # snapshot on its first statement: before that the fan-out runs first and a spare connection watches
+    # data_version, afterwards its reads stay on the pinned snapshot in sequence
+    read_only = bool(db.info.get("read_only"))
+    wanted = min(len(reads), settings.QUERY_FANOUT_MAX_WORKERS, os.cpu_count() or 1)
+    if (
+        not settings.QUERY_FANOUT_ENABLED
+        or wanted < 2
+        or engine.dialect.name != "sqlite"
+        or engine.url.database in (None, "", ":memory:")
+        or (read_only and db.in_transaction())
+    ):
+        return {key: read(db) for key, read in reads.items()}
+    if read_only:
+        with engine.connect() as observer:
+            return _fan_out(db, reads, observer.connection.driver_connection, wanted)
+    raw = db.connection().connection.driver_connection
+    if raw.in_transaction:
+        return {key: read(db) for key, read in reads.items()}
+    return _fan_out(db, reads, raw, wanted)
+
+
+def _fan_out(db: Session, reads: dict[str, Callable[[Session], Any]], raw: Any, wanted: int) -> dict[str, Any]:
+    workers = _reserve_fanout_threads(wanted)
+    if not workers:
+        return {key: read(db) for key, read in reads.items()}
+
+    def data_version() -> int:
+        return raw.execute("PRAGMA data_version").fetchone()[0]
+
+    keys = list(reads)
+    lanes = [keys[idx::workers] for idx in range(workers)]
+    before = data_version()
+    consistent = threading.Event()
+
+    def check() -> None:
+        # runs once every worker has pinned its snapshot and before any of them reads
+        if data_version() == before:
+            consistent.set()
+
+    pinned = threading.Barrier(workers + 1, action=check, timeout=settings.QUERY_FANOUT_TIMEOUT_SECONDS)
+
+    def run(lane: list[str]) -> dict[str, Any] | None:
+        # the request budget (if any) is carried over to the worker connections
+        with SessionLocal(info=dict(db.info)) as session:
+            try:
+                begin_read_snapshot(session)
+                session.execute(text("SELECT 1 FROM sqlite_master LIMIT 1"))
+                pinned.wait()
+            except threading.BrokenBarrierError:
+                return None
+            except Exception:
+                pinned.abort()
+                raise
+            if not consistent.is_set():
+                return None
+            return {key: reads[key](session) for key in lane}
+
+    try:
+        futures = [_fanout_pool.submit(run, lane) for lane in lanes]
+        try:
+            pinned.wait()
+        except threading.BrokenBarrierError:
+            pinned.abort()
+        done = [future.result() for future in futures]
+    finally:
+        _release_fanout_threads(workers)
+
+    results: dict[str, Any] = {}
+    for lane, values in zip(lanes, done):
+        results.update(values if values is not None else {key: reads[key](db) for key in lane})
+    return {key: results[key] for key in keys}
+
+
 def db_healthcheck() -> bool:
     try:
         with engine.connect() as conn:
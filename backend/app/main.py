@@ -2,19 +2,33 @@ from __future__ import annotations
 
 import time
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import func, inspect, select, text
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, inspect, select, text
 
 from app.api.v1 import router as v1_router
 from app.core.config import settings
+from app.core.executors import PoolSaturated, shutdown_executors
 from app.db.base import Base
-from app.db.session import SessionLocal, engine
+from app.db.session import SessionLocal, engine, stop_parallel_reads
+from app.services.analytics_mirror_service import reset_mirror_tables, start_mirror_exporter, stop_mirror_exporter
+from app.services.client_import_service import fail_interrupted_client_imports, stop_client_imports
+from app.services.client_search_service import ensure_client_search_index
+from app.services.control_tower_service import start_snapshot_refresher, stop_snapshot_refresher
+from app.services.local_calendar_service import backfill_day_keys
+from app.services.operation_rollups_service import rebuild_operation_rollups
+from app.services.query_budget_service import QueryBudgetExceeded
 from app.web_admin import router as web_admin_router
 from app.models import (
+    AppVisitDaySketch,
+    CohortMonthCell,
+    CohortMonthStatus,
     ControlTowerPolicy,
     ControlTowerProfile,
     InventoryLocation,
+    Operation,
+    OperationDailyRollup,
     OutcomeCatalogItem,
     ProcessKPIConfig,
     ReferralProgramGenerationRule,
@@ -28,6 +42,16 @@ from app.models import (
 app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION)
 
 
+@app.exception_handler(QueryBudgetExceeded)
+def _query_budget_exceeded(request: Request, exc: QueryBudgetExceeded) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": exc.payload()}, headers={"Retry-After": "30"})
+
+
+@app.exception_handler(PoolSaturated)
+def _pool_saturated(request: Request, exc: PoolSaturated) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": exc.payload()}, headers={"Retry-After": "5"})
+
+
 def _ensure_column_sqlite(table: str, column_name: str, ddl: str) -> None:
     inspector = inspect(engine)
     columns = {c["name"] for c in inspector.get_columns(table)}
@@ -55,6 +79,11 @@ def _run_startup_schema_patches() -> None:
     _ensure_column_sqlite("clients", "birthday", "birthday VARCHAR(10) NOT NULL DEFAULT ''")
 
     _ensure_column_sqlite("system_settings", "global_search_enabled", "global_search_enabled BOOLEAN NOT NULL DEFAULT 0")
+    _ensure_column_sqlite(
+        "system_settings",
+        "client_level_bounds_csv",
+        "client_level_bounds_csv VARCHAR(128) NOT NULL DEFAULT '1000,5000'",
+    )
 
     _ensure_column_sqlite("messages", "client_tg_id", "client_tg_id INTEGER")
     _ensure_column_sqlite("messages", "channel", "channel VARCHAR(24) NOT NULL DEFAULT 'telegram'")
@@ -84,6 +113,70 @@ def _run_startup_schema_patches() -> None:
     _ensure_column_sqlite("appointments", "duration_minutes", "duration_minutes INTEGER NOT NULL DEFAULT 60")
     _ensure_column_sqlite("appointments", "source", "source VARCHAR(24) NOT NULL DEFAULT 'admin_manual'")
 
+    _ensure_column_sqlite(
+        "booking_month_statuses", "offset_changes", "offset_changes VARCHAR(64) NOT NULL DEFAULT ''"
+    )
+
+
+def _migrate_local_day_keys() -> None:
+    # day buckets used to be UTC days: older databases get day keys in the salon timezone once and their
+    # day-based aggregates rebuilt; rows inserted around the ORM are keyed on every start
+    legacy = "day_key" not in {c["name"] for c in inspect(engine).get_columns("operations")}
+    for table, index in (
+        ("operations", "ix_operations_salon_day"),
+        ("client_analytics", "ix_client_analytics_salon_day"),
+        ("app_page_events", "ix_app_events_salon_day"),
+    ):
+        _ensure_column_sqlite(table, "day_key", "day_key INTEGER")
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} (salon_id, day_key)"))
+
+    with SessionLocal() as db:
+        for salon_id in db.execute(select(Salon.id)).scalars().all():
+            if legacy:
+                rebuild_operation_rollups(db, salon_id=salon_id)
+            else:
+                backfill_day_keys(db, salon_id=salon_id)
+        if legacy:
+            db.execute(delete(AppVisitDaySketch))
+            db.execute(delete(CohortMonthCell))
+            db.execute(delete(CohortMonthStatus))
+            reset_mirror_tables(db, ["operations", "app_page_events"])
+        db.commit()
+
+
+def _backfill_first_purchases() -> None:
+    # the first purchase of a client is kept on the client since the column appeared; older databases get it
+    # from their purchase history once
+    legacy = "first_purchase_at" not in {c["name"] for c in inspect(engine).get_columns("clients")}
+    _ensure_column_sqlite("clients", "first_purchase_at", "first_purchase_at INTEGER")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_clients_salon_first_purchase "
+                "ON clients (salon_id, first_purchase_at)"
+            )
+        )
+        if legacy:
+            conn.execute(
+                text(
+                    "UPDATE clients SET first_purchase_at = (SELECT min(created_at) FROM operations "
+                    "WHERE operations.salon_id = clients.salon_id AND operations.client_id = clients.id "
+                    "AND operations.op_type = 'purchase')"
+                )
+            )
+
+
+def _backfill_operation_rollups() -> None:
+    # databases created before the rollup table existed have operations but no rollups yet
+    with SessionLocal() as db:
+        if db.execute(select(OperationDailyRollup.id).limit(1)).first() is not None:
+            return
+        salon_ids = db.execute(select(Operation.salon_id).distinct()).scalars().all()
+        for salon_id in salon_ids:
+            rebuild_operation_rollups(db, salon_id=salon_id)
+        db.commit()
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -97,6 +190,11 @@ app.add_middleware(
 def startup() -> None:
     Base.metadata.create_all(bind=engine)
     _run_startup_schema_patches()
+    _backfill_first_purchases()
+    _migrate_local_day_keys()
+    _backfill_operation_rollups()
+    with engine.begin() as conn:
+        ensure_client_search_index(conn)
     with SessionLocal() as db:
         salon = db.execute(select(Salon).limit(1)).scalar_one_or_none()
         if salon is None:
@@ -110,6 +208,8 @@ def startup() -> None:
         if salon.moderation_status is None:
             salon.moderation_status = "in_review"
 
+        fail_interrupted_client_imports(db)
+
         settings_row = db.execute(
             select(SystemSettings).where(SystemSettings.salon_id == salon.id)
         ).scalar_one_or_none()
@@ -250,6 +350,17 @@ def startup() -> None:
                     )
                 )
         db.commit()
+    start_snapshot_refresher()
+    start_mirror_exporter()
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    stop_snapshot_refresher()
+    stop_mirror_exporter()
+    stop_client_imports()
+    shutdown_executors()
+    stop_parallel_reads()
 
 
 app.include_router(web_admin_router)
@@ -1,11 +1,16 @@
-from app.models.app_page_event import AppPageEvent
+from app.models.analytics_mirror import AnalyticsMirrorWatermark
+from app.models.app_page_event import AppPageEvent, AppVisitDaySketch
 from app.models.audit_log import AuditLog
+from app.models.booking_rollup import BookingMonthRollup, BookingMonthStatus
 from app.models.campaign import Campaign
 from app.models.certificate import Certificate
 from app.models.client import Client
 from app.models.client_analytics import ClientAnalytics
+from app.models.client_import import ClientImportJob
 from app.models.client_activity import ClientActivity
 from app.models.client_profile import ClientChild, ClientGroupRule, ClientLoyaltyProgram
+from app.models.client_score import ClientScore
+from app.models.cohort import CohortMonthCell, CohortMonthStatus
 from app.models.communication import (
     Appointment,
     CommunicationCampaign,
@@ -14,7 +19,13 @@ from app.models.communication import (
     ReminderDispatch,
     ReminderRule,
 )
-from app.models.control_tower import ControlTowerPolicy, ControlTowerProfile, OutcomeCatalogItem, ProcessKPIConfig
+from app.models.control_tower import (
+    ControlTowerPolicy,
+    ControlTowerProfile,
+    ControlTowerSnapshot,
+    OutcomeCatalogItem,
+    ProcessKPIConfig,
+)
 from app.models.employee import (
     Employee,
     EmployeeCategory,
@@ -24,9 +35,11 @@ from app.models.employee import (
     EmployeeTimeEntry,
 )
 from app.models.feedback import Feedback
+from app.models.forecast_model import ForecastModel
 from app.models.message import Message
 from app.models.news import NewsEvent, NewsPost
 from app.models.operation import Operation
+from app.models.operation_rollup import OperationDailyRollup
 from app.models.referral_program import ReferralProgramGenerationRule, ReferralProgramSetting
 from app.models.product import (
     InventoryLocation,
@@ -42,22 +55,31 @@ from app.models.traffic_channel import TrafficChannel
 from app.models.user import User
 
 __all__ = [
+    "AnalyticsMirrorWatermark",
     "AppPageEvent",
+    "AppVisitDaySketch",
     "Appointment",
     "AuditLog",
+    "BookingMonthRollup",
+    "BookingMonthStatus",
     "Campaign",
     "Certificate",
     "Client",
     "ClientAnalytics",
+    "ClientImportJob",
     "ClientActivity",
     "ClientChild",
     "ClientGroupRule",
     "ClientLoyaltyProgram",
+    "ClientScore",
+    "CohortMonthCell",
+    "CohortMonthStatus",
     "CommunicationCampaign",
     "CommunicationRecipient",
     "CommunicationStep",
     "ControlTowerPolicy",
     "ControlTowerProfile",
+    "ControlTowerSnapshot",
     "Employee",
     "EmployeeCategory",
     "EmployeeHistory",
@@ -65,10 +87,12 @@ __all__ = [
     "EmployeeSchedule",
     "EmployeeTimeEntry",
     "Feedback",
+    "ForecastModel",
     "Message",
     "NewsEvent",
     "NewsPost",
     "Operation",
+    "OperationDailyRollup",
     "OutcomeCatalogItem",
     "ProcessKPIConfig",
     "ReferralProgramGenerationRule",
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class AnalyticsMirrorWatermark(Base):
+    __tablename__ = "analytics_mirror_watermarks"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # highest source id in the mirror
+    last_ts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # highest event time in the mirror
+    rows_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    exported_at: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # source rows older than this are mirrored
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy import ForeignKey, Index, LargeBinary, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -17,8 +17,25 @@ class AppPageEvent(Base):
     visitor_key: Mapped[str] = mapped_column(String(128), nullable=False, default="")
     page_code: Mapped[str] = mapped_column(String(64), nullable=False, default="company")
     created_at: Mapped[int] = mapped_column(nullable=False)
+    day_key: Mapped[int | None] = mapped_column(nullable=True)  # local date in the salon timezone as days since 1970-01-01
 
     __table_args__ = (
         Index("ix_app_events_salon_created", "salon_id", "created_at"),
         Index("ix_app_events_salon_visitor_created", "salon_id", "visitor_key", "created_at"),
+        Index("ix_app_events_salon_day", "salon_id", "day_key"),
+    )
+
+
+class AppVisitDaySketch(Base):
+    __tablename__ = "app_visit_day_sketches"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+
+    day_ts: Mapped[int] = mapped_column(nullable=False)  # unix ts of the local day start, only closed days are stored
+    views_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    visitor_registers: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, default=b"")  # HyperLogLog
+
+    __table_args__ = (
+        UniqueConstraint("salon_id", "day_ts", name="uq_app_visit_sketches_salon_day"),
     )
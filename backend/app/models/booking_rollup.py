@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class BookingMonthRollup(Base):
+    __tablename__ = "booking_month_rollups"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+    month: Mapped[int] = mapped_column(Integer, nullable=False)  # UTC month of starts_at, year * 12 + month - 1
+    weekday: Mapped[int] = mapped_column(Integer, nullable=False)  # local, 0 = Monday
+    hour: Mapped[int] = mapped_column(Integer, nullable=False)  # local
+    employee_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # 0 = without employee
+    service_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # 0 = without service
+    appointments: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cancelled: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "salon_id", "month", "weekday", "hour", "employee_id", "service_id", name="uq_booking_rollups_cell"
+        ),
+        Index("ix_booking_rollups_salon_employee_month", "salon_id", "employee_id", "month"),
+    )
+
+
+class BookingMonthStatus(Base):
+    __tablename__ = "booking_month_statuses"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+    month: Mapped[int] = mapped_column(Integer, nullable=False)
+    utc_offset_seconds: Mapped[int] = mapped_column(Integer, nullable=False)  # weekday/hour were bucketed with it
+    offset_changes: Mapped[str] = mapped_column(String(64), nullable=False, default="")  # "ts:offset" DST switches
+    computed_at: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("salon_id", "month", name="uq_booking_statuses_salon_month"),
+    )
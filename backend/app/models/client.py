@@ -43,10 +43,12 @@ class Client(Base):
     visits_count: Mapped[int] = mapped_column(nullable=False, default=0)
     total_spent_rub: Mapped[int] = mapped_column(nullable=False, default=0)
     last_visit_at: Mapped[int | None] = mapped_column(nullable=True)
+    first_purchase_at: Mapped[int | None] = mapped_column(nullable=True)
 
     __table_args__ = (
         Index("ix_clients_salon_phone", "salon_id", "phone"),
         Index("ix_clients_salon_email", "salon_id", "email"),
         Index("ix_clients_salon_full_name", "salon_id", "full_name"),
         Index("ix_clients_salon_tg", "salon_id", "tg_id"),
+        Index("ix_clients_salon_first_purchase", "salon_id", "first_purchase_at"),
     )
@@ -16,10 +16,12 @@ class ClientAnalytics(Base):
     )
 
     created_at: Mapped[int] = mapped_column(nullable=False)
+    day_key: Mapped[int | None] = mapped_column(nullable=True)  # local date in the salon timezone as days since 1970-01-01
     gender: Mapped[str] = mapped_column(String(16), nullable=False, default="unknown")
     birth_year: Mapped[int | None] = mapped_column(nullable=True)
 
     __table_args__ = (
         Index("ix_client_analytics_salon_created", "salon_id", "created_at"),
         Index("ix_client_analytics_salon_gender", "salon_id", "gender"),
+        Index("ix_client_analytics_salon_day", "salon_id", "day_key"),
     )
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ClientImportJob(Base):
+    __tablename__ = "client_import_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+    actor_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    filename: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    file_format: Mapped[str] = mapped_column(String(8), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")  # queued/running/done/failed
+
+    rows_processed: Mapped[int] = mapped_column(nullable=False, default=0)
+    created_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    duplicate_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    invalid_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    errors_json: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+    error: Mapped[str] = mapped_column(String(500), nullable=False, default="")
+
+    created_at: Mapped[int] = mapped_column(nullable=False)
+    started_at: Mapped[int | None] = mapped_column(nullable=True)
+    finished_at: Mapped[int | None] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        Index("ix_client_import_jobs_salon_created", "salon_id", "created_at"),
+    )
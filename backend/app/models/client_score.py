@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+# ClientScore.segment codes and titles
+RFM_SEGMENTS = {
+    "champions": "Чемпионы",
+    "loyal": "Лояльные",
+    "new": "Новые",
+    "at_risk": "Под угрозой ухода",
+    "lost": "Потерянные",
+    "potential": "Перспективные",
+    "no_purchases": "Без покупок",
+}
+RFM_SEGMENT_PATTERN = "^(" + "|".join(RFM_SEGMENTS) + ")$"
+
+
+class ClientScore(Base):
+    __tablename__ = "client_scores"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+    client_id: Mapped[int] = mapped_column(ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+
+    last_purchase_at: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    frequency: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    monetary_rub: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    r_score: Mapped[int] = mapped_column(Integer, nullable=False, default=1)  # quintiles 1..5, 5 is best
+    f_score: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    m_score: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    rfm_code: Mapped[str] = mapped_column(String(3), nullable=False, default="111")
+    segment: Mapped[str] = mapped_column(String(32), nullable=False, default="no_purchases")
+    computed_at: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("salon_id", "client_id", name="uq_client_scores_salon_client"),
+        Index("ix_client_scores_salon_segment", "salon_id", "segment"),
+        Index("ix_client_scores_salon_rfm", "salon_id", "r_score", "f_score", "m_score"),
+        Index("ix_client_scores_client", "client_id"),
+    )
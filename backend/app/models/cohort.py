@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Index, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class CohortMonthCell(Base):
+    __tablename__ = "cohort_month_cells"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+    activity_month: Mapped[int] = mapped_column(Integer, nullable=False)  # year * 12 + month - 1
+    cohort_month: Mapped[int] = mapped_column(Integer, nullable=False)  # month of the first purchase, same encoding
+    clients: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    purchases: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue_rub: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("salon_id", "activity_month", "cohort_month", name="uq_cohort_cells_salon_month_cohort"),
+        Index("ix_cohort_cells_salon_cohort", "salon_id", "cohort_month"),
+    )
+
+
+class CohortMonthStatus(Base):
+    __tablename__ = "cohort_month_statuses"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+    activity_month: Mapped[int] = mapped_column(Integer, nullable=False)
+    computed_at: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("salon_id", "activity_month", name="uq_cohort_statuses_salon_month"),
+    )
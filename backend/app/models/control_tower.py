@@ -76,3 +76,16 @@ class OutcomeCatalogItem(Base):
         Index("ix_outcome_catalog_items_salon", "salon_id"),
         UniqueConstraint("salon_id", "outcome_code", name="uq_outcome_catalog_salon_code"),
     )
+
+
+class ControlTowerSnapshot(Base):
+    __tablename__ = "control_tower_snapshots"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False, unique=True)
+    window_start: Mapped[int] = mapped_column(Integer, nullable=False)
+    window_end: Mapped[int] = mapped_column(Integer, nullable=False)
+    payload_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    computed_at: Mapped[int] = mapped_column(Integer, nullable=False)
+    source_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    computed_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
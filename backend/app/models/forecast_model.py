@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from sqlalchemy import Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ForecastModel(Base):
+    __tablename__ = "forecast_models"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+    metric: Mapped[str] = mapped_column(String(32), nullable=False)  # new_clients/revenue/bookings
+    method: Mapped[str] = mapped_column(String(32), nullable=False)  # holt_winters/holt/mean
+
+    alpha: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    beta: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    gamma: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    season_length: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    level: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    trend: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    seasonals_json: Mapped[str] = mapped_column(Text, nullable=False, default="[]")  # indexed by local day key % season_length
+
+    last_day_ts: Mapped[int] = mapped_column(Integer, nullable=False)  # unix ts of the start of the last fitted local day
+    observations: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    backtest_days: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    backtest_mae: Mapped[float | None] = mapped_column(Float, nullable=True)
+    backtest_smape_percent: Mapped[float | None] = mapped_column(Float, nullable=True)
+    fitted_at: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("salon_id", "metric", name="uq_forecast_models_salon_metric"),
+        Index("ix_forecast_models_salon", "salon_id"),
+    )
@@ -19,9 +19,11 @@ class Operation(Base):
     referral_discount_rub: Mapped[int] = mapped_column(nullable=False, default=0)
     comment: Mapped[str] = mapped_column(String(1000), nullable=False, default="")
     created_at: Mapped[int] = mapped_column(nullable=False)
+    day_key: Mapped[int | None] = mapped_column(nullable=True)  # local date in the salon timezone as days since 1970-01-01
 
     __table_args__ = (
         Index("ix_operations_salon_created", "salon_id", "created_at"),
         Index("ix_operations_salon_client_created", "salon_id", "client_id", "created_at"),
         Index("ix_operations_salon_type_created", "salon_id", "op_type", "created_at"),
+        Index("ix_operations_salon_day", "salon_id", "day_key"),
     )
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Index, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class OperationDailyRollup(Base):
+    __tablename__ = "operation_daily_rollups"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    salon_id: Mapped[int] = mapped_column(ForeignKey("salons.id", ondelete="CASCADE"), nullable=False)
+
+    day_ts: Mapped[int] = mapped_column(nullable=False)  # unix ts of the local day start in the salon timezone
+    op_type: Mapped[str] = mapped_column(String(24), nullable=False)  # purchase/order/refund
+    operations_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    turnover_rub: Mapped[int] = mapped_column(nullable=False, default=0)
+    discount_rub: Mapped[int] = mapped_column(nullable=False, default=0)
+    income_rub: Mapped[int] = mapped_column(nullable=False, default=0)  # sum of max(amount - discounts, 0)
+
+    __table_args__ = (
+        UniqueConstraint("salon_id", "day_ts", "op_type", name="uq_operation_rollups_salon_day_type"),
+        Index("ix_operation_rollups_salon_day", "salon_id", "day_ts"),
+    )
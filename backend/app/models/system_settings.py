@@ -18,6 +18,7 @@ class SystemSettings(Base):
     responsible_last_name: Mapped[str] = mapped_column(String(100), nullable=False, default="")
     responsible_phone: Mapped[str] = mapped_column(String(32), nullable=False, default="")
     avg_purchases_per_day: Mapped[int] = mapped_column(nullable=False, default=0)
+    client_level_bounds_csv: Mapped[str] = mapped_column(String(128), nullable=False, default="1000,5000")
 
     __table_args__ = (
         Index("ix_system_settings_salon", "salon_id"),
@@ -7,6 +7,9 @@ class MetricCard(BaseModel):
     code: str
     title: str
     value: float | int
+    previous_value: float | int | None = None
+    delta: float | int | None = None
+    delta_percent: float | None = None
 
 
 class DistributionItem(BaseModel):
@@ -24,11 +27,15 @@ class CustomersAnalyticsResponse(BaseModel):
     gender_distribution: list[DistributionItem]
     age_distribution: list[DistributionItem]
     new_clients_series: list[SeriesPoint]
+    compare_from: int | None = None
+    compare_to: int | None = None
 
 
 class OperationsAnalyticsResponse(BaseModel):
     cards: list[MetricCard]
     operations_series: list[SeriesPoint]
+    compare_from: int | None = None
+    compare_to: int | None = None
 
 
 class FinanceCategoryBreakdownItem(BaseModel):
@@ -43,6 +50,16 @@ class FinanceAnalyticsResponse(BaseModel):
     cashflow_series: list[SeriesPoint]
     income_by_source: list[FinanceCategoryBreakdownItem]
     expenses_by_source: list[FinanceCategoryBreakdownItem]
+    compare_from: int | None = None
+    compare_to: int | None = None
+
+
+class RatingObjectItem(BaseModel):
+    object_type: str
+    object_id: int | None
+    average_rating: float
+    total_reviews: int
+    distribution: list[DistributionItem]
 
 
 class RatingAnalyticsResponse(BaseModel):
@@ -50,6 +67,7 @@ class RatingAnalyticsResponse(BaseModel):
     average_rating: float
     total_reviews: int
     distribution: list[DistributionItem]
+    objects: list[RatingObjectItem] = Field(default_factory=list)
 
 
 class LevelsAnalyticsItem(BaseModel):
@@ -63,12 +81,99 @@ class LevelsAnalyticsResponse(BaseModel):
     items: list[LevelsAnalyticsItem]
 
 
+class LevelsConfigRequest(BaseModel):
+    bounds: list[int] = Field(min_length=1, max_length=10)
+
+
+class LevelsConfigResponse(BaseModel):
+    bounds: list[int]
+    levels: list[str]
+
+
+class RfmSegmentItem(BaseModel):
+    segment: str
+    title: str
+    clients: int
+    monetary_rub: int
+
+
+class RfmGridCell(BaseModel):
+    r_score: int
+    f_score: int
+    clients: int
+
+
+class RfmAnalyticsResponse(BaseModel):
+    computed_at: int | None
+    segments: list[RfmSegmentItem]
+    grid: list[RfmGridCell]
+
+
+class CohortCell(BaseModel):
+    months_since: int
+    clients: int
+    retention_percent: float
+    purchases: int
+    revenue_rub: int
+
+
+class CohortRow(BaseModel):
+    cohort_month: str
+    cohort_start_ts: int
+    clients: int
+    revenue_rub: int
+    cells: list[CohortCell]
+
+
+class CohortsAnalyticsResponse(BaseModel):
+    months: int
+    date_from: int
+    date_to: int
+    cohorts: list[CohortRow]
+    computed_months: int
+
+
+class BookingHeatmapCell(BaseModel):
+    weekday: int  # 0 = Monday
+    hour: int
+    appointments: int
+    completed: int
+    cancelled: int
+    cancel_rate_percent: float
+
+
+class BookingBreakdownItem(BaseModel):
+    id: int | None
+    title: str
+    appointments: int
+    completed: int
+    cancelled: int
+    completion_rate_percent: float
+    cancel_rate_percent: float
+
+
+class BookingsAnalyticsResponse(BaseModel):
+    date_from: int
+    date_to: int
+    timezone: str
+    appointments: int
+    completed: int
+    cancelled: int
+    completion_rate_percent: float
+    cancel_rate_percent: float
+    heatmap: list[BookingHeatmapCell]
+    employees: list[BookingBreakdownItem]
+    services: list[BookingBreakdownItem]
+    rollup_months: int
+
+
 class AppVisitsAnalyticsResponse(BaseModel):
     mode: str
     detailing: str
     timezone: str
     info_text: str
     series: list[SeriesPoint]
+    approximate: bool = False
 
 
 class AnalyticsFilters(BaseModel):
@@ -86,6 +191,11 @@ class PromotionForecastRequest(BaseModel):
     avg_check_rub: float = Field(default=1500, ge=0)
     conversion_rate_percent: float = Field(default=12, ge=0, le=100)
     gross_margin_percent: float = Field(default=35, ge=0, le=100)
+    draws: int = Field(default=0, ge=0, le=10_000)
+    budgets_rub: list[float] = Field(default_factory=list, max_length=32)
+    reward_percents: list[float] = Field(default_factory=list, max_length=32)
+    generation_depths: list[int] = Field(default_factory=list, max_length=10)
+    seed: int | None = None
 
 
 class PromotionForecastGeneration(BaseModel):
@@ -94,6 +204,30 @@ class PromotionForecastGeneration(BaseModel):
     expected_reward_cost_rub: float
 
 
+class PromotionScenarioItem(BaseModel):
+    budget_rub: float | None
+    generations: int
+    reward_percents: list[float]
+    new_clients_p50: float
+    net_effect_p10_rub: float
+    net_effect_p50_rub: float
+    net_effect_p90_rub: float
+    break_even_new_clients_p10: float
+    break_even_new_clients_p50: float
+    break_even_new_clients_p90: float
+    profit_probability_percent: float
+
+
+class PromotionSimulationInfo(BaseModel):
+    draws: int
+    avg_check_mean_rub: float
+    avg_check_sd_rub: float
+    conversion_cv: float
+    purchases_observed: int
+    fitted_from_operations: bool
+    elapsed_ms: float
+
+
 class PromotionForecastResponse(BaseModel):
     period_days: int
     projected_clients_total: int
@@ -104,6 +238,8 @@ class PromotionForecastResponse(BaseModel):
     break_even_new_clients: int
     break_even_conversion_rate_percent: float
     generations: list[PromotionForecastGeneration]
+    scenarios: list[PromotionScenarioItem] = Field(default_factory=list)
+    simulation: PromotionSimulationInfo | None = None
 
 
 class MarketingFunnelStage(BaseModel):
@@ -147,6 +283,23 @@ class MarketingForecastPoint(BaseModel):
     new_clients_forecast: int
 
 
+class MarketingForecastModelPoint(BaseModel):
+    day_ts: int
+    value: float
+
+
+class MarketingForecastModel(BaseModel):
+    metric: str
+    method: str
+    fitted_at: int
+    last_day_ts: int
+    observations: int
+    backtest_days: int
+    backtest_mae: float | None
+    backtest_smape_percent: float | None
+    points: list[MarketingForecastModelPoint]
+
+
 class MarketingAnalyticsResponse(BaseModel):
     cards: list[MetricCard]
     channels: list[MarketingChannelStats]
@@ -154,7 +307,11 @@ class MarketingAnalyticsResponse(BaseModel):
     segments: list[MarketingSegment]
     automation: MarketingAutomationStats
     forecast: list[MarketingForecastPoint]
+    forecast_method: str = "linear"
+    forecast_models: list[MarketingForecastModel] = Field(default_factory=list)
     insights: list[str]
+    compare_from: int | None = None
+    compare_to: int | None = None
 
 
 class ControlTowerBookingStats(BaseModel):
@@ -279,3 +436,56 @@ class ControlTowerAnalyticsResponse(BaseModel):
     process_kpis: list[ProcessKPIItem]
     policy: ControlTowerPolicyResponse
     onboarding: OnboardingGoalResponse
+    computed_at: int = 0
+    staleness_seconds: int = 0
+    is_stale: bool = False
+
+
+class AnalyticsCacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    entries: int
+    max_entries: int
+    ttl_seconds: int
+    salon_version: int
+
+
+class QueryBudgetItem(BaseModel):
+    endpoint: str
+    max_seconds: float
+    max_steps: int
+    exhausted: int
+
+
+class QueryBudgetStatsResponse(BaseModel):
+    enabled: bool
+    items: list[QueryBudgetItem]
+
+
+class AnalyticsBatchTab(BaseModel):
+    tab: str = Field(pattern="^(customers|operations|finance|levels|ratings|marketing)$")
+    date_from: int | None = None
+    date_to: int | None = None
+    detailing: str = Field(default="day", pattern="^(day|week|month)$")
+    mode: str = Field(default="payments", pattern="^(payments|recommendations)$")
+    compare: str | None = Field(default=None, pattern="^(previous|year_ago)$")
+
+
+class AnalyticsBatchRequest(BaseModel):
+    tabs: list[AnalyticsBatchTab] = Field(min_length=1, max_length=20)
+
+
+class AnalyticsBatchItem(BaseModel):
+    tab: str
+    payload: (
+        CustomersAnalyticsResponse
+        | OperationsAnalyticsResponse
+        | FinanceAnalyticsResponse
+        | LevelsAnalyticsResponse
+        | RatingAnalyticsResponse
+        | MarketingAnalyticsResponse
+    )
+
+
+class AnalyticsBatchResponse(BaseModel):
+    items: list[AnalyticsBatchItem]
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from pydantic import BaseModel, Field
 
-from app.schemas.common import Paginated
+from app.schemas.common import CursorPaginated
 
 
 class CertificateOut(BaseModel):
@@ -26,5 +26,5 @@ class CertificateCreateRequest(BaseModel):
     expires_at: int | None = None
 
 
-class CertificateListResponse(Paginated):
+class CertificateListResponse(CursorPaginated):
     items: list[CertificateOut]
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from pydantic import BaseModel, Field, field_validator
 
+from app.schemas.common import CursorPaginated
+
 
 class ClientChildOut(BaseModel):
     id: int
@@ -92,11 +94,8 @@ class ClientCardOut(BaseModel):
     purchase_history: list[dict] = Field(default_factory=list)
 
 
-class ClientListResponse(BaseModel):
+class ClientListResponse(CursorPaginated):
     items: list[ClientOut]
-    page: int
-    page_size: int
-    total: int
 
 
 class _EmailMixin(BaseModel):
@@ -166,5 +165,26 @@ class ClientUpdateRequest(_EmailMixin):
     loyalty_programs: list[ClientLoyaltyProgramInput] | None = None
 
 
+class ClientImportErrorOut(BaseModel):
+    line: int
+    error: str
+
+
+class ClientImportJobOut(BaseModel):
+    id: int
+    filename: str
+    file_format: str
+    status: str
+    rows_processed: int
+    created_count: int
+    duplicate_count: int
+    invalid_count: int
+    errors: list[ClientImportErrorOut] = Field(default_factory=list)
+    error: str = ""
+    created_at: int
+    started_at: int | None = None
+    finished_at: int | None = None
+
+
 class ClientGroupRulesResponse(BaseModel):
     items: list[ClientGroupRuleOut]
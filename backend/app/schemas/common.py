@@ -7,3 +7,10 @@ class Paginated(BaseModel):
     page: int
     page_size: int
     total: int
+
+
+class CursorPaginated(Paginated):
+    # total is null when the client asked for with_total=false; total_exact is false once it hit the count limit
+    total: int | None = None
+    total_exact: bool = True
+    next_cursor: str | None = None
@@ -4,6 +4,10 @@ from typing import Literal
 
 from pydantic import BaseModel, Field
 
+from app.models.client_score import RFM_SEGMENTS
+
+AUDIENCE_TYPE_PATTERN = "^(all|consented_marketing|segment|rfm_(" + "|".join(RFM_SEGMENTS) + "))$"
+
 
 class CommunicationStepIn(BaseModel):
     step_order: int = Field(ge=1)
@@ -16,7 +20,7 @@ class CommunicationStepIn(BaseModel):
 class CommunicationCampaignCreateRequest(BaseModel):
     title: str = Field(min_length=1, max_length=200)
     purpose: str = Field(default="marketing", pattern="^(marketing|reminder)$")
-    audience_type: str = Field(default="consented_marketing", pattern="^(all|consented_marketing|segment)$")
+    audience_type: str = Field(default="consented_marketing", pattern=AUDIENCE_TYPE_PATTERN)
     schedule_type: str = Field(default="manual", pattern="^(manual|scheduled)$")
     schedule_at: int | None = None
     steps: list[CommunicationStepIn] = Field(min_length=1, max_length=20)
@@ -128,7 +132,7 @@ class WorkflowCreateRequest(BaseModel):
 
 class WorkflowStep1AudienceRequest(BaseModel):
     purpose: str = Field(default="marketing", pattern="^(marketing|reminder)$")
-    audience_type: str = Field(default="consented_marketing", pattern="^(all|consented_marketing|segment)$")
+    audience_type: str = Field(default="consented_marketing", pattern=AUDIENCE_TYPE_PATTERN)
 
 
 class WorkflowStep2ContentRequest(BaseModel):
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from pydantic import BaseModel, Field
 
+from app.schemas.common import CursorPaginated
+
 
 class DialogueItem(BaseModel):
     client_id: int
@@ -13,11 +15,8 @@ class DialogueItem(BaseModel):
     last_message_channel: str
 
 
-class DialogueListResponse(BaseModel):
+class DialogueListResponse(CursorPaginated):
     items: list[DialogueItem]
-    page: int
-    page_size: int
-    total: int
 
 
 class MessageOut(BaseModel):
@@ -77,8 +76,5 @@ class MessageRegistryItem(BaseModel):
     scheduled_for: int | None
 
 
-class MessageRegistryResponse(BaseModel):
+class MessageRegistryResponse(CursorPaginated):
     items: list[MessageRegistryItem]
-    page: int
-    page_size: int
-    total: int
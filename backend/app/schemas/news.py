@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from pydantic import BaseModel, Field
 
-from app.schemas.common import Paginated
+from app.schemas.common import CursorPaginated
 
 
 NEWS_EVENT_PATTERN = "^(view|transition|click|booking|purchase|add_to_cart)$"
@@ -32,7 +32,7 @@ class NewsPostOut(BaseModel):
     updated_at: int
 
 
-class NewsListResponse(Paginated):
+class NewsListResponse(CursorPaginated):
     items: list[NewsPostOut]
 
 
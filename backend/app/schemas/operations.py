@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from pydantic import BaseModel, Field
 
-from app.schemas.common import Paginated
+from app.schemas.common import CursorPaginated
 
 
 class OperationOut(BaseModel):
@@ -16,7 +16,7 @@ class OperationOut(BaseModel):
     created_at: int
 
 
-class OperationListResponse(Paginated):
+class OperationListResponse(CursorPaginated):
     items: list[OperationOut]
 
 
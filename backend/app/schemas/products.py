@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from pydantic import BaseModel, Field
 
-from app.schemas.common import Paginated
+from app.schemas.common import CursorPaginated
 
 
 class ProductOut(BaseModel):
@@ -34,7 +34,7 @@ class ProductOut(BaseModel):
     updated_at: int
 
 
-class ProductListResponse(Paginated):
+class ProductListResponse(CursorPaginated):
     items: list[ProductOut]
 
 
@@ -142,7 +142,7 @@ class StockMovementOut(BaseModel):
     created_at: int
 
 
-class StockMovementListResponse(Paginated):
+class StockMovementListResponse(CursorPaginated):
     items: list[StockMovementOut]
 
 
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from pydantic import BaseModel
 
+from app.schemas.common import CursorPaginated
+
 
 class AuditLogOut(BaseModel):
     id: int
@@ -13,8 +15,5 @@ class AuditLogOut(BaseModel):
     created_at: int
 
 
-class AuditLogListResponse(BaseModel):
-    items: list[AuditLogOut]
-    page: int
-    page_size: int
-    total: int
\ No newline at end of file
+class AuditLogListResponse(CursorPaginated):
+    items: list[AuditLogOut]
\ No newline at end of file
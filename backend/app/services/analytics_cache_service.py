@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import (
+    AppPageEvent,
+    Appointment,
+    Client,
+    ClientAnalytics,
+    CommunicationCampaign,
+    CommunicationRecipient,
+    Feedback,
+    ForecastModel,
+    Operation,
+    Product,
+    StockBalance,
+    TrafficChannel,
+)
+
+T = TypeVar("T")
+
+_SALON_SCOPED_MODELS = (
+    AppPageEvent,
+    Appointment,
+    Client,
+    ClientAnalytics,
+    CommunicationCampaign,
+    Feedback,
+    ForecastModel,
+    Operation,
+    Product,
+    StockBalance,
+    TrafficChannel,
+)
+_PENDING_KEY = "analytics_cache_salons"
+
+
+@dataclass
+class _Entry:
+    version: int
+    expires_at: float
+    value: Any
+
+
+class AnalyticsCache:
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, salon_id: int) -> int:
+        return self._versions.get(salon_id, 0)
+
+    def bump(self, salon_ids: set[int]) -> None:
+        with self._lock:
+            for salon_id in salon_ids:
+                self._versions[salon_id] = self._versions.get(salon_id, 0) + 1
+
+    def get_or_compute(
+        self, salon_id: int, endpoint: str, params: tuple, compute: Callable[[], T], *, version: int | None = None
+    ) -> T:
+        # a caller reading a snapshot pinned earlier passes the version taken before that snapshot, so a write
+        # committed since then cannot label the old data as current
+        if not settings.ANALYTICS_CACHE_ENABLED:
+            return compute()
+        key = (salon_id, endpoint, params)
+        now = time.monotonic()
+        with self._lock:
+            if version is None:
+                version = self._versions.get(salon_id, 0)
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+
+        # the version is taken before computing: a write committed meanwhile makes the entry a miss next time
+        value = compute()
+        with self._lock:
+            self._entries[key] = _Entry(version=version, expires_at=now + self.ttl_seconds, value=value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+analytics_cache = AnalyticsCache(
+    max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_salons(session: Session, flush_context) -> None:  # type: ignore[no-untyped-def]
+    salon_ids: set[int] = session.info.setdefault(_PENDING_KEY, set())
+    campaign_ids: set[int] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _SALON_SCOPED_MODELS) and obj.salon_id is not None:
+            salon_ids.add(obj.salon_id)
+        elif isinstance(obj, CommunicationRecipient) and obj.campaign_id is not None:
+            campaign_ids.add(obj.campaign_id)
+    if campaign_ids:
+        salon_ids.update(
+            session.execute(
+                select(CommunicationCampaign.salon_id).where(CommunicationCampaign.id.in_(campaign_ids))
+            ).scalars()
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_written_salons(session: Session) -> None:
+    salon_ids = session.info.pop(_PENDING_KEY, None)
+    if salon_ids:
+        analytics_cache.bump(salon_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_written_salons(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
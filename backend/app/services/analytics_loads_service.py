@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+from sqlalchemy import and_, case, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Client, Operation, SystemSettings
+from app.services.operation_rollups_service import OperationDayTotals, load_operation_daily_windows
+
+DEFAULT_LEVEL_BOUNDS = (1000, 5000)
+
+_level_bounds_cache: dict[int, tuple[int, ...]] = {}
+_level_bounds_generations: dict[int, int] = {}
+_level_bounds_lock = threading.Lock()
+_PENDING_BOUNDS_KEY = "level_bounds_salons"
+
+
+@dataclass(frozen=True)
+class ClientGroup:
+    channel_id: int | None
+    level: str
+    clients: int
+    visited: int
+    repeat: int
+    consent: int
+    with_tg: int
+    points: float
+
+
+@dataclass(frozen=True)
+class PurchaseGroup:
+    channel_id: int | None
+    consent: bool | None
+    with_tg: bool | None
+    buyers: int
+    purchases: int
+    revenue_rub: int
+
+
+def parse_level_bounds(raw: str) -> tuple[int, ...]:
+    bounds = tuple(int(x) for x in raw.split(",") if x.strip())
+    return bounds or DEFAULT_LEVEL_BOUNDS
+
+
+def level_labels(bounds: tuple[int, ...]) -> list[str]:
+    edges = [0, *bounds]
+    return [f"{low}-{high - 1}" for low, high in zip(edges, edges[1:])] + [f"{bounds[-1]}+"]
+
+
+def get_level_bounds(db: Session, salon_id: int) -> tuple[int, ...]:
+    # a session holding uncommitted bounds reads them past the cache and does not cache them
+    pending = salon_id in db.info.get(_PENDING_BOUNDS_KEY, ())
+    bounds = None if pending else _level_bounds_cache.get(salon_id)
+    if bounds is not None:
+        return bounds
+    generation = _level_bounds_generations.get(salon_id, 0)
+    raw = db.execute(
+        select(SystemSettings.client_level_bounds_csv).where(SystemSettings.salon_id == salon_id)
+    ).scalar_one_or_none()
+    bounds = parse_level_bounds(raw or "")
+    if not pending:
+        # a read racing a commit is dropped: it may have seen the bounds that commit replaced
+        with _level_bounds_lock:
+            if _level_bounds_generations.get(salon_id, 0) == generation:
+                _level_bounds_cache[salon_id] = bounds
+    return bounds
+
+
+def set_level_bounds(db: Session, salon_id: int, bounds: tuple[int, ...]) -> None:
+    row = db.execute(select(SystemSettings).where(SystemSettings.salon_id == salon_id)).scalar_one_or_none()
+    if row is None:
+        row = SystemSettings(salon_id=salon_id)
+        db.add(row)
+    row.client_level_bounds_csv = ",".join(str(x) for x in bounds)
+    db.flush()
+    # the cached bounds are dropped once the update is committed, see _forget_level_bounds
+    db.info.setdefault(_PENDING_BOUNDS_KEY, set()).add(salon_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_level_bounds(session: Session) -> None:
+    salon_ids = session.info.pop(_PENDING_BOUNDS_KEY, None)
+    if salon_ids:
+        with _level_bounds_lock:
+            for salon_id in salon_ids:
+                _level_bounds_cache.pop(salon_id, None)
+                _level_bounds_generations[salon_id] = _level_bounds_generations.get(salon_id, 0) + 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_level_bounds(session: Session) -> None:
+    session.info.pop(_PENDING_BOUNDS_KEY, None)
+
+
+def _window_tag(ts_col, windows: list[tuple[int, int]]):
+    # windows must not overlap: each row is tagged with the index of the first window containing it
+    whens = [(ts_col.between(start_ts, end_ts), idx) for idx, (start_ts, end_ts) in enumerate(windows)]
+    return case(*whens).label("window_idx")
+
+
+def _in_windows(ts_col, windows: list[tuple[int, int]]):
+    return or_(*[ts_col.between(start_ts, end_ts) for start_ts, end_ts in windows])
+
+
+class AnalyticsLoads:
+    # memoizes the scans shared by analytics tabs; one instance serves one request or one batch
+    def __init__(self, db: Session, salon_id: int) -> None:
+        self.db = db
+        self.salon_id = salon_id
+        self._operation_daily: dict[tuple[int, int], list[OperationDayTotals]] = {}
+        self._purchases: dict[tuple[int, int], list[PurchaseGroup]] = {}
+        self._clients: list[ClientGroup] | None = None
+        self._new_clients: dict[tuple[int, int], int] = {}
+        self._level_bounds: tuple[int, ...] | None = None
+
+    @property
+    def level_bounds(self) -> tuple[int, ...]:
+        if self._level_bounds is None:
+            self._level_bounds = get_level_bounds(self.db, self.salon_id)
+        return self._level_bounds
+
+    def operation_daily(self, start_ts: int, end_ts: int) -> list[OperationDayTotals]:
+        return self.operation_daily_windows([(start_ts, end_ts)])[0]
+
+    def operation_daily_windows(self, windows: list[tuple[int, int]]) -> list[list[OperationDayTotals]]:
+        missing = [window for window in windows if window not in self._operation_daily]
+        if missing:
+            loaded = load_operation_daily_windows(self.db, salon_id=self.salon_id, windows=missing)
+            self._operation_daily.update(zip(missing, loaded))
+        return [self._operation_daily[window] for window in windows]
+
+    def purchases(self, start_ts: int, end_ts: int) -> list[PurchaseGroup]:
+        return self.purchases_windows([(start_ts, end_ts)])[0]
+
+    def purchases_windows(self, windows: list[tuple[int, int]]) -> list[list[PurchaseGroup]]:
+        # grouping purchases by attributes of the buyer keeps distinct buyer counts additive across groups
+        missing = [window for window in windows if window not in self._purchases]
+        if missing:
+            has_tg = case((Client.id.is_(None), None), (Client.tg_id.is_not(None), True), else_=False)
+            tag_col = _window_tag(Operation.created_at, missing)
+            rows = self.db.execute(
+                select(
+                    tag_col,
+                    Client.acquisition_channel_id,
+                    Client.consent_marketing,
+                    has_tg,
+                    func.count(func.distinct(Operation.client_id)),
+                    func.count(),
+                    func.coalesce(func.sum(Operation.amount_rub), 0),
+                )
+                .select_from(Operation)
+                .outerjoin(Client, and_(Client.id == Operation.client_id, Client.salon_id == self.salon_id))
+                .where(
+                    and_(
+                        Operation.salon_id == self.salon_id,
+                        Operation.op_type == "purchase",
+                        _in_windows(Operation.created_at, missing),
+                    )
+                )
+                .group_by(tag_col, Client.acquisition_channel_id, Client.consent_marketing, has_tg)
+            ).all()
+            for window in missing:
+                self._purchases[window] = []
+            for tag, channel_id, consent, with_tg, buyers, purchases, revenue in rows:
+                self._purchases[missing[tag]].append(
+                    PurchaseGroup(
+                        channel_id=channel_id,
+                        consent=consent,
+                        with_tg=with_tg if with_tg is None else bool(with_tg),
+                        buyers=int(buyers),
+                        purchases=int(purchases),
+                        revenue_rub=int(revenue),
+                    )
+                )
+        return [self._purchases[window] for window in windows]
+
+    def buyers_counts(self, windows: list[tuple[int, int]]) -> list[int]:
+        if all(window in self._purchases for window in windows):
+            return [sum(row.buyers for row in self._purchases[window]) for window in windows]
+        tag_col = _window_tag(Operation.created_at, windows)
+        counts = dict(
+            self.db.execute(
+                select(tag_col, func.count(func.distinct(Operation.client_id)))
+                .where(
+                    and_(
+                        Operation.salon_id == self.salon_id,
+                        Operation.op_type == "purchase",
+                        _in_windows(Operation.created_at, windows),
+                    )
+                )
+                .group_by(tag_col)
+            ).all()
+        )
+        return [int(counts.get(idx, 0)) for idx in range(len(windows))]
+
+    def new_clients_counts(self, windows: list[tuple[int, int]]) -> list[int]:
+        # a client is new in the window holding their first purchase, the definition the forecast models
+        # are fitted on; the moment is kept on the client, so this is a range read of one index
+        missing = [window for window in windows if window not in self._new_clients]
+        if missing:
+            tag_col = _window_tag(Client.first_purchase_at, missing)
+            counts = dict(
+                self.db.execute(
+                    select(tag_col, func.count())
+                    .where(and_(Client.salon_id == self.salon_id, _in_windows(Client.first_purchase_at, missing)))
+                    .group_by(tag_col)
+                ).all()
+            )
+            for idx, window in enumerate(missing):
+                self._new_clients[window] = int(counts.get(idx, 0))
+        return [self._new_clients[window] for window in windows]
+
+    def clients(self) -> list[ClientGroup]:
+        if self._clients is not None:
+            return self._clients
+
+        labels = level_labels(self.level_bounds)
+        level_col = case(
+            *[(Client.total_spent_rub < bound, label) for bound, label in zip(self.level_bounds, labels)],
+            else_=labels[-1],
+        ).label("level")
+        rows = self.db.execute(
+            select(
+                Client.acquisition_channel_id,
+                level_col,
+                func.count(),
+                func.sum(case((Client.visits_count > 0, 1), else_=0)),
+                func.sum(case((Client.visits_count >= 2, 1), else_=0)),
+                func.sum(case((Client.consent_marketing.is_(True), 1), else_=0)),
+                func.sum(case((Client.tg_id.is_not(None), 1), else_=0)),
+                func.coalesce(func.sum(Client.total_spent_rub / 100), 0),
+            )
+            .where(Client.salon_id == self.salon_id)
+            .group_by(Client.acquisition_channel_id, level_col)
+        ).all()
+        self._clients = [
+            ClientGroup(
+                channel_id=row[0],
+                level=row[1],
+                clients=int(row[2]),
+                visited=int(row[3] or 0),
+                repeat=int(row[4] or 0),
+                consent=int(row[5] or 0),
+                with_tg=int(row[6] or 0),
+                points=float(row[7] or 0),
+            )
+            for row in rows
+        ]
+        return self._clients
@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import csv
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import Select, delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import (
+    AnalyticsMirrorWatermark,
+    AppPageEvent,
+    Appointment,
+    CommunicationCampaign,
+    CommunicationRecipient,
+    NewsEvent,
+    Operation,
+)
+
+try:
+    import duckdb
+except ImportError:  # optional: pip install "tg-uds-admin-backend[columnar]"
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+_exporter_stop = threading.Event()
+_exporter_thread: threading.Thread | None = None
+_export_lock = threading.Lock()
+_NULL = "\\N"
+
+
+@dataclass(frozen=True)
+class MirrorTable:
+    name: str
+    columns: tuple[tuple[str, str], ...]  # (name, duckdb type); the first column is the source id
+    ts_column: str  # partitions rows by month
+    incremental: bool  # append-only tables are exported past the id watermark, others are re-snapshotted
+    query: Callable[[int], Select]
+
+
+def _operations_query(after_id: int) -> Select:
+    return select(
+        Operation.id,
+        Operation.salon_id,
+        Operation.client_id,
+        Operation.op_type,
+        Operation.amount_rub,
+        Operation.discount_rub,
+        Operation.referral_discount_rub,
+        Operation.created_at,
+        Operation.day_key,
+    ).where(Operation.id > after_id).order_by(Operation.id.asc())
+
+
+def _app_page_events_query(after_id: int) -> Select:
+    return select(
+        AppPageEvent.id,
+        AppPageEvent.salon_id,
+        AppPageEvent.client_id,
+        AppPageEvent.event_type,
+        AppPageEvent.visitor_key,
+        AppPageEvent.page_code,
+        AppPageEvent.created_at,
+        AppPageEvent.day_key,
+    ).where(AppPageEvent.id > after_id).order_by(AppPageEvent.id.asc())
+
+
+def _news_events_query(after_id: int) -> Select:
+    return select(
+        NewsEvent.id,
+        NewsEvent.salon_id,
+        NewsEvent.news_post_id,
+        NewsEvent.event_type,
+        NewsEvent.client_id,
+        NewsEvent.source,
+        NewsEvent.occurred_at,
+    ).where(NewsEvent.id > after_id).order_by(NewsEvent.id.asc())
+
+
+def _appointments_query(after_id: int) -> Select:
+    return select(
+        Appointment.id,
+        Appointment.salon_id,
+        Appointment.client_id,
+        Appointment.employee_id,
+        Appointment.service_id,
+        Appointment.starts_at,
+        Appointment.duration_minutes,
+        Appointment.status,
+        Appointment.source,
+    ).where(Appointment.id > after_id).order_by(Appointment.id.asc())
+
+
+def _communication_recipients_query(after_id: int) -> Select:
+    return (
+        select(
+            CommunicationRecipient.id,
+            CommunicationCampaign.salon_id,
+            CommunicationRecipient.campaign_id,
+            CommunicationRecipient.client_id,
+            CommunicationRecipient.status,
+            CommunicationRecipient.sent_at,
+            CommunicationRecipient.opened_at,
+            CommunicationRecipient.clicked_at,
+            CommunicationRecipient.converted_at,
+            CommunicationRecipient.delivery_channel,
+            CommunicationCampaign.created_at,
+        )
+        .join(CommunicationCampaign, CommunicationCampaign.id == CommunicationRecipient.campaign_id)
+        .where(CommunicationRecipient.id > after_id)
+        .order_by(CommunicationRecipient.id.asc())
+    )
+
+
+MIRROR_TABLES = {
+    table.name: table
+    for table in (
+        MirrorTable(
+            name="operations",
+            columns=(
+                ("id", "BIGINT"),
+                ("salon_id", "BIGINT"),
+                ("client_id", "BIGINT"),
+                ("op_type", "VARCHAR"),
+                ("amount_rub", "BIGINT"),
+                ("discount_rub", "BIGINT"),
+                ("referral_discount_rub", "BIGINT"),
+                ("created_at", "BIGINT"),
+                ("day_key", "BIGINT"),
+            ),
+            ts_column="created_at",
+            incremental=True,
+            query=_operations_query,
+        ),
+        MirrorTable(
+            name="app_page_events",
+            columns=(
+                ("id", "BIGINT"),
+                ("salon_id", "BIGINT"),
+                ("client_id", "BIGINT"),
+                ("event_type", "VARCHAR"),
+                ("visitor_key", "VARCHAR"),
+                ("page_code", "VARCHAR"),
+                ("created_at", "BIGINT"),
+                ("day_key", "BIGINT"),
+            ),
+            ts_column="created_at",
+            incremental=True,
+            query=_app_page_events_query,
+        ),
+        MirrorTable(
+            name="news_events",
+            columns=(
+                ("id", "BIGINT"),
+                ("salon_id", "BIGINT"),
+                ("news_post_id", "BIGINT"),
+                ("event_type", "VARCHAR"),
+                ("client_id", "BIGINT"),
+                ("source", "VARCHAR"),
+                ("occurred_at", "BIGINT"),
+            ),
+            ts_column="occurred_at",
+            incremental=True,
+            query=_news_events_query,
+        ),
+        # statuses of appointments and recipients change after insert, so they are re-exported as a whole
+        MirrorTable(
+            name="appointments",
+            columns=(
+                ("id", "BIGINT"),
+                ("salon_id", "BIGINT"),
+                ("client_id", "BIGINT"),
+                ("employee_id", "BIGINT"),
+                ("service_id", "BIGINT"),
+                ("starts_at", "BIGINT"),
+                ("duration_minutes", "BIGINT"),
+                ("status", "VARCHAR"),
+                ("source", "VARCHAR"),
+            ),
+            ts_column="starts_at",
+            incremental=False,
+            query=_appointments_query,
+        ),
+        MirrorTable(
+            name="communication_recipients",
+            columns=(
+                ("id", "BIGINT"),
+                ("salon_id", "BIGINT"),
+                ("campaign_id", "BIGINT"),
+                ("client_id", "BIGINT"),
+                ("status", "VARCHAR"),
+                ("sent_at", "BIGINT"),
+                ("opened_at", "BIGINT"),
+                ("clicked_at", "BIGINT"),
+                ("converted_at", "BIGINT"),
+                ("delivery_channel", "VARCHAR"),
+                ("campaign_created_at", "BIGINT"),
+            ),
+            ts_column="campaign_created_at",
+            incremental=False,
+            query=_communication_recipients_query,
+        ),
+    )
+}
+
+
+def columnar_enabled() -> bool:
+    return settings.ANALYTICS_ENGINE == "columnar" and duckdb is not None
+
+
+def mirror_dir() -> Path:
+    return Path(settings.ANALYTICS_MIRROR_DIR)
+
+
+def _month_expr(ts_column: str) -> str:
+    return f"strftime(TIMESTAMP '1970-01-01' + to_seconds({ts_column}), '%Y-%m')"
+
+
+def _pending_dirs(name: str) -> list[Path]:
+    return sorted(mirror_dir().glob(f"{name}.pending-*"))
+
+
+def _publish_pending(table: MirrorTable, committed_id: int) -> None:
+    # appended parts are written aside as <table>.pending-<last id> and moved into the table only after their
+    # watermark is committed. A directory left by a crash is published when its watermark made it to the
+    # database and dropped otherwise, so a row is neither mirrored twice nor lost
+    target = mirror_dir() / table.name
+    for pending in _pending_dirs(table.name):
+        if int(pending.name.rsplit("-", 1)[1]) <= committed_id:
+            for part in pending.rglob("*.parquet"):
+                dest = target / part.relative_to(pending)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                part.replace(dest)
+        shutil.rmtree(pending, ignore_errors=True)
+
+
+def _export_table(db: Session, con: Any, table: MirrorTable, now_ts: int) -> int:
+    watermark = db.execute(
+        select(AnalyticsMirrorWatermark).where(AnalyticsMirrorWatermark.table_name == table.name)
+    ).scalar_one_or_none()
+    if table.incremental:
+        _publish_pending(table, (watermark.last_id or 0) if watermark is not None else 0)
+    if watermark is None:
+        watermark = AnalyticsMirrorWatermark(table_name=table.name)
+        db.add(watermark)
+
+    after_id = (watermark.last_id or 0) if table.incremental else 0
+    columns = ", ".join(f"{name} {kind}" for name, kind in table.columns)
+    ts_idx = [name for name, _ in table.columns].index(table.ts_column)
+    con.execute(f"CREATE OR REPLACE TEMP TABLE staging ({columns})")
+
+    exported = 0
+    last_ts = watermark.last_ts or 0
+    # batches are spooled to CSV and bulk-loaded by COPY: binding Python values row by row is far slower
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8") as spool:
+        writer = csv.writer(spool)
+        while True:
+            rows = db.execute(table.query(after_id).limit(settings.ANALYTICS_MIRROR_BATCH_ROWS)).all()
+            if not rows:
+                break
+            writer.writerows(tuple(_NULL if value is None else value for value in row) for row in rows)
+            after_id = rows[-1][0]
+            last_ts = max(last_ts, max(row[ts_idx] or 0 for row in rows))
+            exported += len(rows)
+        spool.flush()
+        if exported:
+            con.execute(f"COPY staging FROM '{spool.name}' (FORMAT CSV, HEADER false, NULLSTR '{_NULL}')")
+
+    target = mirror_dir() / table.name
+    copy_sql = (
+        f"COPY (SELECT *, {_month_expr(table.ts_column)} AS month FROM staging) TO '{{path}}' "
+        "(FORMAT PARQUET, PARTITION_BY (salon_id, month), OVERWRITE_OR_IGNORE, FILENAME_PATTERN 'part_{{uuid}}')"
+    )
+    if table.incremental:
+        if exported:
+            pending = target.with_name(f"{table.name}.pending-{after_id}")
+            pending.mkdir(parents=True)
+            con.execute(copy_sql.format(path=pending.as_posix()))
+        watermark.rows_total = (watermark.rows_total or 0) + exported
+    else:
+        # the new snapshot is written aside and swapped in, so readers never see a half-written table
+        fresh = target.with_name(f"{table.name}.new")
+        stale = target.with_name(f"{table.name}.old")
+        shutil.rmtree(fresh, ignore_errors=True)
+        shutil.rmtree(stale, ignore_errors=True)
+        fresh.mkdir(parents=True)
+        if exported:
+            con.execute(copy_sql.format(path=fresh.as_posix()))
+        if target.exists():
+            target.rename(stale)
+        fresh.rename(target)
+        shutil.rmtree(stale, ignore_errors=True)
+        watermark.rows_total = exported
+
+    watermark.last_id = after_id
+    watermark.last_ts = last_ts
+    watermark.exported_at = now_ts
+    con.execute("DROP TABLE staging")
+    return exported
+
+
+def export_mirror(db: Session, tables: list[str] | None = None) -> dict[str, int]:
+    if duckdb is None:
+        raise RuntimeError("duckdb is not installed: pip install duckdb")
+    now_ts = int(time.time())
+    exported: dict[str, int] = {}
+    with _export_lock:
+        con = duckdb.connect()
+        try:
+            for name in tables or list(MIRROR_TABLES):
+                table = MIRROR_TABLES[name]
+                exported[name] = _export_table(db, con, table, now_ts)
+                db.commit()
+                if table.incremental:
+                    committed_id = db.execute(
+                        select(AnalyticsMirrorWatermark.last_id).where(AnalyticsMirrorWatermark.table_name == name)
+                    ).scalar_one()
+                    _publish_pending(table, committed_id or 0)
+        finally:
+            con.close()
+    return exported
+
+
+def reset_mirror_tables(db: Session, tables: list[str]) -> None:
+    # drops the exported files and watermarks, the next export rebuilds the tables from scratch
+    with _export_lock:
+        for name in tables:
+            shutil.rmtree(mirror_dir() / name, ignore_errors=True)
+            for pending in _pending_dirs(name):
+                shutil.rmtree(pending, ignore_errors=True)
+        db.execute(delete(AnalyticsMirrorWatermark).where(AnalyticsMirrorWatermark.table_name.in_(tables)))
+
+
+def mirror_covers(db: Session, table_name: str, end_ts: int) -> bool:
+    if not columnar_enabled():
+        return False
+    exported_at = db.execute(
+        select(AnalyticsMirrorWatermark.exported_at).where(AnalyticsMirrorWatermark.table_name == table_name)
+    ).scalar_one_or_none()
+    return bool(exported_at) and end_ts < exported_at
+
+
+def mirror_query(sql: str, params: list[Any]) -> list[tuple]:
+    # `{table}` placeholders are replaced with a hive-partitioned scan of the mirror, pruned by salon_id and month
+    relations = {
+        name: (
+            f"read_parquet('{(mirror_dir() / name).as_posix()}/**/*.parquet', hive_partitioning = true)"
+            if any((mirror_dir() / name).rglob("*.parquet"))
+            else f"(SELECT {', '.join(f'NULL::{kind} AS {col}' for col, kind in table.columns)}, "
+            "NULL::VARCHAR AS month WHERE false)"
+        )
+        for name, table in MIRROR_TABLES.items()
+    }
+    con = duckdb.connect()
+    try:
+        return con.execute(sql.format(**relations), params).fetchall()
+    finally:
+        con.close()
+
+
+def _exporter_loop() -> None:
+    while True:
+        try:
+            with SessionLocal() as db:
+                export_mirror(db)
+        except Exception:
+            logger.exception("analytics mirror export failed")
+        if _exporter_stop.wait(settings.ANALYTICS_MIRROR_EXPORT_SECONDS):
+            return
+
+
+def start_mirror_exporter() -> None:
+    global _exporter_thread
+    if settings.ANALYTICS_ENGINE != "columnar" or _exporter_thread is not None:
+        return
+    if duckdb is None:
+        logger.warning("ANALYTICS_ENGINE=columnar but duckdb is not installed; analytics stay on SQLite")
+        return
+    _exporter_stop.clear()
+    _exporter_thread = threading.Thread(target=_exporter_loop, name="analytics-mirror-exporter", daemon=True)
+    _exporter_thread.start()
+
+
+def stop_mirror_exporter() -> None:
+    global _exporter_thread
+    if _exporter_thread is None:
+        return
+    _exporter_stop.set()
+    _exporter_thread.join(timeout=30)
+    _exporter_thread = None
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from sqlalchemy import Integer, and_, case, cast, delete, event, func, inspect, or_, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Appointment, BookingMonthRollup, BookingMonthStatus
+from app.services.cohorts_service import month_index, month_start
+from app.services.local_calendar_service import DAY_SECONDS, SalonCalendar
+
+
+@dataclass(frozen=True)
+class BookingCellTotals:
+    weekday: int
+    hour: int
+    employee_id: int
+    service_id: int
+    appointments: int
+    completed: int
+    cancelled: int
+
+
+def _offset_expr(segments: list[tuple[int, int, int]]):  # type: ignore[no-untyped-def]
+    # the offset in effect at starts_at, so hours on both sides of a DST switch land in their local bucket
+    if len(segments) == 1:
+        return segments[0][2]
+    return case(
+        *[(Appointment.starts_at <= seg_end, offset) for _, seg_end, offset in segments[:-1]],
+        else_=segments[-1][2],
+    )
+
+
+def _offset_changes(segments: list[tuple[int, int, int]], month: int) -> tuple[int, str]:
+    # the offset at the month start and the "ts:offset" switches inside the month, stored with its cells
+    month_from, month_to = month_start(month), month_start(month + 1) - 1
+    inside = [
+        (max(seg_start, month_from), offset)
+        for seg_start, seg_end, offset in segments
+        if seg_start <= month_to and seg_end >= month_from
+    ]
+    changes = ",".join(f"{seg_start}:{offset}" for seg_start, offset in inside[1:])
+    return inside[0][1], changes
+
+
+def _grouped_query(  # type: ignore[no-untyped-def]
+    salon_id: int, ranges: list[tuple[int, int]], segments: list[tuple[int, int, int]], *, by_month: bool = False
+):
+    # 1970-01-01 was a Thursday, so the local day number shifted by 3 gives the weekday with Monday = 0
+    local = Appointment.starts_at + _offset_expr(segments)
+    weekday_col = (local // DAY_SECONDS + 3) % 7
+    hour_col = (local % DAY_SECONDS) // 3600
+    employee_col = func.coalesce(Appointment.employee_id, 0)
+    service_col = func.coalesce(Appointment.service_id, 0)
+    keys = [weekday_col, hour_col, employee_col, service_col]
+    if by_month:
+        month_col = (
+            cast(func.strftime("%Y", Appointment.starts_at, "unixepoch"), Integer) * 12
+            + cast(func.strftime("%m", Appointment.starts_at, "unixepoch"), Integer)
+            - 1
+        )
+        keys.insert(0, month_col)
+    return (
+        select(
+            *keys,
+            func.count(),
+            func.coalesce(func.sum(case((Appointment.status == "completed", 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Appointment.status == "cancelled", 1), else_=0)), 0),
+        )
+        .where(
+            and_(
+                Appointment.salon_id == salon_id,
+                or_(*[Appointment.starts_at.between(start_ts, end_ts) for start_ts, end_ts in ranges]),
+            )
+        )
+        .group_by(*keys)
+    )
+
+
+def _store_months(
+    db: Session, *, salon_id: int, months: list[int], segments: list[tuple[int, int, int]], now_ts: int
+) -> None:
+    rows = db.execute(
+        _grouped_query(salon_id, [(month_start(months[0]), month_start(months[-1] + 1) - 1)], segments, by_month=True)
+    ).all()
+    db.execute(
+        delete(BookingMonthRollup).where(
+            and_(BookingMonthRollup.salon_id == salon_id, BookingMonthRollup.month.in_(months))
+        )
+    )
+    wanted = set(months)
+    values = [
+        {
+            "salon_id": salon_id,
+            "month": int(month),
+            "weekday": int(weekday),
+            "hour": int(hour),
+            "employee_id": int(employee_id),
+            "service_id": int(service_id),
+            "appointments": int(appointments),
+            "completed": int(completed),
+            "cancelled": int(cancelled),
+        }
+        for month, weekday, hour, employee_id, service_id, appointments, completed, cancelled in rows
+        if int(month) in wanted
+    ]
+    if values:
+        db.execute(sqlite_insert(BookingMonthRollup), values)
+    stmt = sqlite_insert(BookingMonthStatus)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["salon_id", "month"],
+            set_={key: stmt.excluded[key] for key in ("utc_offset_seconds", "offset_changes", "computed_at")},
+        ),
+        [
+            {
+                "salon_id": salon_id,
+                "month": month,
+                "utc_offset_seconds": utc_offset,
+                "offset_changes": changes,
+                "computed_at": now_ts,
+            }
+            for month in months
+            for utc_offset, changes in [_offset_changes(segments, month)]
+        ],
+    )
+
+
+def load_booking_cells(
+    db: Session,
+    *,
+    salon_id: int,
+    start_ts: int,
+    end_ts: int,
+    calendar: SalonCalendar,
+    employee_id: int | None = None,
+    service_id: int | None = None,
+    now_ts: int | None = None,
+    refresh: bool = False,
+) -> tuple[list[BookingCellTotals], int]:
+    # whole closed months inside the window come from the monthly rollup, the edges from appointments;
+    # the same (weekday, hour, employee, service) key may appear in both parts and is summed by the caller
+    now_ts = now_ts or int(time.time())
+    first_month = month_index(start_ts)
+    if month_start(first_month) < start_ts:
+        first_month += 1
+    last_month = min(month_index(end_ts + 1) - 1, month_index(now_ts) - 1)
+
+    cells: list[BookingCellTotals] = []
+    raw_ranges: list[tuple[int, int]] = []
+    rollup_months = 0
+    if first_month > last_month:
+        raw_ranges.append((start_ts, end_ts))
+    else:
+        if start_ts < month_start(first_month):
+            raw_ranges.append((start_ts, month_start(first_month) - 1))
+        if month_start(last_month + 1) <= end_ts:
+            raw_ranges.append((month_start(last_month + 1), end_ts))
+
+        # a month is reused only if it was bucketed with the offsets the salon's zone has inside that month
+        month_segments = calendar.offset_segments(month_start(first_month), month_start(last_month + 1) - 1)
+        stored = {} if refresh else {
+            month: (utc_offset, changes)
+            for month, utc_offset, changes in db.execute(
+                select(
+                    BookingMonthStatus.month, BookingMonthStatus.utc_offset_seconds, BookingMonthStatus.offset_changes
+                ).where(
+                    and_(
+                        BookingMonthStatus.salon_id == salon_id,
+                        BookingMonthStatus.month.between(first_month, last_month),
+                    )
+                )
+            ).all()
+        }
+        missing = [
+            month
+            for month in range(first_month, last_month + 1)
+            if stored.get(month) != _offset_changes(month_segments, month)
+        ]
+        if missing:
+            _store_months(db, salon_id=salon_id, months=missing, segments=month_segments, now_ts=now_ts)
+        rollup_months = last_month - first_month + 1
+
+        conditions = [
+            BookingMonthRollup.salon_id == salon_id,
+            BookingMonthRollup.month.between(first_month, last_month),
+        ]
+        if employee_id is not None:
+            conditions.append(BookingMonthRollup.employee_id == employee_id)
+        if service_id is not None:
+            conditions.append(BookingMonthRollup.service_id == service_id)
+        keys = (
+            BookingMonthRollup.weekday,
+            BookingMonthRollup.hour,
+            BookingMonthRollup.employee_id,
+            BookingMonthRollup.service_id,
+        )
+        rows = db.execute(
+            select(
+                *keys,
+                func.sum(BookingMonthRollup.appointments),
+                func.sum(BookingMonthRollup.completed),
+                func.sum(BookingMonthRollup.cancelled),
+            )
+            .where(and_(*conditions))
+            .group_by(*keys)
+        ).all()
+        cells.extend(BookingCellTotals(*(int(value) for value in row)) for row in rows)
+
+    if raw_ranges:
+        query = _grouped_query(salon_id, raw_ranges, calendar.offset_segments(start_ts, end_ts))
+        # an employee filter turns the scan into a range over ix_appointments_salon_employee_starts
+        if employee_id is not None:
+            query = query.where(Appointment.employee_id == employee_id)
+        if service_id is not None:
+            query = query.where(Appointment.service_id == service_id)
+        cells.extend(BookingCellTotals(*(int(value) for value in row)) for row in db.execute(query))
+    return cells, rollup_months
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_booking_months(session: Session, flush_context) -> None:  # type: ignore[no-untyped-def]
+    # a status change or a move of an appointment makes its month (and the month it left) recomputed on next read
+    stale: set[tuple[int, int]] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, Appointment) or obj.salon_id is None:
+            continue
+        moved_from = inspect(obj).attrs.starts_at.history.deleted
+        stale.update((obj.salon_id, month_index(ts)) for ts in (obj.starts_at, *moved_from) if ts is not None)
+    if stale:
+        session.execute(
+            delete(BookingMonthStatus).where(
+                tuple_(BookingMonthStatus.salon_id, BookingMonthStatus.month).in_(sorted(stale))
+            )
+        )
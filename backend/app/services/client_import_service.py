@@ -0,0 +1,471 @@
+from __future__ import annotations
+
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Iterator, TextIO
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import (
+    Client,
+    ClientAnalytics,
+    ClientChild,
+    ClientImportJob,
+    ClientLoyaltyProgram,
+    TrafficChannel,
+)
+from app.schemas.clients import ClientCreateRequest, ClientImportJobOut
+from app.services.analytics_cache_service import analytics_cache
+from app.services.client_search_service import bulk_client_indexing
+from app.services.clients_service import _tags_to_csv
+from app.services.control_tower_service import mark_snapshots_stale
+from app.services.local_calendar_service import salon_calendar
+from app.services.security_service import write_audit
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "jsonl")
+# CSV cells holding lists use the export separator, so an exported file imports back as is
+_CSV_LIST_SEPARATOR = ";"
+_CSV_FIELDS = frozenset(ClientCreateRequest.model_fields)
+_NON_DIGITS = re.compile(r"\D")
+
+_worker: ThreadPoolExecutor | None = None
+_worker_lock = threading.Lock()
+
+
+def import_format(filename: str, requested: str | None) -> str:
+    if requested:
+        return requested
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def save_import_upload(source: BinaryIO) -> str:
+    # the upload is copied chunk by chunk to a file of its own, so the job outlives the request
+    fd, path = tempfile.mkstemp(prefix="client-import-", suffix=".upload")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while chunk := source.read(1 << 20):
+                size += len(chunk)
+                if size > settings.CLIENT_IMPORT_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail="Файл импорта слишком большой")
+                target.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _phone_key(value: str) -> str:
+    digits = _NON_DIGITS.sub("", value)
+    return digits[-10:] if len(digits) >= 10 else digits
+
+
+@dataclass
+class _KnownClients:
+    phones: set[str] = field(default_factory=set)
+    emails: set[str] = field(default_factory=set)
+    tg_ids: set[int] = field(default_factory=set)
+    last_id: int = 0
+
+    def add(self, phone: str, email: str, tg_id: int | None) -> None:
+        if phone := _phone_key(phone):
+            self.phones.add(phone)
+        if email := email.strip().lower():
+            self.emails.add(email)
+        if tg_id is not None:
+            self.tg_ids.add(tg_id)
+
+    def merge(self, other: _KnownClients) -> None:
+        self.phones |= other.phones
+        self.emails |= other.emails
+        self.tg_ids |= other.tg_ids
+        self.last_id = max(self.last_id, other.last_id)
+
+    def seen(self, phone: str, email: str, tg_id: int | None) -> bool:
+        return (
+            _phone_key(phone) in self.phones
+            or email.strip().lower() in self.emails
+            or (tg_id is not None and tg_id in self.tg_ids)
+        )
+
+
+def _known_clients(db: Session, salon_id: int, *, after_id: int = 0) -> _KnownClients:
+    known = _KnownClients(last_id=after_id)
+    rows = db.execute(
+        select(Client.id, Client.phone, Client.email, Client.tg_id).where(
+            Client.salon_id == salon_id, Client.id > after_id
+        )
+    )
+    for client_id, phone, email, tg_id in rows:
+        known.add(phone, email, tg_id)
+        known.last_id = max(known.last_id, client_id)
+    return known
+
+
+def _csv_payload(record: dict[str | None, Any]) -> dict[str, Any]:
+    payload: dict[str, Any] = {}
+    for key, value in record.items():
+        if key is None or not isinstance(value, str):
+            continue
+        key, value = key.strip(), value.strip()
+        if not value or key not in _CSV_FIELDS:
+            continue
+        if key in ("tags", "children", "loyalty_programs"):
+            items = [item.strip() for item in value.split(_CSV_LIST_SEPARATOR) if item.strip()]
+            if key == "children":
+                payload[key] = [{"full_name": item} for item in items]
+            elif key == "loyalty_programs":
+                payload[key] = [{"program_name": item} for item in items]
+            else:
+                payload[key] = items
+        else:
+            payload[key] = value
+    return payload
+
+
+def _read_records(stream: TextIO, file_format: str) -> Iterator[tuple[int, dict[str, Any] | str]]:
+    # yields (line, payload) or (line, error) one record at a time
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, _csv_payload(record)
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError:
+            yield line, "некорректный JSON"
+            continue
+        yield line, record if isinstance(record, dict) else "строка должна быть JSON-объектом"
+
+
+def _validation_message(exc: ValidationError) -> str:
+    first = exc.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+_CLIENT_COLUMNS = (
+    "id",
+    "salon_id",
+    "tg_id",
+    "username",
+    "full_name",
+    "phone",
+    "whatsapp_phone",
+    "email",
+    "telegram_username",
+    "vk_username",
+    "instagram_username",
+    "facebook_username",
+    "max_username",
+    "address",
+    "birthday",
+    "notes",
+    "tags_csv",
+    "acquisition_channel_id",
+    "consent_personal_data",
+    "consent_marketing",
+    "consent_sms",
+    "consent_app_push",
+    "consent_email",
+    "status",
+    "visits_count",
+    "total_spent_rub",
+)
+_ANALYTICS_COLUMNS = ("salon_id", "client_id", "created_at", "day_key", "gender", "birth_year")
+_CHILD_COLUMNS = ("salon_id", "client_id", "full_name", "birth_date", "notes")
+_LOYALTY_COLUMNS = ("salon_id", "client_id", "program_name", "status", "level_name", "balance", "expires_at")
+
+
+def _executemany(db: Session, table: str, columns: tuple[str, ...], rows: list[tuple]) -> None:
+    # plain DBAPI executemany: at import volumes SQLAlchemy's per-row parameter handling costs more than the
+    # inserts themselves
+    if rows:
+        db.connection().exec_driver_sql(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        )
+
+
+def _insert_clients(db: Session, *, salon_id: int, batch: list[ClientCreateRequest], now_ts: int, day_key: int) -> None:
+    # ordered RETURNING degrades to one statement per row on SQLite, so the ids are assigned here instead;
+    # the caller already holds the write lock, which keeps max(id) stable until the commit
+    first_id = int(db.execute(select(func.coalesce(func.max(Client.id), 0))).scalar_one()) + 1
+    ids = range(first_id, first_id + len(batch))
+    with bulk_client_indexing(db, first_id=first_id, last_id=ids[-1]):
+        _executemany(
+            db,
+            Client.__tablename__,
+            _CLIENT_COLUMNS,
+            [
+                (
+                    client_id,
+                    salon_id,
+                    req.tg_id,
+                    req.username,
+                    req.full_name,
+                    req.phone,
+                    req.whatsapp_phone,
+                    str(req.email or ""),
+                    req.telegram_username,
+                    req.vk_username,
+                    req.instagram_username,
+                    req.facebook_username,
+                    req.max_username,
+                    req.address,
+                    req.birthday,
+                    req.notes,
+                    _tags_to_csv(req.tags),
+                    req.acquisition_channel_id,
+                    req.consent_personal_data,
+                    req.consent_marketing,
+                    req.consent_sms,
+                    req.consent_app_push,
+                    req.consent_email,
+                    "active",
+                    0,
+                    0,
+                )
+                for client_id, req in zip(ids, batch)
+            ],
+        )
+    _executemany(
+        db,
+        ClientAnalytics.__tablename__,
+        _ANALYTICS_COLUMNS,
+        [(salon_id, client_id, now_ts, day_key, req.gender, req.birth_year) for client_id, req in zip(ids, batch)],
+    )
+    _executemany(
+        db,
+        ClientChild.__tablename__,
+        _CHILD_COLUMNS,
+        [
+            (salon_id, client_id, child.full_name, child.birth_date, child.notes)
+            for client_id, req in zip(ids, batch)
+            for child in req.children
+        ],
+    )
+    _executemany(
+        db,
+        ClientLoyaltyProgram.__tablename__,
+        _LOYALTY_COLUMNS,
+        [
+            (salon_id, client_id, item.program_name, item.status, item.level_name, item.balance, item.expires_at)
+            for client_id, req in zip(ids, batch)
+            for item in req.loyalty_programs
+        ],
+    )
+
+
+def _import_rows(db: Session, job: ClientImportJob, path: str) -> None:
+    # rows are validated and deduplicated one at a time and written in executemany batches; every batch is
+    # committed together with the job counters, so polling sees the progress and a crash keeps finished batches
+    job_id, salon_id = job.id, job.salon_id
+    known = _known_clients(db, salon_id)
+    channel_ids = set(db.execute(select(TrafficChannel.id).where(TrafficChannel.salon_id == salon_id)).scalars())
+    errors: list[dict[str, Any]] = []
+    batch: list[ClientCreateRequest] = []
+    processed = created = duplicates = invalid = 0
+
+    def commit_batch() -> None:
+        nonlocal created, duplicates
+        raw = db.connection().connection.driver_connection
+        if not raw.in_transaction:
+            # the batch is re-checked and written under one write lock, so a client added through the API
+            # since the import started is seen here and none can slip in before the commit
+            raw.execute("BEGIN IMMEDIATE")
+        added = _known_clients(db, salon_id, after_id=known.last_id)
+        if batch and added.last_id > known.last_id:
+            kept = [req for req in batch if not added.seen(req.phone, str(req.email or ""), req.tg_id)]
+            duplicates += len(batch) - len(kept)
+            batch[:] = kept
+        known.merge(added)
+        created += len(batch)
+        db.execute(
+            update(ClientImportJob)
+            .where(ClientImportJob.id == job_id)
+            .values(
+                rows_processed=processed,
+                created_count=created,
+                duplicate_count=duplicates,
+                invalid_count=invalid,
+                errors_json=json.dumps(errors, ensure_ascii=False),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if batch:
+            now_ts = int(time.time())
+            day_key = salon_calendar(db, salon_id).day_key(now_ts)
+            _insert_clients(db, salon_id=salon_id, batch=batch, now_ts=now_ts, day_key=day_key)
+            mark_snapshots_stale(db, {salon_id})
+            known.last_id = int(db.execute(select(func.max(Client.id))).scalar_one())
+            batch.clear()
+        db.commit()
+        analytics_cache.bump({salon_id})
+
+    with open(path, "rb") as raw, io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as stream:
+        for line, payload in _read_records(stream, job.file_format):
+            processed += 1
+            error = payload if isinstance(payload, str) else None
+            if error is None:
+                try:
+                    req = ClientCreateRequest.model_validate(payload)
+                except ValidationError as exc:
+                    error = _validation_message(exc)
+                else:
+                    if req.acquisition_channel_id is not None and req.acquisition_channel_id not in channel_ids:
+                        error = "acquisition_channel_id: канал привлечения не найден"
+            if error is not None:
+                invalid += 1
+                if len(errors) < settings.CLIENT_IMPORT_MAX_ERRORS:
+                    errors.append({"line": line, "error": error})
+            elif known.seen(req.phone, str(req.email or ""), req.tg_id):
+                duplicates += 1
+            else:
+                known.add(req.phone, str(req.email or ""), req.tg_id)
+                batch.append(req)
+            if processed % settings.CLIENT_IMPORT_BATCH_SIZE == 0:
+                commit_batch()
+    commit_batch()
+
+    job.status = "done"
+    job.finished_at = int(time.time())
+    _audit_import(db, job)
+    db.commit()
+
+
+def _audit_import(db: Session, job: ClientImportJob) -> None:
+    # a failed import reports the counters of the batches it committed
+    summary = {
+        "status": job.status,
+        "rows": job.rows_processed,
+        "created": job.created_count,
+        "duplicates": job.duplicate_count,
+        "invalid": job.invalid_count,
+    }
+    write_audit(
+        db,
+        salon_id=job.salon_id,
+        actor_user_id=job.actor_user_id,
+        action="client.import",
+        entity="client_import",
+        entity_id=str(job.id),
+        meta_json=";".join(f"{key}={value}" for key, value in summary.items()),
+    )
+
+
+def run_client_import(job_id: int, path: str) -> None:
+    try:
+        with SessionLocal() as db:
+            job = db.get(ClientImportJob, job_id)
+            if job is None:
+                return
+            job.status = "running"
+            job.started_at = int(time.time())
+            db.commit()
+            try:
+                _import_rows(db, job, path)
+            except Exception as exc:
+                db.rollback()
+                logger.exception("client import %s failed", job_id)
+                job.status = "failed"
+                job.error = (
+                    "Файл должен быть в кодировке UTF-8" if isinstance(exc, UnicodeDecodeError) else str(exc)
+                )[:500]
+                job.finished_at = int(time.time())
+                _audit_import(db, job)
+                db.commit()
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+
+def start_client_import(
+    db: Session,
+    *,
+    salon_id: int,
+    actor_user_id: int | None,
+    filename: str,
+    file_format: str,
+    path: str,
+) -> ClientImportJob:
+    # imports of all salons share one worker thread: SQLite has a single writer anyway
+    global _worker
+    job = ClientImportJob(
+        salon_id=salon_id,
+        actor_user_id=actor_user_id,
+        filename=filename[:255],
+        file_format=file_format,
+        created_at=int(time.time()),
+    )
+    db.add(job)
+    db.commit()
+    with _worker_lock:
+        if _worker is None:
+            _worker = ThreadPoolExecutor(1, thread_name_prefix="client-import")
+        _worker.submit(run_client_import, job.id, path)
+    return job
+
+
+def get_client_import(db: Session, *, salon_id: int, job_id: int) -> ClientImportJob:
+    job = db.execute(
+        select(ClientImportJob).where(ClientImportJob.id == job_id, ClientImportJob.salon_id == salon_id)
+    ).scalar_one_or_none()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Импорт не найден")
+    return job
+
+
+def client_import_out(job: ClientImportJob) -> ClientImportJobOut:
+    return ClientImportJobOut(
+        id=job.id,
+        filename=job.filename,
+        file_format=job.file_format,
+        status=job.status,
+        rows_processed=job.rows_processed,
+        created_count=job.created_count,
+        duplicate_count=job.duplicate_count,
+        invalid_count=job.invalid_count,
+        errors=json.loads(job.errors_json or "[]"),
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+def fail_interrupted_client_imports(db: Session) -> int:
+    # jobs are not resumable: whatever was queued or running when the process stopped is marked failed
+    result = db.execute(
+        update(ClientImportJob)
+        .where(ClientImportJob.status.in_(("queued", "running")))
+        .values(status="failed", error="Импорт прерван перезапуском сервера", finished_at=int(time.time()))
+    )
+    return int(result.rowcount or 0)
+
+
+def stop_client_imports() -> None:
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import logging
+import re
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "clients_fts"
+# bm25 weights follow the column order: a hit in the name outranks one in the notes
+FTS_COLUMNS = ("full_name", "phones", "email", "contacts", "notes", "address")
+FTS_WEIGHTS = (10.0, 8.0, 5.0, 5.0, 1.0, 1.0)
+CONTACT_COLUMNS = (
+    "username",
+    "telegram_username",
+    "vk_username",
+    "instagram_username",
+    "facebook_username",
+    "max_username",
+)
+PHONE_COLUMNS = ("phone", "whatsapp_phone")
+
+clients_fts = table(FTS_TABLE, column("rowid"), *(column(name) for name in FTS_COLUMNS))
+
+_PHONE_QUERY = re.compile(r"[\d\s()+\-.]+")
+_PHONE_SEPARATORS = (" ", "-", "(", ")", "+", ".")
+_TOKEN = re.compile(r"\w+")
+_index_ready: bool | None = None
+
+
+def _digits_sql(col: str) -> str:
+    expr = col
+    for char in _PHONE_SEPARATORS:
+        expr = f"replace({expr}, '{char}', '')"
+    return expr
+
+
+def phone_digits(col):  # type: ignore[no-untyped-def]
+    # the stored number reduced to its digits, like the indexed phone tokens
+    for char in _PHONE_SEPARATORS:
+        col = func.replace(col, char, "")
+    return col
+
+
+def _phone_tokens_sql(row: str, col: str) -> str:
+    # the number is indexed as typed in digits, by its last ten digits and with the domestic 8 prefix,
+    # so +7 916..., 8 916... and 916... all find it by prefix; its last seven and four digits are tokens
+    # of their own, so the tail of a number is a prefix match as well
+    digits = _digits_sql(f"{row}.{col}")
+    national = f"substr({digits}, -10)"
+    tails = f"' ' || substr({digits}, -7) || ' ' || substr({digits}, -4)"
+    return (
+        f"(CASE WHEN length({digits}) >= 10 THEN {digits} || ' ' || {national} || ' 8' || {national} || {tails} "
+        f"WHEN length({digits}) > 4 THEN {digits} || ' ' || substr({digits}, -4) ELSE {digits} END)"
+    )
+
+
+def _row_values_sql(row: str) -> str:
+    phones = " || ' ' || ".join(_phone_tokens_sql(row, col) for col in PHONE_COLUMNS)
+    contacts = " || ' ' || ".join(f"{row}.{col}" for col in CONTACT_COLUMNS)
+    return f"{row}.id, {row}.full_name, {phones}, {row}.email, {contacts}, {row}.notes, {row}.address"
+
+
+def _insert_sql(row: str) -> str:
+    return f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) VALUES ({_row_values_sql(row)});"
+
+
+def _insert_trigger_sql() -> str:
+    return f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON clients BEGIN {_insert_sql('new')} END"
+
+
+def _schema_statements() -> list[str]:
+    columns = ", ".join(FTS_COLUMNS)
+    insert = _insert_sql("new")
+    delete = f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id;"
+    watched = ", ".join(("full_name", *PHONE_COLUMNS, "email", *CONTACT_COLUMNS, "notes", "address"))
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        _insert_trigger_sql(),
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON clients BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {watched} ON clients "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def rebuild_client_search_index(conn: Connection) -> int:
+    conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    columns = ", ".join(FTS_COLUMNS)
+    result = conn.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, {columns}) SELECT {_row_values_sql('clients')} FROM clients"))
+    return int(result.rowcount or 0)
+
+
+@contextmanager
+def bulk_client_indexing(db: Session, *, first_id: int, last_id: int) -> Iterator[None]:
+    # a bulk load of clients with ids in [first_id, last_id] is indexed with one INSERT ... SELECT instead of
+    # the per-row trigger, which costs several times more. The trigger is dropped and recreated inside the
+    # caller's write transaction: SQLite lets no other writer in meanwhile, and a rollback restores it
+    if not client_search_ready(db):
+        yield
+        return
+    db.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai"))
+    yield
+    db.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) "
+            f"SELECT {_row_values_sql('clients')} FROM clients WHERE clients.id BETWEEN :first_id AND :last_id"
+        ),
+        {"first_id": first_id, "last_id": last_id},
+    )
+    db.execute(text(_insert_trigger_sql()))
+
+
+def ensure_client_search_index(conn: Connection) -> bool:
+    # the shadow table lives outside Base.metadata; the triggers keep it in sync with every write path,
+    # including bulk inserts that bypass the ORM
+    global _index_ready
+    if conn.dialect.name != "sqlite":
+        _index_ready = False
+        return False
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    indexed = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": f"{FTS_TABLE}_ai"}
+    ).scalar()
+    if indexed is not None and indexed != _insert_trigger_sql().replace(" IF NOT EXISTS", "", 1):
+        # the indexed values changed since the triggers were created: they are recreated and the index rebuilt
+        for trigger in ("ai", "au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}"))
+        exists = None
+    try:
+        for statement in _schema_statements():
+            conn.execute(text(statement))
+    except OperationalError:
+        logger.warning("sqlite is built without FTS5, client search falls back to LIKE")
+        _index_ready = False
+        return False
+    if exists is None:
+        rebuild_client_search_index(conn)
+    _index_ready = True
+    return True
+
+
+def client_search_ready(db: Session) -> bool:
+    global _index_ready
+    if _index_ready is None:
+        _index_ready = db.get_bind().dialect.name == "sqlite" and db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first() is not None
+    return _index_ready
+
+
+def phone_query_digits(query: str) -> str | None:
+    # a query made of digits and phone separators is a phone number. Its country prefix is dropped when typed
+    # as +7 or when the number is complete (11+ digits starting with 7 or 8): the rest is the national number
+    # that every stored form (+7 916..., 8 916..., 916...) contains
+    query = query.strip()
+    if not _PHONE_QUERY.fullmatch(query):
+        return None
+    digits = "".join(char for char in query if char.isdigit())
+    if query.startswith("+7") or (len(digits) >= 11 and digits[0] in "78"):
+        digits = digits[1:]
+    return digits or None
+
+
+def match_expression(query: str) -> str | None:
+    # every term is matched by prefix; a phone typed with separators becomes a single digit term
+    query = query.strip()
+    digits = phone_query_digits(query)
+    if digits:
+        terms = [digits]
+    else:
+        terms = [term.lower() for term in _TOKEN.findall(query)]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def fts_match(expression: str):  # type: ignore[no-untyped-def]
+    return literal_column(FTS_TABLE).op("MATCH")(expression)
+
+
+def fts_rank():  # type: ignore[no-untyped-def]
+    return func.bm25(literal_column(FTS_TABLE), *FTS_WEIGHTS)
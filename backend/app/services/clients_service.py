@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-import csv
-import io
 import time
+from dataclasses import replace
+from typing import Iterator, Sequence
 
-from sqlalchemy import delete, func, or_, select
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, func, or_, select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.db.session import SessionLocal
 from app.models import (
     Appointment,
     Client,
@@ -15,8 +18,20 @@ from app.models import (
     ClientChild,
     ClientGroupRule,
     ClientLoyaltyProgram,
+    ClientScore,
     Operation,
 )
+from app.schemas.clients import ClientOut
+from app.services.client_search_service import (
+    client_search_ready,
+    clients_fts,
+    fts_match,
+    fts_rank,
+    match_expression,
+    phone_digits,
+    phone_query_digits,
+)
+from app.services.pagination_service import KeysetPage, paginate
 from app.services.security_service import write_audit
 
 
@@ -106,64 +121,133 @@ def _compute_groups(row: Client, rules: list[ClientGroupRule], now_ts: int) -> l
     return groups
 
 
+def load_client_demographics(db: Session, *, salon_id: int, client_ids: list[int]) -> dict[int, tuple[str, int | None]]:
+    if not client_ids:
+        return {}
+    rows = db.execute(
+        select(ClientAnalytics.client_id, ClientAnalytics.gender, ClientAnalytics.birth_year).where(
+            ClientAnalytics.salon_id == salon_id,
+            ClientAnalytics.client_id.in_(client_ids),
+        )
+    )
+    return {client_id: (gender, birth_year) for client_id, gender, birth_year in rows}
+
+
+def client_out(row: Client, gender: str = "unknown", birth_year: int | None = None) -> ClientOut:
+    return ClientOut(
+        id=row.id,
+        tg_id=row.tg_id,
+        username=row.username,
+        full_name=row.full_name,
+        phone=row.phone,
+        whatsapp_phone=row.whatsapp_phone,
+        email=row.email,
+        telegram_username=row.telegram_username,
+        vk_username=row.vk_username,
+        instagram_username=row.instagram_username,
+        facebook_username=row.facebook_username,
+        max_username=row.max_username,
+        address=row.address,
+        birthday=row.birthday,
+        status=row.status,
+        notes=row.notes,
+        tags=_csv_to_tags(row.tags_csv),
+        acquisition_channel_id=row.acquisition_channel_id,
+        visits_count=row.visits_count,
+        total_spent_rub=row.total_spent_rub,
+        last_visit_at=row.last_visit_at,
+        gender=gender,
+        birth_year=birth_year,
+        consent_personal_data=row.consent_personal_data,
+        consent_marketing=row.consent_marketing,
+        consent_sms=row.consent_sms,
+        consent_app_push=row.consent_app_push,
+        consent_email=row.consent_email,
+    )
+
+
+def clients_out(db: Session, rows: Sequence[Client]) -> list[ClientOut]:
+    # one IN query for the demographics of the whole page instead of a lookup per row
+    if not rows:
+        return []
+    demographics = load_client_demographics(db, salon_id=rows[0].salon_id, client_ids=[row.id for row in rows])
+    return [client_out(row, *demographics.get(row.id, ("unknown", None))) for row in rows]
+
+
 def client_to_dict(db: Session, row: Client) -> dict:
-    analytics = _get_client_analytics(db, row.salon_id, row.id)
-    return {
-        "id": row.id,
-        "tg_id": row.tg_id,
-        "username": row.username,
-        "full_name": row.full_name,
-        "phone": row.phone,
-        "whatsapp_phone": row.whatsapp_phone,
-        "email": row.email,
-        "telegram_username": row.telegram_username,
-        "vk_username": row.vk_username,
-        "instagram_username": row.instagram_username,
-        "facebook_username": row.facebook_username,
-        "max_username": row.max_username,
-        "address": row.address,
-        "birthday": row.birthday,
-        "status": row.status,
-        "notes": row.notes,
-        "tags": _csv_to_tags(row.tags_csv),
-        "acquisition_channel_id": row.acquisition_channel_id,
-        "visits_count": row.visits_count,
-        "total_spent_rub": row.total_spent_rub,
-        "last_visit_at": row.last_visit_at,
-        "gender": analytics.gender if analytics else "unknown",
-        "birth_year": analytics.birth_year if analytics else None,
-        "consent_personal_data": row.consent_personal_data,
-        "consent_marketing": row.consent_marketing,
-        "consent_sms": row.consent_sms,
-        "consent_app_push": row.consent_app_push,
-        "consent_email": row.consent_email,
-    }
+    return clients_out(db, [row])[0].model_dump()
+
+
+def _like_filter(query: str):  # type: ignore[no-untyped-def]
+    like = f"%{query.strip()}%"
+    return or_(
+        Client.full_name.ilike(like),
+        Client.phone.ilike(like),
+        Client.whatsapp_phone.ilike(like),
+        Client.email.ilike(like),
+        Client.notes.ilike(like),
+        Client.address.ilike(like),
+        Client.username.ilike(like),
+        Client.telegram_username.ilike(like),
+        Client.vk_username.ilike(like),
+        Client.instagram_username.ilike(like),
+        Client.facebook_username.ilike(like),
+        Client.max_username.ilike(like),
+    )
 
 
-def list_clients(db: Session, *, salon_id: int, query: str | None, page: int, page_size: int):
+def list_clients(
+    db: Session,
+    *,
+    salon_id: int,
+    query: str | None,
+    page: int,
+    page_size: int,
+    rfm_segment: str | None = None,
+    sort: str = "new",
+    cursor: str | None = None,
+    with_total: bool = True,
+) -> KeysetPage:
     q = select(Client).where(Client.salon_id == salon_id)
-    if query:
-        like = f"%{query.strip()}%"
-        q = q.where(
-            or_(
-                Client.full_name.ilike(like),
-                Client.phone.ilike(like),
-                Client.whatsapp_phone.ilike(like),
-                Client.email.ilike(like),
-                Client.notes.ilike(like),
-                Client.address.ilike(like),
-                Client.username.ilike(like),
-                Client.telegram_username.ilike(like),
-                Client.vk_username.ilike(like),
-                Client.instagram_username.ilike(like),
-                Client.facebook_username.ilike(like),
-                Client.max_username.ilike(like),
-            )
+    if rfm_segment:
+        q = q.join(ClientScore, and_(ClientScore.client_id == Client.id, ClientScore.salon_id == salon_id)).where(
+            ClientScore.segment == rfm_segment
         )
-    q = q.order_by(Client.id.desc())
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    items = db.execute(q.offset((page - 1) * page_size).limit(page_size)).scalars().all()
-    return items, int(total)
+    expression = match_expression(query) if query and client_search_ready(db) else None
+    if expression:
+        q = q.join(clients_fts, clients_fts.c.rowid == Client.id).where(fts_match(expression))
+    elif query:
+        digits = phone_query_digits(query)
+        if digits:
+            # without the index a number is found by any run of its digits, e.g. the last four
+            matches = [phone_digits(col).contains(digits) for col in (Client.phone, Client.whatsapp_phone)]
+            q = q.where(or_(*matches, _like_filter(query)))
+        else:
+            q = q.where(_like_filter(query))
+    if expression and sort == "relevance":
+        # bm25 is computed per query and cannot bound a keyset, relevance pages stay offset-based
+        if cursor:
+            raise HTTPException(status_code=400, detail="Курсор не поддерживается при сортировке по релевантности")
+        result = paginate(
+            db,
+            q,
+            order=[(fts_rank(), False), (Client.id, True)],
+            key=lambda row: (row.id,),
+            page=page,
+            page_size=page_size,
+            with_total=with_total,
+        )
+        return replace(result, next_cursor=None)
+    return paginate(
+        db,
+        q,
+        order=[(Client.id, True)],
+        key=lambda row: (row.id,),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+    )
 
 
 def get_client(db: Session, *, salon_id: int, client_id: int) -> Client:
@@ -505,73 +589,97 @@ def replace_group_rules(
     return list_group_rules(db, salon_id=salon_id)
 
 
-def render_clients_export_csv(db: Session, *, salon_id: int) -> str:
-    clients = db.execute(select(Client).where(Client.salon_id == salon_id).order_by(Client.id.asc())).scalars().all()
-    rules = list_group_rules(db, salon_id=salon_id)
-    now_ts = int(time.time())
-
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(
+CLIENT_EXPORT_HEADER = [
+    "id",
+    "full_name",
+    "phone",
+    "whatsapp_phone",
+    "telegram_username",
+    "vk_username",
+    "instagram_username",
+    "email",
+    "birthday",
+    "children",
+    "consent_personal_data",
+    "consent_marketing",
+    "consent_sms",
+    "consent_app_push",
+    "consent_email",
+    "visits_count",
+    "total_spent_rub",
+    "last_visit_at",
+    "groups",
+    "loyalty_programs",
+]
+
+
+def _names_by_client(db: Session, model, name_col, *, salon_id: int, client_ids: list[int]) -> dict[int, list[str]]:  # type: ignore[no-untyped-def]
+    out: dict[int, list[str]] = {}
+    rows = db.execute(
+        select(model.client_id, name_col)
+        .where(model.salon_id == salon_id, model.client_id.in_(client_ids))
+        .order_by(model.client_id.asc(), model.id.asc())
+    )
+    for client_id, name in rows:
+        out.setdefault(client_id, []).append(name)
+    return out
+
+
+def _client_export_rows(
+    db: Session, clients: Sequence[Client], rules: list[ClientGroupRule], now_ts: int
+) -> list[list]:
+    salon_id = clients[0].salon_id
+    ids = [client.id for client in clients]
+    children = _names_by_client(db, ClientChild, ClientChild.full_name, salon_id=salon_id, client_ids=ids)
+    loyalty = _names_by_client(
+        db, ClientLoyaltyProgram, ClientLoyaltyProgram.program_name, salon_id=salon_id, client_ids=ids
+    )
+    return [
         [
-            "id",
-            "full_name",
-            "phone",
-            "whatsapp_phone",
-            "telegram_username",
-            "vk_username",
-            "instagram_username",
-            "email",
-            "birthday",
-            "children",
-            "consent_personal_data",
-            "consent_marketing",
-            "consent_sms",
-            "consent_app_push",
-            "consent_email",
-            "visits_count",
-            "total_spent_rub",
-            "last_visit_at",
-            "groups",
-            "loyalty_programs",
+            client.id,
+            client.full_name,
+            client.phone,
+            client.whatsapp_phone,
+            client.telegram_username,
+            client.vk_username,
+            client.instagram_username,
+            client.email,
+            client.birthday,
+            "; ".join(children.get(client.id, [])),
+            client.consent_personal_data,
+            client.consent_marketing,
+            client.consent_sms,
+            client.consent_app_push,
+            client.consent_email,
+            client.visits_count,
+            client.total_spent_rub,
+            client.last_visit_at or "",
+            "; ".join(_compute_groups(client, rules, now_ts)),
+            "; ".join(loyalty.get(client.id, [])),
         ]
-    )
-    for client in clients:
-        children = db.execute(
-            select(ClientChild.full_name).where(
-                ClientChild.salon_id == salon_id,
-                ClientChild.client_id == client.id,
-            )
-        ).scalars().all()
-        loyalty = db.execute(
-            select(ClientLoyaltyProgram.program_name).where(
-                ClientLoyaltyProgram.salon_id == salon_id,
-                ClientLoyaltyProgram.client_id == client.id,
-            )
-        ).scalars().all()
-        groups = _compute_groups(client, rules, now_ts)
-        writer.writerow(
-            [
-                client.id,
-                client.full_name,
-                client.phone,
-                client.whatsapp_phone,
-                client.telegram_username,
-                client.vk_username,
-                client.instagram_username,
-                client.email,
-                client.birthday,
-                "; ".join(children),
-                client.consent_personal_data,
-                client.consent_marketing,
-                client.consent_sms,
-                client.consent_app_push,
-                client.consent_email,
-                client.visits_count,
-                client.total_spent_rub,
-                client.last_visit_at or "",
-                "; ".join(groups),
-                "; ".join(loyalty),
-            ]
-        )
-    return buf.getvalue()
+        for client in clients
+    ]
+
+
+def iter_client_export_batches(*, salon_id: int, batch_size: int) -> Iterator[list[list]]:
+    # keyset batches over clients with children and loyalty programs prefetched per batch. Every batch is
+    # read on a short read-only session of its own: a slowly consumed download holds neither a connection
+    # nor a WAL snapshot between batches
+    read_only = settings.READ_ONLY_SESSIONS_ENABLED
+    with SessionLocal(info={"read_only": read_only}) as db:
+        rules = [rule for rule in list_group_rules(db, salon_id=salon_id) if rule.is_active]
+    now_ts = int(time.time())
+    last_id = 0
+    while True:
+        with SessionLocal(info={"read_only": read_only}) as db:
+            clients = db.execute(
+                select(Client)
+                .where(Client.salon_id == salon_id, Client.id > last_id)
+                .order_by(Client.id.asc())
+                .limit(batch_size)
+            ).scalars().all()
+            if not clients:
+                return
+            rows = _client_export_rows(db, clients, rules, now_ts)
+        last_id = rows[-1][0]
+        yield rows
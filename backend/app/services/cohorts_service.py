@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import CohortMonthCell, CohortMonthStatus, Operation
+from app.services.analytics_mirror_service import mirror_covers, mirror_query
+from app.services.local_calendar_service import month_expr, month_first_key, month_of_key, salon_calendar
+
+
+@dataclass(frozen=True)
+class CohortCellTotals:
+    activity_month: int
+    cohort_month: int
+    clients: int
+    purchases: int
+    revenue_rub: int
+
+
+def month_index(ts: int) -> int:
+    moment = datetime.fromtimestamp(ts, tz=timezone.utc)
+    return moment.year * 12 + moment.month - 1
+
+
+def month_start(month: int) -> int:
+    return int(datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def month_label(month: int) -> str:
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+def _compute_cells_columnar(*, salon_id: int, first_day: int, last_day: int) -> list[CohortCellTotals]:
+    month = (
+        "year(DATE '1970-01-01' + CAST({col} AS INTEGER)) * 12"
+        " + month(DATE '1970-01-01' + CAST({col} AS INTEGER)) - 1"
+    )
+    rows = mirror_query(
+        f"""
+        WITH ops AS (
+            SELECT client_id, day_key, amount_rub FROM {{operations}}
+            WHERE salon_id = ? AND op_type = 'purchase' AND day_key <= ?
+        ),
+        firsts AS (SELECT client_id, min(day_key) AS first_day FROM ops GROUP BY client_id)
+        SELECT {month.format(col="o.day_key")}, {month.format(col="f.first_day")},
+               count(DISTINCT o.client_id), count(*), coalesce(sum(o.amount_rub), 0)
+        FROM ops o JOIN firsts f USING (client_id)
+        WHERE o.day_key >= ?
+        GROUP BY 1, 2
+        """,
+        [salon_id, last_day, first_day],
+    )
+    return [
+        CohortCellTotals(
+            activity_month=int(activity),
+            cohort_month=int(cohort),
+            clients=int(clients),
+            purchases=int(purchases),
+            revenue_rub=int(revenue),
+        )
+        for activity, cohort, clients, purchases, revenue in rows
+    ]
+
+
+def _compute_cells(db: Session, *, salon_id: int, first_month: int, last_month: int) -> list[CohortCellTotals]:
+    # months are calendar months of the salon timezone, taken from the local day key of each operation
+    first_day = month_first_key(first_month)
+    last_day = month_first_key(last_month + 1) - 1
+    calendar = salon_calendar(db, salon_id)
+    if mirror_covers(db, "operations", calendar.day_start(last_day + 1) - 1):
+        return _compute_cells_columnar(salon_id=salon_id, first_day=first_day, last_day=last_day)
+    first_purchase = (
+        select(Operation.client_id, func.min(Operation.day_key).label("first_day"))
+        .where(
+            and_(
+                Operation.salon_id == salon_id,
+                Operation.op_type == "purchase",
+                Operation.day_key <= last_day,
+            )
+        )
+        .group_by(Operation.client_id)
+        .subquery()
+    )
+    activity_col = month_expr(Operation.day_key).label("activity_month")
+    cohort_col = month_expr(first_purchase.c.first_day).label("cohort_month")
+    rows = db.execute(
+        select(
+            activity_col,
+            cohort_col,
+            func.count(func.distinct(Operation.client_id)),
+            func.count(),
+            func.coalesce(func.sum(Operation.amount_rub), 0),
+        )
+        .join(first_purchase, first_purchase.c.client_id == Operation.client_id)
+        .where(
+            and_(
+                Operation.salon_id == salon_id,
+                Operation.op_type == "purchase",
+                Operation.day_key.between(first_day, last_day),
+            )
+        )
+        .group_by(activity_col, cohort_col)
+    ).all()
+    return [
+        CohortCellTotals(
+            activity_month=int(activity),
+            cohort_month=int(cohort),
+            clients=int(clients),
+            purchases=int(purchases),
+            revenue_rub=int(revenue),
+        )
+        for activity, cohort, clients, purchases, revenue in rows
+    ]
+
+
+def _store_closed_months(
+    db: Session, *, salon_id: int, months: list[int], cells: list[CohortCellTotals], now_ts: int
+) -> None:
+    db.execute(
+        delete(CohortMonthCell).where(
+            and_(CohortMonthCell.salon_id == salon_id, CohortMonthCell.activity_month.in_(months))
+        )
+    )
+    wanted = set(months)
+    values = [
+        {
+            "salon_id": salon_id,
+            "activity_month": cell.activity_month,
+            "cohort_month": cell.cohort_month,
+            "clients": cell.clients,
+            "purchases": cell.purchases,
+            "revenue_rub": cell.revenue_rub,
+        }
+        for cell in cells
+        if cell.activity_month in wanted
+    ]
+    if values:
+        stmt = sqlite_insert(CohortMonthCell)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["salon_id", "activity_month", "cohort_month"],
+                set_={key: stmt.excluded[key] for key in ("clients", "purchases", "revenue_rub")},
+            ),
+            values,
+        )
+    stmt = sqlite_insert(CohortMonthStatus)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["salon_id", "activity_month"],
+            set_={"computed_at": stmt.excluded.computed_at},
+        ),
+        [{"salon_id": salon_id, "activity_month": month, "computed_at": now_ts} for month in months],
+    )
+
+
+def load_cohort_cells(
+    db: Session,
+    *,
+    salon_id: int,
+    first_month: int,
+    last_month: int,
+    now_ts: int | None = None,
+    refresh: bool = False,
+) -> tuple[list[CohortCellTotals], int]:
+    # closed months are computed once and persisted, only the running month is aggregated on every call;
+    # operations are stamped with the time of creation, so a closed month no longer changes
+    now_ts = now_ts or int(time.time())
+    current_month = month_of_key(salon_calendar(db, salon_id).day_key(now_ts))
+    closed_last = min(last_month, current_month - 1)
+
+    computed = 0
+    cells: list[CohortCellTotals] = []
+    if closed_last >= first_month:
+        done = set() if refresh else set(
+            db.execute(
+                select(CohortMonthStatus.activity_month).where(
+                    and_(
+                        CohortMonthStatus.salon_id == salon_id,
+                        CohortMonthStatus.activity_month.between(first_month, closed_last),
+                    )
+                )
+            ).scalars()
+        )
+        missing = [month for month in range(first_month, closed_last + 1) if month not in done]
+        if missing:
+            fresh = _compute_cells(db, salon_id=salon_id, first_month=missing[0], last_month=missing[-1])
+            _store_closed_months(db, salon_id=salon_id, months=missing, cells=fresh, now_ts=now_ts)
+            computed = len(missing)
+        cells = [
+            CohortCellTotals(
+                activity_month=row.activity_month,
+                cohort_month=row.cohort_month,
+                clients=row.clients,
+                purchases=row.purchases,
+                revenue_rub=row.revenue_rub,
+            )
+            for row in db.execute(
+                select(CohortMonthCell).where(
+                    and_(
+                        CohortMonthCell.salon_id == salon_id,
+                        CohortMonthCell.activity_month.between(first_month, closed_last),
+                    )
+                )
+            ).scalars()
+        ]
+    if last_month >= current_month:
+        cells.extend(_compute_cells(db, salon_id=salon_id, first_month=current_month, last_month=current_month))
+    return cells, computed
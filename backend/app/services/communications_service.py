@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from app.models import (
     Appointment,
     Client,
+    ClientScore,
     CommunicationCampaign,
     CommunicationRecipient,
     CommunicationStep,
@@ -119,6 +120,11 @@ def _selected_clients(db: Session, salon_id: int, audience_type: str) -> list[Cl
     q = select(Client).where(Client.salon_id == salon_id, Client.consent_personal_data == True)
     if audience_type == "consented_marketing":
         q = q.where(Client.consent_marketing == True)
+    elif audience_type.startswith("rfm_"):
+        # audiences by RFM segment read the scores written by the nightly scoring job
+        q = q.join(ClientScore, and_(ClientScore.client_id == Client.id, ClientScore.salon_id == salon_id)).where(
+            Client.consent_marketing == True, ClientScore.segment == audience_type.removeprefix("rfm_")
+        )
     return db.execute(q).scalars().all()
 
 
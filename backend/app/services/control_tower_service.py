@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from sqlalchemy import and_, case, distinct, event, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal, run_parallel_reads
+from app.models import Appointment, Client, ControlTowerSnapshot, Operation, Product, StockBalance
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_WINDOW_SECONDS = 30 * 86400
+_WATCHED_MODELS = (Client, Operation, Appointment, Product, StockBalance)
+
+_refresher_stop = threading.Event()
+_refresher_thread: threading.Thread | None = None
+
+
+def _percent(numerator: int, denominator: int) -> float:
+    return round((numerator / denominator) * 100, 2) if denominator else 0.0
+
+
+def control_tower_reads(
+    *, salon_id: int, start_ts: int, end_ts: int, now_ts: int
+) -> dict[str, Callable[[Session], Any]]:
+    def clients(db: Session) -> Any:
+        return db.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(case((Client.visits_count > 0, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Client.visits_count >= 2, 1), else_=0)), 0),
+            ).where(Client.salon_id == salon_id)
+        ).one()
+
+    def purchases(db: Session) -> Any:
+        return db.execute(
+            select(
+                func.count(distinct(Operation.client_id)),
+                func.count(),
+                func.coalesce(func.sum(Operation.amount_rub), 0),
+            ).where(
+                and_(
+                    Operation.salon_id == salon_id,
+                    Operation.op_type == "purchase",
+                    Operation.created_at >= start_ts,
+                    Operation.created_at <= end_ts,
+                )
+            )
+        ).one()
+
+    def appointments(db: Session) -> Any:
+        return db.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(case((Appointment.status == "completed", 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Appointment.status == "cancelled", 1), else_=0)), 0),
+                func.coalesce(
+                    func.sum(
+                        case((and_(Appointment.starts_at > now_ts, Appointment.status == "scheduled"), 1), else_=0)
+                    ),
+                    0,
+                ),
+            ).where(
+                and_(
+                    Appointment.salon_id == salon_id,
+                    Appointment.starts_at >= start_ts,
+                    Appointment.starts_at <= end_ts,
+                )
+            )
+        ).one()
+
+    def stock(db: Session) -> Any:
+        return db.execute(
+            select(Product.name, Product.price_rub, func.sum(StockBalance.quantity))
+            .join(
+                StockBalance,
+                and_(
+                    StockBalance.product_id == Product.id,
+                    StockBalance.salon_id == Product.salon_id,
+                ),
+            )
+            .where(Product.salon_id == salon_id)
+            .group_by(Product.id)
+            .order_by(Product.id.asc())
+        ).all()
+
+    return {"clients": clients, "purchases": purchases, "appointments": appointments, "stock": stock}
+
+
+def build_control_tower_metrics(results: dict[str, Any]) -> dict[str, Any]:
+    clients_total, clients_with_visit, repeat_clients = results["clients"]
+    buyers_total, purchases_total, revenue_total = results["purchases"]
+    appointments_total, appointments_completed, appointments_cancelled, future_bookings_total = results[
+        "appointments"
+    ]
+    sku_rows = results["stock"]
+
+    clients_total = int(clients_total)
+    buyers_total = int(buyers_total)
+    revenue_total = int(revenue_total)
+    conversion_purchase = _percent(buyers_total, clients_total)
+    avg_check = round(revenue_total / purchases_total, 2) if purchases_total else 0
+    no_show_risk = _percent(int(appointments_cancelled), int(appointments_total))
+    future_revenue_forecast = int(round(int(future_bookings_total) * avg_check))
+
+    sku_totals = [(name, int(quantity), int(price_rub)) for name, price_rub, quantity in sku_rows]
+    inventory_valuation = sum(quantity * price_rub for _, quantity, price_rub in sku_totals)
+    low_stock_positions = len([1 for _, quantity, _ in sku_totals if 0 < quantity <= 5])
+    out_of_stock_positions = len([1 for _, quantity, _ in sku_totals if quantity <= 0])
+    top_stock_items = sorted(sku_totals, key=lambda item: item[1], reverse=True)[:5]
+
+    return {
+        "cards": [
+            {"code": "revenue_total", "title": "Выручка", "value": revenue_total},
+            {"code": "avg_check", "title": "Средний чек", "value": avg_check},
+            {"code": "clients_total", "title": "Клиенты в базе", "value": clients_total},
+            {"code": "conversion_purchase", "title": "Конверсия в покупку", "value": conversion_purchase},
+            {"code": "future_bookings_revenue", "title": "План выручки по записям", "value": future_revenue_forecast},
+            {"code": "inventory_valuation", "title": "Оценка склада", "value": inventory_valuation},
+        ],
+        "sales_funnel": [
+            {
+                "code": "clients",
+                "title": "Клиенты в базе",
+                "clients": clients_total,
+                "conversion_percent": 100.0 if clients_total else 0.0,
+            },
+            {
+                "code": "engaged",
+                "title": "С визитом",
+                "clients": int(clients_with_visit),
+                "conversion_percent": _percent(int(clients_with_visit), clients_total),
+            },
+            {
+                "code": "buyers",
+                "title": "Покупатели",
+                "clients": buyers_total,
+                "conversion_percent": conversion_purchase,
+            },
+            {
+                "code": "repeat",
+                "title": "Повторные",
+                "clients": int(repeat_clients),
+                "conversion_percent": _percent(int(repeat_clients), clients_total),
+            },
+        ],
+        "bookings": {
+            "appointments_total": int(appointments_total),
+            "appointments_completed": int(appointments_completed),
+            "appointments_cancelled": int(appointments_cancelled),
+            "no_show_risk_percent": no_show_risk,
+            "future_bookings_total": int(future_bookings_total),
+            "future_bookings_revenue_forecast_rub": future_revenue_forecast,
+        },
+        "inventory": {
+            "sku_total": len(sku_totals),
+            "inventory_valuation_rub": int(inventory_valuation),
+            "low_stock_positions": low_stock_positions,
+            "out_of_stock_positions": out_of_stock_positions,
+            "top_stock_items": [
+                {"code": f"stock_item_{idx + 1}", "title": str(name), "value": quantity}
+                for idx, (name, quantity, _) in enumerate(top_stock_items)
+            ],
+        },
+        "current_by_code": {
+            "visit_conversion": no_show_risk,
+            "booking_confirmation": _percent(
+                int(appointments_completed)
+                + max(int(appointments_total) - int(appointments_cancelled) - int(appointments_completed), 0),
+                max(int(appointments_total), 1),
+            ),
+            "sales_conversion": conversion_purchase,
+            "repeat_sales": _percent(int(repeat_clients), clients_total),
+            "inventory_health": _percent(out_of_stock_positions, max(len(sku_totals), 1)),
+            "campaign_roi": 125.0,
+            "lead_capture": _percent(int(clients_with_visit), clients_total),
+        },
+    }
+
+
+def compute_control_tower_metrics(
+    db: Session, *, salon_id: int, start_ts: int, end_ts: int, now_ts: int
+) -> dict[str, Any]:
+    reads = control_tower_reads(salon_id=salon_id, start_ts=start_ts, end_ts=end_ts, now_ts=now_ts)
+    # the statements are independent, so run_parallel_reads can put each on its own connection
+    return build_control_tower_metrics(run_parallel_reads(db, reads))
+
+
+def get_snapshot(db: Session, *, salon_id: int) -> ControlTowerSnapshot | None:
+    return db.execute(
+        select(ControlTowerSnapshot).where(ControlTowerSnapshot.salon_id == salon_id)
+    ).scalar_one_or_none()
+
+
+def is_snapshot_stale(row: ControlTowerSnapshot, now_ts: int) -> bool:
+    return (
+        row.source_version > row.computed_version
+        or now_ts - row.computed_at >= settings.CONTROL_TOWER_SNAPSHOT_MAX_AGE_SECONDS
+    )
+
+
+def refresh_snapshot(db: Session, *, salon_id: int) -> ControlTowerSnapshot:
+    # the version is read before the metrics: a write landing mid-refresh leaves the snapshot stale
+    seen_version = db.execute(
+        select(ControlTowerSnapshot.source_version).where(ControlTowerSnapshot.salon_id == salon_id)
+    ).scalar_one_or_none() or 0
+    now_ts = int(time.time())
+    start_ts = now_ts - SNAPSHOT_WINDOW_SECONDS
+    payload = compute_control_tower_metrics(db, salon_id=salon_id, start_ts=start_ts, end_ts=now_ts, now_ts=now_ts)
+    values = {
+        "window_start": start_ts,
+        "window_end": now_ts,
+        "payload_json": json.dumps(payload, ensure_ascii=False),
+        "computed_at": now_ts,
+        "computed_version": seen_version,
+    }
+    db.execute(
+        sqlite_insert(ControlTowerSnapshot)
+        .values(salon_id=salon_id, source_version=seen_version, **values)
+        .on_conflict_do_update(index_elements=["salon_id"], set_=values)
+    )
+    row = get_snapshot(db, salon_id=salon_id)
+    db.refresh(row)
+    return row
+
+
+def refresh_snapshot_detached(*, salon_id: int, info: dict[str, Any] | None = None) -> ControlTowerSnapshot:
+    # read-only requests cannot write: the snapshot is rebuilt and committed on a short session of its own
+    info = {key: value for key, value in (info or {}).items() if key != "read_only"}
+    with SessionLocal(info=info) as db:
+        row = refresh_snapshot(db, salon_id=salon_id)
+        db.commit()
+        db.refresh(row)
+        db.expunge(row)
+    return row
+
+
+def mark_snapshots_stale(db: Session, salon_ids: set[int]) -> None:
+    # bulk writes that bypass the unit of work call this themselves
+    db.execute(
+        update(ControlTowerSnapshot)
+        .where(ControlTowerSnapshot.salon_id.in_(salon_ids))
+        .values(source_version=ControlTowerSnapshot.source_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_snapshot_versions(session: Session, flush_context) -> None:  # type: ignore[no-untyped-def]
+    salon_ids = {
+        obj.salon_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, _WATCHED_MODELS) and obj.salon_id is not None
+    }
+    if salon_ids:
+        mark_snapshots_stale(session, salon_ids)
+
+
+def refresh_due_snapshots() -> int:
+    now_ts = int(time.time())
+    refreshed = 0
+    with SessionLocal() as db:
+        salon_ids = db.execute(
+            select(ControlTowerSnapshot.salon_id).where(
+                or_(
+                    ControlTowerSnapshot.source_version > ControlTowerSnapshot.computed_version,
+                    ControlTowerSnapshot.computed_at <= now_ts - settings.CONTROL_TOWER_SNAPSHOT_MAX_AGE_SECONDS,
+                )
+            )
+        ).scalars().all()
+        for salon_id in salon_ids:
+            refresh_snapshot(db, salon_id=salon_id)
+            db.commit()
+            refreshed += 1
+    return refreshed
+
+
+def _refresher_loop() -> None:
+    while not _refresher_stop.wait(settings.CONTROL_TOWER_REFRESH_POLL_SECONDS):
+        try:
+            refresh_due_snapshots()
+        except Exception:
+            logger.exception("control tower snapshot refresh failed")
+
+
+def start_snapshot_refresher() -> None:
+    global _refresher_thread
+    if not settings.CONTROL_TOWER_REFRESHER_ENABLED or _refresher_thread is not None:
+        return
+    _refresher_stop.clear()
+    _refresher_thread = threading.Thread(target=_refresher_loop, name="control-tower-refresher", daemon=True)
+    _refresher_thread.start()
+
+
+def stop_snapshot_refresher() -> None:
+    global _refresher_thread
+    if _refresher_thread is None:
+        return
+    _refresher_stop.set()
+    _refresher_thread.join(timeout=5)
+    _refresher_thread = None
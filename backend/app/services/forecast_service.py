@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import itertools
+import json
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Appointment, ForecastModel, Operation
+from app.services.local_calendar_service import DAY_SECONDS, SalonCalendar, salon_calendar
+from app.services.operation_rollups_service import load_operation_daily
+
+FORECAST_METRICS = ("new_clients", "revenue", "bookings")
+HISTORY_DAYS = 365
+SEASON_LENGTH = 7
+BACKTEST_DAYS = 28
+MIN_HOLT_DAYS = 4
+
+_ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.7)
+_BETAS = (0.0, 0.01, 0.05, 0.1, 0.2)
+_GAMMAS = (0.05, 0.1, 0.2, 0.3, 0.5)
+
+
+@dataclass(frozen=True)
+class FittedSeries:
+    method: str
+    alpha: float
+    beta: float
+    gamma: float
+    season_length: int
+    level: float
+    trend: float
+    seasonals: list[float]
+
+
+def _phase(day_key: int, season_length: int) -> int:
+    return day_key % season_length
+
+
+def load_daily_series(db: Session, *, salon_id: int, metric: str, start_day: int, end_day: int) -> list[float]:
+    # days are local day keys of the salon calendar, both ends included
+    calendar = salon_calendar(db, salon_id)
+    start_ts = calendar.day_start(start_day)
+    end_ts = calendar.day_start(end_day + 1) - 1
+    by_day: dict[int, float] = {}
+    if metric == "revenue":
+        for row in load_operation_daily(db, salon_id=salon_id, start_ts=start_ts, end_ts=end_ts):
+            if row.op_type == "purchase":
+                by_day[row.day_key] = by_day.get(row.day_key, 0) + row.turnover_rub
+    elif metric == "bookings":
+        for seg_start, seg_end, offset in calendar.offset_segments(start_ts, end_ts):
+            day_col = (Appointment.starts_at + offset) // DAY_SECONDS
+            for day, count in db.execute(
+                select(day_col, func.count())
+                .where(
+                    and_(
+                        Appointment.salon_id == salon_id,
+                        Appointment.status != "cancelled",
+                        Appointment.starts_at.between(seg_start, seg_end),
+                    )
+                )
+                .group_by(day_col)
+            ):
+                by_day[int(day)] = by_day.get(int(day), 0) + count
+    else:
+        # a client is new on the day of their first purchase
+        first_purchase = (
+            select(func.min(Operation.day_key).label("first_day"))
+            .where(
+                and_(
+                    Operation.salon_id == salon_id,
+                    Operation.op_type == "purchase",
+                    Operation.client_id.is_not(None),
+                    Operation.day_key <= end_day,
+                )
+            )
+            .group_by(Operation.client_id)
+            .subquery()
+        )
+        by_day = dict(
+            db.execute(
+                select(first_purchase.c.first_day, func.count())
+                .where(first_purchase.c.first_day >= start_day)
+                .group_by(first_purchase.c.first_day)
+            ).all()
+        )
+    return [float(by_day.get(day, 0)) for day in range(start_day, end_day + 1)]
+
+
+def _smooth(
+    values: list[float], first_day: int, season_length: int, alpha: float, beta: float, gamma: float
+) -> tuple[float, float, float, list[float]]:
+    # additive Holt-Winters; season_length == 1 with gamma == 0 degenerates to Holt's linear trend
+    if season_length > 1:
+        level = sum(values[:season_length]) / season_length
+        second = values[season_length : 2 * season_length]
+        trend = (sum(second) / season_length - level) / season_length
+    else:
+        level, trend = values[0], 0.0
+    seasonals = [0.0] * season_length
+    for idx in range(season_length if season_length > 1 else 0):
+        seasonals[_phase(first_day + idx, season_length)] = values[idx] - level
+
+    sse = 0.0
+    phase = _phase(first_day + season_length, season_length)
+    for value in values[season_length:]:
+        seasonal = seasonals[phase]
+        error = value - (level + trend + seasonal)
+        sse += error * error
+        new_level = alpha * (value - seasonal) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonals[phase] = gamma * (value - new_level) + (1 - gamma) * seasonal
+        level = new_level
+        phase = (phase + 1) % season_length
+    return sse, level, trend, seasonals
+
+
+def fit_series(values: list[float], first_day: int) -> FittedSeries:
+    if len(values) >= 2 * SEASON_LENGTH:
+        method, season_length, grid = "holt_winters", SEASON_LENGTH, itertools.product(_ALPHAS, _BETAS, _GAMMAS)
+    elif len(values) >= MIN_HOLT_DAYS:
+        method, season_length, grid = "holt", 1, itertools.product(_ALPHAS, _BETAS, (0.0,))
+    else:
+        mean = sum(values) / len(values) if values else 0.0
+        return FittedSeries("mean", 0.0, 0.0, 0.0, 1, mean, 0.0, [0.0])
+
+    best: tuple[float, float, float, float, float, float, list[float]] | None = None
+    for alpha, beta, gamma in grid:
+        sse, level, trend, seasonals = _smooth(values, first_day, season_length, alpha, beta, gamma)
+        if best is None or sse < best[0]:
+            best = (sse, alpha, beta, gamma, level, trend, seasonals)
+    _, alpha, beta, gamma, level, trend, seasonals = best
+    return FittedSeries(method, alpha, beta, gamma, season_length, level, trend, seasonals)
+
+
+def forecast_days(
+    *, level: float, trend: float, seasonals: list[float], season_length: int, last_day: int, days: list[int]
+) -> list[float]:
+    values = []
+    for day in days:
+        horizon = max(day - last_day, 1)
+        value = level + horizon * trend + seasonals[_phase(day, season_length)]
+        values.append(max(value, 0.0))
+    return values
+
+
+def evaluate_model(row: ForecastModel, calendar: SalonCalendar, days: list[int]) -> list[float]:
+    return forecast_days(
+        level=row.level,
+        trend=row.trend,
+        seasonals=json.loads(row.seasonals_json),
+        season_length=row.season_length,
+        last_day=calendar.day_key(row.last_day_ts),
+        days=days,
+    )
+
+
+def _backtest(values: list[float], first_day: int) -> tuple[int, float | None, float | None]:
+    holdout = min(BACKTEST_DAYS, len(values) // 4)
+    if holdout < 1 or len(values) - holdout < MIN_HOLT_DAYS:
+        return 0, None, None
+    train, actual = values[:-holdout], values[-holdout:]
+    fitted = fit_series(train, first_day)
+    last_train_day = first_day + len(train) - 1
+    predicted = forecast_days(
+        level=fitted.level,
+        trend=fitted.trend,
+        seasonals=fitted.seasonals,
+        season_length=fitted.season_length,
+        last_day=last_train_day,
+        days=[last_train_day + idx + 1 for idx in range(holdout)],
+    )
+    mae = sum(abs(a - p) for a, p in zip(actual, predicted)) / holdout
+    # symmetric MAPE tolerates the zero days that are common for small salons
+    smape = sum(2 * abs(a - p) / (abs(a) + abs(p)) for a, p in zip(actual, predicted) if a or p) / holdout * 100
+    return holdout, mae, smape
+
+
+def fit_salon_forecasts(db: Session, *, salon_id: int, now_ts: int | None = None) -> list[ForecastModel]:
+    now_ts = now_ts or int(time.time())
+    # the current day is incomplete and would drag the level down
+    calendar = salon_calendar(db, salon_id)
+    last_day = calendar.day_key(now_ts) - 1
+    start_day = last_day - (HISTORY_DAYS - 1)
+    existing = {
+        row.metric: row
+        for row in db.execute(select(ForecastModel).where(ForecastModel.salon_id == salon_id)).scalars().all()
+    }
+
+    rows: list[ForecastModel] = []
+    for metric in FORECAST_METRICS:
+        values = load_daily_series(db, salon_id=salon_id, metric=metric, start_day=start_day, end_day=last_day)
+        first_active = next((idx for idx, value in enumerate(values) if value), len(values))
+        values = values[first_active:]
+        first_day = start_day + first_active
+
+        backtest_days, mae, smape = _backtest(values, first_day)
+        fitted = fit_series(values, first_day)
+        row = existing.get(metric)
+        if row is None:
+            row = ForecastModel(
+                salon_id=salon_id, metric=metric, last_day_ts=calendar.day_start(last_day), fitted_at=now_ts
+            )
+            db.add(row)
+        row.method = fitted.method
+        row.alpha = fitted.alpha
+        row.beta = fitted.beta
+        row.gamma = fitted.gamma
+        row.season_length = fitted.season_length
+        row.level = fitted.level
+        row.trend = fitted.trend
+        row.seasonals_json = json.dumps(fitted.seasonals)
+        row.last_day_ts = calendar.day_start(last_day)
+        row.observations = len(values)
+        row.backtest_days = backtest_days
+        row.backtest_mae = None if mae is None else round(mae, 4)
+        row.backtest_smape_percent = None if smape is None else round(smape, 2)
+        row.fitted_at = now_ts
+        rows.append(row)
+    db.flush()
+    return rows
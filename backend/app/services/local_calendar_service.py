@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import Integer, and_, cast, event, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import AppPageEvent, ClientAnalytics, Operation, Salon
+
+DEFAULT_TIMEZONE = "Europe/Moscow"
+DAY_SECONDS = 86400
+BUCKET_DETAILINGS = ("day", "week", "month")
+
+# event tables that carry a precomputed local day number next to their creation time
+DAY_KEY_MODELS = (Operation, ClientAnalytics, AppPageEvent)
+
+_EPOCH = date(1970, 1, 1)
+_salon_timezones: dict[int, str] = {}
+_salon_timezone_generations: dict[int, int] = {}
+_salon_timezones_lock = threading.Lock()
+_PENDING_TIMEZONES_KEY = "salon_timezones_changed"
+
+
+def day_key_date(key: int) -> date:
+    return _EPOCH + timedelta(days=key)
+
+
+def bucket_key(key: int, detailing: str) -> int:
+    # weeks start on Monday (1970-01-01 was a Thursday), months on the 1st
+    if detailing == "week":
+        return key - (key + 3) % 7
+    if detailing == "month":
+        return key - day_key_date(key).day + 1
+    return key
+
+
+def bucket_key_expr(day_key_col, detailing: str):  # type: ignore[no-untyped-def]
+    if detailing == "week":
+        return day_key_col - (day_key_col + 3) % 7
+    if detailing == "month":
+        day_of_month = cast(func.strftime("%d", day_key_col * DAY_SECONDS, "unixepoch"), Integer)
+        return day_key_col - day_of_month + 1
+    return day_key_col
+
+
+def month_of_key(key: int) -> int:
+    day = day_key_date(key)
+    return day.year * 12 + day.month - 1
+
+
+def month_first_key(month: int) -> int:
+    return (date(month // 12, month % 12 + 1, 1) - _EPOCH).days
+
+
+def month_expr(day_key_col):  # type: ignore[no-untyped-def]
+    moment = day_key_col * DAY_SECONDS
+    return (
+        cast(func.strftime("%Y", moment, "unixepoch"), Integer) * 12
+        + cast(func.strftime("%m", moment, "unixepoch"), Integer)
+        - 1
+    )
+
+
+@dataclass(frozen=True)
+class SalonCalendar:
+    timezone: str
+    zone: ZoneInfo
+
+    def day_key(self, ts: int) -> int:
+        return (datetime.fromtimestamp(ts, tz=self.zone).date() - _EPOCH).days
+
+    def day_start(self, key: int) -> int:
+        day = day_key_date(key)
+        return int(datetime(day.year, day.month, day.day, tzinfo=self.zone).timestamp())
+
+    def utc_offset(self, ts: int) -> int:
+        offset = datetime.fromtimestamp(ts, tz=self.zone).utcoffset()
+        return int(offset.total_seconds()) if offset else 0
+
+    def gmt_label(self, ts: int) -> str:
+        offset = self.utc_offset(ts)
+        sign = "+" if offset >= 0 else "-"
+        hours, minutes = divmod(abs(offset) // 60, 60)
+        return f"GMT{sign}{hours:02d}:{minutes:02d}"
+
+    def offset_segments(self, start_ts: int, end_ts: int) -> list[tuple[int, int, int]]:
+        # (start_ts, end_ts, utc_offset) pieces of the range between DST transitions
+        segments: list[tuple[int, int, int]] = []
+        seg_start, offset = start_ts, self.utc_offset(start_ts)
+        probe = start_ts
+        while probe < end_ts:
+            step = min(probe + 7 * DAY_SECONDS, end_ts)
+            if self.utc_offset(step) != offset:
+                low, high = probe, step
+                while high - low > 1:
+                    mid = (low + high) // 2
+                    if self.utc_offset(mid) == offset:
+                        low = mid
+                    else:
+                        high = mid
+                segments.append((seg_start, low, offset))
+                seg_start, offset = high, self.utc_offset(high)
+                step = high
+            probe = step
+        segments.append((seg_start, end_ts, offset))
+        return segments
+
+
+@lru_cache(maxsize=64)
+def calendar_for(timezone_name: str) -> SalonCalendar:
+    try:
+        return SalonCalendar(timezone_name, ZoneInfo(timezone_name))
+    except (ZoneInfoNotFoundError, ValueError):
+        return SalonCalendar(DEFAULT_TIMEZONE, ZoneInfo(DEFAULT_TIMEZONE))
+
+
+def salon_calendar(db: Session, salon_id: int) -> SalonCalendar:
+    # a session that flushed a salon change reads its own timezone past the cache and does not cache it
+    pending = salon_id in db.info.get(_PENDING_TIMEZONES_KEY, ())
+    name = None if pending else _salon_timezones.get(salon_id)
+    if name is None:
+        generation = _salon_timezone_generations.get(salon_id, 0)
+        with db.no_autoflush:
+            name = db.execute(select(Salon.timezone).where(Salon.id == salon_id)).scalar_one_or_none()
+        name = name or DEFAULT_TIMEZONE
+        if not pending:
+            # a read racing a commit is dropped: it may have seen the timezone that commit replaced
+            with _salon_timezones_lock:
+                if _salon_timezone_generations.get(salon_id, 0) == generation:
+                    _salon_timezones[salon_id] = name
+    return calendar_for(name)
+
+
+def backfill_day_keys(db: Session, *, salon_id: int) -> int:
+    # rows written around the ORM (bulk loads, older databases) get their day key in one UPDATE per offset segment
+    calendar = salon_calendar(db, salon_id)
+    updated = 0
+    for model in DAY_KEY_MODELS:
+        bounds = db.execute(
+            select(func.min(model.created_at), func.max(model.created_at)).where(
+                and_(model.salon_id == salon_id, model.day_key.is_(None))
+            )
+        ).one()
+        if bounds[0] is None:
+            continue
+        for seg_start, seg_end, offset in calendar.offset_segments(int(bounds[0]), int(bounds[1])):
+            result = db.execute(
+                update(model)
+                .where(
+                    and_(
+                        model.salon_id == salon_id,
+                        model.day_key.is_(None),
+                        model.created_at.between(seg_start, seg_end),
+                    )
+                )
+                .values(day_key=(model.created_at + offset) // DAY_SECONDS)
+                .execution_options(synchronize_session=False)
+            )
+            updated += int(result.rowcount or 0)
+    return updated
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_day_keys(session: Session, flush_context, instances) -> None:  # type: ignore[no-untyped-def]
+    for obj in session.new:
+        if not isinstance(obj, DAY_KEY_MODELS) or obj.day_key is not None:
+            continue
+        if obj.salon_id and obj.created_at is not None:
+            obj.day_key = salon_calendar(session, obj.salon_id).day_key(obj.created_at)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_salon_timezones(session: Session, flush_context) -> None:  # type: ignore[no-untyped-def]
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, Salon):
+            session.info.setdefault(_PENDING_TIMEZONES_KEY, set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_salon_timezones(session: Session) -> None:
+    salon_ids = session.info.pop(_PENDING_TIMEZONES_KEY, None)
+    if salon_ids:
+        with _salon_timezones_lock:
+            for salon_id in salon_ids:
+                _salon_timezones.pop(salon_id, None)
+                _salon_timezone_generations[salon_id] = _salon_timezone_generations.get(salon_id, 0) + 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_salon_timezones(session: Session) -> None:
+    session.info.pop(_PENDING_TIMEZONES_KEY, None)
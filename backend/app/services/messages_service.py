@@ -6,6 +6,7 @@ from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.models import Client, Message
+from app.services.pagination_service import KeysetPage, paginate
 from app.services.security_service import write_audit
 
 
@@ -16,15 +17,23 @@ def list_dialogues(
     query: str | None,
     page: int,
     page_size: int,
-) -> tuple[list[tuple[int, int | None, str, str, int, str, str]], int]:
-    # Dialogue = last message per client
-    base = (
+    cursor: str | None = None,
+    with_total: bool = True,
+) -> KeysetPage:
+    # Dialogue = last message per client; messages of the same second are told apart by id, so exactly
+    # one row per client comes out and (last_ts, message id) is a unique keyset key
+    last = (
         select(
-            Message.client_id.label("client_id"),
-            func.max(Message.created_at).label("last_ts"),
+            Message.id,
+            Message.client_id,
+            Message.created_at,
+            Message.text,
+            Message.channel,
+            func.row_number()
+            .over(partition_by=Message.client_id, order_by=(Message.created_at.desc(), Message.id.desc()))
+            .label("rn"),
         )
         .where(Message.salon_id == salon_id)
-        .group_by(Message.client_id)
         .subquery()
     )
 
@@ -34,23 +43,30 @@ def list_dialogues(
             Client.tg_id,
             Client.full_name,
             Client.phone,
-            base.c.last_ts,
-            Message.text,
-            Message.channel,
+            last.c.created_at.label("last_ts"),
+            last.c.text,
+            last.c.channel,
+            last.c.id.label("message_id"),
         )
-        .join(base, base.c.client_id == Client.id)
-        .join(Message, (Message.client_id == Client.id) & (Message.created_at == base.c.last_ts))
-        .where(Client.salon_id == salon_id)
-        .order_by(base.c.last_ts.desc())
+        .join(last, last.c.client_id == Client.id)
+        .where(Client.salon_id == salon_id, last.c.rn == 1)
     )
 
     if query:
         like = f"%{query.strip()}%"
-        q = q.where((Client.full_name.ilike(like)) | (Client.phone.ilike(like)) | (Message.text.ilike(like)))
+        q = q.where((Client.full_name.ilike(like)) | (Client.phone.ilike(like)) | (last.c.text.ilike(like)))
 
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    rows = db.execute(q.offset((page - 1) * page_size).limit(page_size)).all()
-    return rows, int(total)
+    return paginate(
+        db,
+        q,
+        order=[(last.c.created_at, True), (last.c.id, True)],
+        key=lambda row: (row.last_ts, row.message_id),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+        scalars=False,
+    )
 
 
 def get_dialogue_history(db: Session, *, salon_id: int, client_id: int) -> list[Message]:
@@ -74,7 +90,9 @@ def list_messages_registry(
     channel: str | None,
     page: int,
     page_size: int,
-) -> tuple[list[tuple[int, int, str, str, str, str, str, str, int, int | None]], int]:
+    cursor: str | None = None,
+    with_total: bool = True,
+) -> KeysetPage:
     q = (
         select(
             Message.id,
@@ -90,7 +108,6 @@ def list_messages_registry(
         )
         .join(Client, Client.id == Message.client_id)
         .where(Message.salon_id == salon_id, Client.salon_id == salon_id)
-        .order_by(Message.created_at.desc(), Message.id.desc())
     )
 
     if message_date is not None:
@@ -109,9 +126,17 @@ def list_messages_registry(
     if channel:
         q = q.where(Message.channel == channel)
 
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    rows = db.execute(q.offset((page - 1) * page_size).limit(page_size)).all()
-    return rows, int(total)
+    return paginate(
+        db,
+        q,
+        order=[(Message.created_at, True), (Message.id, True)],
+        key=lambda row: (row.created_at, row.id),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+        scalars=False,
+    )
 
 
 def _pick_destination(client: Client, channel: str) -> str:
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import and_, case, delete, func, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Operation, OperationDailyRollup
+from app.services.local_calendar_service import SalonCalendar, backfill_day_keys, salon_calendar
+
+
+@dataclass(frozen=True)
+class OperationDayTotals:
+    day_ts: int
+    day_key: int
+    op_type: str
+    operations_count: int
+    turnover_rub: int
+    discount_rub: int
+    income_rub: int
+
+
+def _operation_values(row: Operation) -> dict[str, int]:
+    discount = row.discount_rub + row.referral_discount_rub
+    return {
+        "operations_count": 1,
+        "turnover_rub": row.amount_rub,
+        "discount_rub": discount,
+        "income_rub": max(row.amount_rub - discount, 0),
+    }
+
+
+def apply_operation(db: Session, row: Operation) -> None:
+    # must run in the same transaction as the insert of `row`
+    values = _operation_values(row)
+    calendar = salon_calendar(db, row.salon_id)
+    stmt = sqlite_insert(OperationDailyRollup).values(
+        salon_id=row.salon_id,
+        day_ts=calendar.day_start(calendar.day_key(row.created_at)),
+        op_type=row.op_type,
+        **values,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["salon_id", "day_ts", "op_type"],
+        set_={key: getattr(OperationDailyRollup, key) + stmt.excluded[key] for key in values},
+    )
+    db.execute(stmt)
+
+
+def _raw_totals_query(salon_id: int, ranges: list[tuple[int, int, int]]):
+    # ranges are (tag, start_ts, end_ts) and must not overlap; rows come back tagged with their range
+    day_col = Operation.day_key.label("day_key")
+    tag_col = case(
+        *[(Operation.created_at.between(start_ts, end_ts), tag) for tag, start_ts, end_ts in ranges]
+    ).label("tag")
+    net = Operation.amount_rub - Operation.discount_rub - Operation.referral_discount_rub
+    return (
+        select(
+            tag_col,
+            day_col,
+            Operation.op_type,
+            func.count(),
+            func.coalesce(func.sum(Operation.amount_rub), 0),
+            func.coalesce(func.sum(Operation.discount_rub + Operation.referral_discount_rub), 0),
+            func.coalesce(func.sum(case((net > 0, net), else_=0)), 0),
+        )
+        .where(
+            and_(
+                Operation.salon_id == salon_id,
+                or_(*[Operation.created_at.between(start_ts, end_ts) for _, start_ts, end_ts in ranges]),
+            )
+        )
+        .group_by(tag_col, day_col, Operation.op_type)
+    )
+
+
+def rebuild_operation_rollups(db: Session, *, salon_id: int) -> int:
+    backfill_day_keys(db, salon_id=salon_id)
+    calendar = salon_calendar(db, salon_id)
+    db.execute(delete(OperationDailyRollup).where(OperationDailyRollup.salon_id == salon_id))
+    rows = db.execute(
+        select(func.min(Operation.created_at), func.max(Operation.created_at)).where(Operation.salon_id == salon_id)
+    ).one()
+    if rows[0] is None:
+        return 0
+
+    created = 0
+    for _, day_key, op_type, count, turnover, discount, income in db.execute(
+        _raw_totals_query(salon_id, [(0, int(rows[0]), int(rows[1]))])
+    ):
+        db.add(
+            OperationDailyRollup(
+                salon_id=salon_id,
+                day_ts=calendar.day_start(int(day_key)),
+                op_type=op_type,
+                operations_count=int(count),
+                turnover_rub=int(turnover),
+                discount_rub=int(discount),
+                income_rub=int(income),
+            )
+        )
+        created += 1
+    db.flush()
+    return created
+
+
+def _split_window(
+    calendar: SalonCalendar, start_ts: int, end_ts: int, now: int
+) -> tuple[int, int, list[tuple[int, int]]]:
+    # whole local days come from the rollup table, partial edge days are aggregated from raw operations;
+    # operations are stamped with the insert time, so a window ending in the future covers its last day
+    first_key = calendar.day_key(start_ts)
+    first_full_day = start_ts if calendar.day_start(first_key) == start_ts else calendar.day_start(first_key + 1)
+    if end_ts >= now:
+        full_days_end = calendar.day_start(calendar.day_key(end_ts) + 1)
+    else:
+        full_days_end = calendar.day_start(calendar.day_key(end_ts + 1))
+
+    if first_full_day >= full_days_end:
+        return first_full_day, first_full_day, [(start_ts, end_ts)]
+    raw_ranges: list[tuple[int, int]] = []
+    if start_ts < first_full_day:
+        raw_ranges.append((start_ts, first_full_day - 1))
+    if full_days_end <= end_ts:
+        raw_ranges.append((full_days_end, end_ts))
+    return first_full_day, full_days_end, raw_ranges
+
+
+def load_operation_daily_windows(
+    db: Session, *, salon_id: int, windows: list[tuple[int, int]]
+) -> list[list[OperationDayTotals]]:
+    # non-overlapping windows are served by one rollup query and one raw query, each tagged by window
+    now = int(time.time())
+    calendar = salon_calendar(db, salon_id)
+    out: list[list[OperationDayTotals]] = [[] for _ in windows]
+    full_ranges: list[tuple[int, int, int]] = []
+    raw_ranges: list[tuple[int, int, int]] = []
+    for idx, (start_ts, end_ts) in enumerate(windows):
+        full_start, full_end, edges = _split_window(calendar, start_ts, end_ts, now)
+        if full_start < full_end:
+            full_ranges.append((idx, full_start, full_end))
+        raw_ranges.extend((idx, range_start, range_end) for range_start, range_end in edges if range_start <= range_end)
+
+    if full_ranges:
+        day_col = OperationDailyRollup.day_ts
+        in_range = [and_(day_col >= full_start, day_col < full_end) for _, full_start, full_end in full_ranges]
+        tag_col = case(*[(cond, idx) for cond, (idx, _, _) in zip(in_range, full_ranges)])
+        for tag, row in db.execute(
+            select(tag_col, OperationDailyRollup).where(
+                and_(OperationDailyRollup.salon_id == salon_id, or_(*in_range))
+            )
+        ):
+            out[tag].append(
+                OperationDayTotals(
+                    day_ts=row.day_ts,
+                    day_key=calendar.day_key(row.day_ts),
+                    op_type=row.op_type,
+                    operations_count=row.operations_count,
+                    turnover_rub=row.turnover_rub,
+                    discount_rub=row.discount_rub,
+                    income_rub=row.income_rub,
+                )
+            )
+
+    if raw_ranges:
+        for tag, day_key, op_type, count, turnover, discount, income in db.execute(
+            _raw_totals_query(salon_id, raw_ranges)
+        ):
+            out[tag].append(
+                OperationDayTotals(
+                    day_ts=calendar.day_start(int(day_key)),
+                    day_key=int(day_key),
+                    op_type=op_type,
+                    operations_count=int(count),
+                    turnover_rub=int(turnover),
+                    discount_rub=int(discount),
+                    income_rub=int(income),
+                )
+            )
+    return out
+
+
+def load_operation_daily(db: Session, *, salon_id: int, start_ts: int, end_ts: int) -> list[OperationDayTotals]:
+    return load_operation_daily_windows(db, salon_id=salon_id, windows=[(start_ts, end_ts)])[0]
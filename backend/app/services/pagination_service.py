@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Select, and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    rows: list[Any]
+    total: int | None
+    total_exact: bool
+    next_cursor: str | None
+
+    def meta(self) -> dict[str, Any]:
+        return {"total": self.total, "total_exact": self.total_exact, "next_cursor": self.next_cursor}
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, (int, float, str)) and not isinstance(value, bool) for value in values)
+    ):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return values
+
+
+def keyset_after(order: Sequence[tuple[Any, bool]], values: Sequence[Any]):  # type: ignore[no-untyped-def]
+    # rows strictly after `values` in the (col, descending) order; the leading column gets a plain
+    # range bound so the (salon_id, created_at) style indexes narrow the scan
+    def beyond(col, descending: bool, value):  # type: ignore[no-untyped-def]
+        return col < value if descending else col > value
+
+    col, descending = order[-1]
+    condition = beyond(col, descending, values[-1])
+    for (col, descending), value in zip(reversed(order[:-1]), reversed(values[:-1])):
+        bound = col <= value if descending else col >= value
+        condition = and_(bound, or_(beyond(col, descending, value), condition))
+    return condition
+
+
+def _count(db: Session, query: Select, limit: int | None) -> tuple[int, bool]:
+    query = query.order_by(None)
+    if limit is None:
+        return int(db.execute(select(func.count()).select_from(query.subquery())).scalar_one()), True
+    total = int(db.execute(select(func.count()).select_from(query.limit(limit + 1).subquery())).scalar_one())
+    return min(total, limit), total <= limit
+
+
+def paginate(
+    db: Session,
+    query: Select,
+    *,
+    order: Sequence[tuple[Any, bool]],
+    key: Callable[[Any], Sequence[Any]],
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+    with_total: bool = True,
+    scalars: bool = True,
+) -> KeysetPage:
+    # page/offset stays the default; a cursor switches to keyset reads that cost the same on every page.
+    # In cursor mode the total is counted up to PAGINATION_COUNT_LIMIT and flagged as inexact beyond it
+    total, total_exact = None, True
+    if with_total:
+        total, total_exact = _count(db, query, settings.PAGINATION_COUNT_LIMIT if cursor else None)
+
+    query = query.order_by(*(col.desc() if descending else col.asc() for col, descending in order))
+    if cursor:
+        query = query.where(keyset_after(order, decode_cursor(cursor, len(order))))
+    else:
+        query = query.offset((page - 1) * page_size)
+    result = db.execute(query.limit(page_size + 1))
+    rows = list(result.scalars().all() if scalars else result.all())
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return KeysetPage(rows=rows, total=total, total_exact=total_exact, next_cursor=next_cursor)
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import bisect
+import math
+import random
+import statistics
+from dataclasses import dataclass
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Operation
+from app.services.local_calendar_service import DAY_SECONDS
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install "tg-uds-admin-backend[simulation]"
+    np = None
+
+FIT_LOOKBACK_DAYS = 180
+MIN_FIT_PURCHASES = 30
+MIN_FIT_DAYS = 14
+DEFAULT_CHECK_CV = 0.5
+DEFAULT_CONVERSION_CV = 0.25
+# scenarios × draws per request: ~200 ms for the pure Python loop, ~1 s with numpy arrays
+SIMULATION_MAX_CELLS = 100_000
+SIMULATION_MAX_CELLS_NUMPY = 10_000_000
+
+
+@dataclass(frozen=True)
+class PromotionInputs:
+    check_mean_rub: float
+    check_sd_rub: float
+    conversion_cv: float
+    purchases_observed: int
+    fitted: bool
+
+
+@dataclass(frozen=True)
+class PromotionScenario:
+    budget_rub: float | None
+    generations: int
+    reward_percents: tuple[float, ...]
+
+
+@dataclass(frozen=True)
+class PromotionScenarioResult:
+    scenario: PromotionScenario
+    new_clients_p50: float
+    net_effect_p10: float
+    net_effect_p50: float
+    net_effect_p90: float
+    break_even_p10: float
+    break_even_p50: float
+    break_even_p90: float
+    profit_probability: float
+
+
+def simulation_max_cells() -> int:
+    return SIMULATION_MAX_CELLS if np is None else SIMULATION_MAX_CELLS_NUMPY
+
+
+def fit_promotion_inputs(db: Session, *, salon_id: int, now_ts: int, fallback_check_rub: float) -> PromotionInputs:
+    start_ts = now_ts - FIT_LOOKBACK_DAYS * DAY_SECONDS
+    window = and_(
+        Operation.salon_id == salon_id,
+        Operation.op_type == "purchase",
+        Operation.created_at >= start_ts,
+        Operation.created_at <= now_ts,
+    )
+    purchases, amount_sum, amount_sq_sum = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(Operation.amount_rub), 0),
+            func.coalesce(func.sum(Operation.amount_rub * Operation.amount_rub), 0),
+        ).where(window)
+    ).one()
+    purchases = int(purchases)
+    if purchases < MIN_FIT_PURCHASES:
+        return PromotionInputs(
+            check_mean_rub=fallback_check_rub,
+            check_sd_rub=fallback_check_rub * DEFAULT_CHECK_CV,
+            conversion_cv=DEFAULT_CONVERSION_CV,
+            purchases_observed=purchases,
+            fitted=False,
+        )
+
+    check_mean = amount_sum / purchases
+    check_sd = math.sqrt(max(amount_sq_sum / purchases - check_mean * check_mean, 0.0))
+
+    # day-to-day spread of the referral share stands in for the uncertainty of the conversion assumption
+    daily = db.execute(
+        select(func.count(), func.sum(case((Operation.referral_discount_rub > 0, 1), else_=0)))
+        .where(window)
+        .group_by(Operation.day_key)
+    ).all()
+    shares = [int(referral or 0) / int(total) for total, referral in daily if total]
+    conversion_cv = DEFAULT_CONVERSION_CV
+    if len(shares) >= MIN_FIT_DAYS and statistics.fmean(shares) > 0:
+        conversion_cv = min(statistics.pstdev(shares) / statistics.fmean(shares), 1.0)
+
+    return PromotionInputs(
+        check_mean_rub=check_mean,
+        check_sd_rub=check_sd,
+        conversion_cv=conversion_cv,
+        purchases_observed=purchases,
+        fitted=True,
+    )
+
+
+def _quantiles(ordered: list[float]) -> tuple[float, float, float]:
+    last = len(ordered) - 1
+
+    def at(q: float) -> float:
+        pos = q * last
+        low = int(pos)
+        high = min(low + 1, last)
+        return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+    return at(0.1), at(0.5), at(0.9)
+
+
+def _standard_normals(rng: random.Random, count: int) -> list[float]:
+    # Box-Muller over whole lists: two normals per pair of uniforms, several times faster than rng.gauss
+    half = (count + 1) // 2
+    uniform = rng.random
+    radii = [math.sqrt(-2.0 * math.log(1.0 - uniform())) for _ in range(half)]
+    angles = [math.tau * uniform() for _ in range(half)]
+    normals = [r * math.cos(a) for r, a in zip(radii, angles, strict=True)]
+    normals += [r * math.sin(a) for r, a in zip(radii, angles, strict=True)]
+    return normals[:count]
+
+
+def simulate_promotion_grid(
+    inputs: PromotionInputs,
+    scenarios: list[PromotionScenario],
+    *,
+    initial_clients: int,
+    conversion_rate: float,
+    margin: float,
+    reward_unit: str,
+    draws: int,
+    seed: int | None = None,
+) -> list[PromotionScenarioResult]:
+    if np is not None:
+        return _simulate_promotion_grid_numpy(
+            inputs,
+            scenarios,
+            initial_clients=initial_clients,
+            conversion_rate=conversion_rate,
+            margin=margin,
+            reward_unit=reward_unit,
+            draws=draws,
+            seed=seed,
+        )
+    rng = random.Random(seed)
+    max_generations = max(item.generations for item in scenarios)
+
+    # draws are stored column-wise (one list per generation) and shared by every scenario of the grid
+    conversion_sd = conversion_rate * inputs.conversion_cv
+    conversions = [
+        min(max(conversion_rate + conversion_sd * z, 0.0), 1.0) for z in _standard_normals(rng, draws)
+    ]
+    generation_clients: list[list[float]] = []
+    previous = [float(initial_clients)] * draws
+    for _ in range(max_generations):
+        # normal approximation of the binomial number of converted referrals
+        current = [
+            max(n * p + math.sqrt(n * p * (1 - p)) * z, 0.0)
+            for n, p, z in zip(previous, conversions, _standard_normals(rng, draws), strict=True)
+        ]
+        generation_clients.append(current)
+        previous = current
+
+    first_generation = max(initial_clients * conversion_rate, 1.0)
+    check_se = inputs.check_sd_rub / math.sqrt(first_generation)
+    checks = [max(inputs.check_mean_rub + check_se * z, 0.0) for z in _standard_normals(rng, draws)]
+    unit_rewards = checks if reward_unit == "money" else [check * 0.3 for check in checks]
+    unit_profits = [check * margin for check in checks]
+
+    cumulative: list[list[float]] = []
+    running = [0.0] * draws
+    for column in generation_clients:
+        running = [a + n for a, n in zip(running, column, strict=True)]
+        cumulative.append(running)
+
+    weighted_cache: dict[tuple[int, tuple[float, ...]], list[float]] = {}
+    results: list[PromotionScenarioResult] = []
+    for scenario in scenarios:
+        clients = cumulative[scenario.generations - 1]
+        key = (scenario.generations, scenario.reward_percents)
+        weighted = weighted_cache.get(key)
+        if weighted is None:
+            percents = set(scenario.reward_percents)
+            if len(percents) == 1:
+                share = percents.pop() / 100
+                weighted = [n * share for n in clients]
+            else:
+                weighted = [0.0] * draws
+                for column, percent in zip(
+                    generation_clients[: scenario.generations],
+                    scenario.reward_percents,
+                    strict=True,
+                ):
+                    share = percent / 100
+                    weighted = [a + n * share for a, n in zip(weighted, column, strict=True)]
+            weighted_cache[key] = weighted
+        costs = [w * u for w, u in zip(weighted, unit_rewards, strict=True)]
+
+        if scenario.budget_rub is not None:
+            # once the reward budget is spent the program stops, so only the paid share of clients arrives
+            budget = scenario.budget_rub
+            clients = [
+                n * budget / cost if cost > budget else n
+                for n, cost in zip(clients, costs, strict=True)
+            ]
+            costs = [cost if cost < budget else budget for cost in costs]
+
+        nets = sorted(
+            [n * profit - cost for n, profit, cost in zip(clients, unit_profits, costs, strict=True)]
+        )
+        break_even = sorted(
+            [
+                cost / profit if profit > 0 else 0.0
+                for cost, profit in zip(costs, unit_profits, strict=True)
+            ]
+        )
+        net_p10, net_p50, net_p90 = _quantiles(nets)
+        be_p10, be_p50, be_p90 = _quantiles(break_even)
+        results.append(
+            PromotionScenarioResult(
+                scenario=scenario,
+                new_clients_p50=statistics.median(clients),
+                net_effect_p10=net_p10,
+                net_effect_p50=net_p50,
+                net_effect_p90=net_p90,
+                break_even_p10=be_p10,
+                break_even_p50=be_p50,
+                break_even_p90=be_p90,
+                profit_probability=(draws - bisect.bisect_right(nets, 0.0)) / draws,
+            )
+        )
+    return results
+
+
+def _simulate_promotion_grid_numpy(
+    inputs: PromotionInputs,
+    scenarios: list[PromotionScenario],
+    *,
+    initial_clients: int,
+    conversion_rate: float,
+    margin: float,
+    reward_unit: str,
+    draws: int,
+    seed: int | None,
+) -> list[PromotionScenarioResult]:
+    # the model of the list-based loop above, with the draws as columns of one matrix
+    rng = np.random.default_rng(seed)
+    max_generations = max(item.generations for item in scenarios)
+
+    conversion_sd = conversion_rate * inputs.conversion_cv
+    conversions = np.clip(conversion_rate + conversion_sd * rng.standard_normal(draws), 0.0, 1.0)
+    generation_clients = np.empty((max_generations, draws))
+    previous = np.full(draws, float(initial_clients))
+    for generation in range(max_generations):
+        expected = previous * conversions
+        spread = np.sqrt(expected * (1 - conversions))
+        previous = np.maximum(expected + spread * rng.standard_normal(draws), 0.0)
+        generation_clients[generation] = previous
+    cumulative = np.cumsum(generation_clients, axis=0)
+
+    first_generation = max(initial_clients * conversion_rate, 1.0)
+    check_se = inputs.check_sd_rub / math.sqrt(first_generation)
+    checks = np.maximum(inputs.check_mean_rub + check_se * rng.standard_normal(draws), 0.0)
+    unit_rewards = checks if reward_unit == "money" else checks * 0.3
+    unit_profits = checks * margin
+
+    results: list[PromotionScenarioResult] = []
+    for scenario in scenarios:
+        clients = cumulative[scenario.generations - 1]
+        shares = np.asarray(scenario.reward_percents, dtype=float) / 100
+        costs = (shares @ generation_clients[: scenario.generations]) * unit_rewards
+
+        if scenario.budget_rub is not None:
+            budget = scenario.budget_rub
+            over = costs > budget
+            clients = np.where(over, clients * budget / np.where(over, costs, 1.0), clients)
+            costs = np.minimum(costs, budget)
+
+        nets = np.sort(clients * unit_profits - costs)
+        break_even = np.divide(costs, unit_profits, out=np.zeros(draws), where=unit_profits > 0)
+        net_p10, net_p50, net_p90 = (float(x) for x in np.quantile(nets, (0.1, 0.5, 0.9)))
+        be_p10, be_p50, be_p90 = (float(x) for x in np.quantile(break_even, (0.1, 0.5, 0.9)))
+        results.append(
+            PromotionScenarioResult(
+                scenario=scenario,
+                new_clients_p50=float(np.median(clients)),
+                net_effect_p10=net_p10,
+                net_effect_p50=net_p50,
+                net_effect_p90=net_p90,
+                break_even_p10=be_p10,
+                break_even_p50=be_p50,
+                break_even_p90=be_p90,
+                profit_probability=(draws - int(np.searchsorted(nets, 0.0, side="right"))) / draws,
+            )
+        )
+    return results
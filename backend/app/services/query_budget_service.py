@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+PROGRESS_INTERVAL = 10_000  # SQLite VM instructions between two budget checks
+BUDGET_HINT = (
+    "Сократите период или запросите вкладки через POST /api/v1/admin/analytics/batch: длинные периоды "
+    "считаются по предрасчитанным агрегатам, пересобрать их можно tools/rebuild_operation_rollups.py"
+)
+
+_stats_lock = threading.Lock()
+_exhausted: dict[str, int] = {}
+
+
+@dataclass
+class QueryBudget:
+    endpoint: str
+    max_seconds: float
+    max_steps: int
+    started_at: float | None = None
+    steps: int = 0
+    exhausted: bool = False
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at if self.started_at is not None else 0.0
+
+    def check(self) -> int:
+        # SQLite progress handler: a non-zero return interrupts the running statement
+        self.steps += PROGRESS_INTERVAL
+        if self.exhausted or self.steps > self.max_steps or self.elapsed() > self.max_seconds:
+            self.exhausted = True
+            return 1
+        return 0
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, budget: QueryBudget) -> None:
+        super().__init__(f"query budget of {budget.endpoint} exhausted")
+        self.budget = budget
+
+    def payload(self) -> dict:
+        return {
+            "code": "query_budget_exceeded",
+            "message": "Запрос слишком тяжёлый и был прерван",
+            "endpoint": self.budget.endpoint,
+            "max_seconds": self.budget.max_seconds,
+            "max_steps": self.budget.max_steps,
+            "elapsed_seconds": round(self.budget.elapsed(), 3),
+            "hint": BUDGET_HINT,
+        }
+
+
+def _overrides() -> dict[str, tuple[float, int | None]]:
+    # QUERY_BUDGET_OVERRIDES="batch=15:1500000000,control-tower=8"
+    out: dict[str, tuple[float, int | None]] = {}
+    for item in settings.QUERY_BUDGET_OVERRIDES.split(","):
+        name, _, value = item.strip().partition("=")
+        if not name or not value:
+            continue
+        seconds, _, steps = value.partition(":")
+        out[name] = (float(seconds), int(steps) if steps else None)
+    return out
+
+
+def budget_limits(endpoint: str) -> tuple[float, int]:
+    seconds, steps = _overrides().get(endpoint, (settings.QUERY_BUDGET_SECONDS, None))
+    return seconds, steps or settings.QUERY_BUDGET_MAX_STEPS
+
+
+def new_budget(endpoint: str) -> QueryBudget | None:
+    if not settings.QUERY_BUDGET_ENABLED:
+        return None
+    seconds, steps = budget_limits(endpoint)
+    return QueryBudget(endpoint=endpoint, max_seconds=seconds, max_steps=steps)
+
+
+def register_endpoint(endpoint: str) -> None:
+    with _stats_lock:
+        _exhausted.setdefault(endpoint, 0)
+
+
+def record_exhausted(budget: QueryBudget) -> None:
+    with _stats_lock:
+        _exhausted[budget.endpoint] = _exhausted.get(budget.endpoint, 0) + 1
+
+
+def budget_stats() -> dict[str, int]:
+    with _stats_lock:
+        return dict(_exhausted)
+
+
+@event.listens_for(Session, "after_begin")
+def _attach_budget(session: Session, transaction, connection) -> None:  # type: ignore[no-untyped-def]
+    budget = session.info.get("query_budget")
+    if budget is None or connection.dialect.name != "sqlite":
+        return
+    # the clock starts with the first query, so time spent queued for an executor pool is not charged
+    if budget.started_at is None:
+        budget.started_at = time.monotonic()
+    connection.connection.driver_connection.set_progress_handler(budget.check, PROGRESS_INTERVAL)
+
+
+@event.listens_for(Engine, "checkin")
+def _detach_budget(dbapi_connection, connection_record) -> None:  # type: ignore[no-untyped-def]
+    # pooled connections must not keep the handler of a finished request
+    if hasattr(dbapi_connection, "set_progress_handler"):
+        dbapi_connection.set_progress_handler(None, 0)
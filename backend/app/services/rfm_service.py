@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import String, and_, case, cast, func, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Client, ClientScore, Operation
+from app.models.client_score import RFM_SEGMENTS
+
+
+def _quintile(column):
+    # percent-rank bucket 1..5 in integer arithmetic: equal values share a rank and therefore a score,
+    # unlike NTILE, which splits a run of ties across neighbouring quintiles
+    rank = func.rank().over(order_by=column.asc())
+    total = func.count().over()
+    return func.min(5, 1 + (5 * (rank - 1)) // func.max(total - 1, 1))
+
+
+def recompute_client_scores(db: Session, *, salon_id: int, now_ts: int | None = None) -> int:
+    # one INSERT ... SELECT: purchases are aggregated, ranked into quintiles and upserted by SQLite
+    now_ts = now_ts or int(time.time())
+    totals = (
+        select(
+            Operation.client_id,
+            func.max(Operation.created_at).label("last_purchase_at"),
+            func.count().label("frequency"),
+            func.coalesce(func.sum(Operation.amount_rub), 0).label("monetary_rub"),
+        )
+        .where(and_(Operation.salon_id == salon_id, Operation.op_type == "purchase"))
+        .group_by(Operation.client_id)
+        .subquery()
+    )
+    ranked = select(
+        totals,
+        _quintile(totals.c.last_purchase_at).label("r_score"),
+        _quintile(totals.c.frequency).label("f_score"),
+        _quintile(totals.c.monetary_rub).label("m_score"),
+    ).subquery()
+
+    r_score = func.coalesce(ranked.c.r_score, 1)
+    f_score = func.coalesce(ranked.c.f_score, 1)
+    m_score = func.coalesce(ranked.c.m_score, 1)
+    segment = case(
+        (ranked.c.client_id.is_(None), "no_purchases"),
+        (and_(r_score >= 4, f_score >= 4), "champions"),
+        (and_(r_score >= 4, f_score <= 2), "new"),
+        (f_score >= 4, "loyal"),
+        (and_(r_score <= 2, f_score >= 3), "at_risk"),
+        (r_score <= 2, "lost"),
+        else_="potential",
+    )
+    source = (
+        select(
+            Client.salon_id,
+            Client.id,
+            ranked.c.last_purchase_at,
+            func.coalesce(ranked.c.frequency, 0),
+            func.coalesce(ranked.c.monetary_rub, 0),
+            r_score,
+            f_score,
+            m_score,
+            cast(r_score, String) + cast(f_score, String) + cast(m_score, String),
+            segment,
+            literal(now_ts),
+        )
+        .select_from(Client)
+        .outerjoin(ranked, ranked.c.client_id == Client.id)
+        .where(Client.salon_id == salon_id)
+    )
+    columns = [
+        "salon_id",
+        "client_id",
+        "last_purchase_at",
+        "frequency",
+        "monetary_rub",
+        "r_score",
+        "f_score",
+        "m_score",
+        "rfm_code",
+        "segment",
+        "computed_at",
+    ]
+    stmt = sqlite_insert(ClientScore).from_select(columns, source)
+    result = db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["salon_id", "client_id"],
+            set_={key: stmt.excluded[key] for key in columns[2:]},
+        )
+    )
+    return int(result.rowcount or 0)
+
+
+def rfm_summary(db: Session, *, salon_id: int) -> dict:
+    segment_rows = db.execute(
+        select(
+            ClientScore.segment,
+            func.count(),
+            func.coalesce(func.sum(ClientScore.monetary_rub), 0),
+            func.max(ClientScore.computed_at),
+        )
+        .where(ClientScore.salon_id == salon_id)
+        .group_by(ClientScore.segment)
+    ).all()
+    grid_rows = db.execute(
+        select(ClientScore.r_score, ClientScore.f_score, func.count())
+        .where(and_(ClientScore.salon_id == salon_id, ClientScore.segment != "no_purchases"))
+        .group_by(ClientScore.r_score, ClientScore.f_score)
+    ).all()
+    computed_at = max((int(row[3]) for row in segment_rows), default=None)
+    by_segment = {row[0]: (int(row[1]), int(row[2])) for row in segment_rows}
+    return {
+        "computed_at": computed_at,
+        "segments": [
+            {
+                "segment": code,
+                "title": title,
+                "clients": by_segment.get(code, (0, 0))[0],
+                "monetary_rub": by_segment.get(code, (0, 0))[1],
+            }
+            for code, title in RFM_SEGMENTS.items()
+        ],
+        "grid": [{"r_score": int(r), "f_score": int(f), "clients": int(n)} for r, f, n in grid_rows],
+    }
@@ -3,10 +3,11 @@ from __future__ import annotations
 import time
 from typing import Any
 
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models import AuditLog
+from app.services.pagination_service import KeysetPage, paginate
 
 
 def write_audit(
@@ -31,8 +32,22 @@ def write_audit(
     db.add(row)
 
 
-def list_audit(db: Session, *, salon_id: int, page: int, page_size: int) -> tuple[list[AuditLog], int]:
-    q = select(AuditLog).where(AuditLog.salon_id == salon_id).order_by(AuditLog.created_at.desc())
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    items = db.execute(q.offset((page - 1) * page_size).limit(page_size)).scalars().all()
-    return items, int(total)
\ No newline at end of file
+def list_audit(
+    db: Session,
+    *,
+    salon_id: int,
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+    with_total: bool = True,
+) -> KeysetPage:
+    return paginate(
+        db,
+        select(AuditLog).where(AuditLog.salon_id == salon_id),
+        order=[(AuditLog.created_at, True), (AuditLog.id, True)],
+        key=lambda row: (row.created_at, row.id),
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+    )
\ No newline at end of file
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+# the engine is created on import, so the database has to be chosen before the app is imported
+_data_dir = Path(tempfile.mkdtemp(prefix="uds-tests-")) / "data"
+_data_dir.mkdir()
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir / 'app.db'}"
+os.environ["ANALYTICS_MIRROR_DIR"] = str(_data_dir / "analytics_mirror")
+os.environ["CONTROL_TOWER_REFRESHER_ENABLED"] = "false"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.security import issue_jwt  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import User  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def owner_headers(client: TestClient) -> dict[str, str]:
+    with SessionLocal() as db:
+        owner = User(salon_id=1, tg_id=1, role="owner", display_name="Владелец")
+        db.add(owner)
+        db.commit()
+        token = issue_jwt({"sub": str(owner.id), "salon_id": 1, "role": "owner", "tg_id": 1})
+    return {"Authorization": f"Bearer {token}"}
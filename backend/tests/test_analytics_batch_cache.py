@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+
+from app.api.v1.admin import analytics
+from app.db.session import SessionLocal
+from app.models import Client, Operation
+from app.services.analytics_cache_service import analytics_cache
+from app.services.operation_rollups_service import apply_operation
+
+
+def _add_purchase(client_id: int) -> None:
+    with SessionLocal() as db:
+        row = Operation(
+            salon_id=1,
+            client_id=client_id,
+            op_type="purchase",
+            amount_rub=500,
+            discount_rub=0,
+            referral_discount_rub=0,
+            created_at=int(time.time()),
+        )
+        db.add(row)
+        apply_operation(db, row)
+        db.commit()
+
+
+def test_batch_does_not_cache_its_snapshot_under_a_newer_version(
+    client, owner_headers, monkeypatch
+) -> None:
+    with SessionLocal() as db:
+        buyer = Client(salon_id=1, full_name="Покупатель пакета")
+        db.add(buyer)
+        db.commit()
+        buyer_id = buyer.id
+    _add_purchase(buyer_id)
+    analytics_cache.clear()
+
+    marketing = analytics._marketing_analytics
+
+    def marketing_then_write(*args, **kwargs):  # type: ignore[no-untyped-def]
+        # a write commits after the batch pinned its snapshot, before the operations tab is computed
+        payload = marketing(*args, **kwargs)
+        _add_purchase(buyer_id)
+        return payload
+
+    monkeypatch.setattr(analytics, "_marketing_analytics", marketing_then_write)
+    response = client.post(
+        "/api/v1/admin/analytics/batch",
+        json={"tabs": [{"tab": "marketing"}, {"tab": "operations"}]},
+        headers=owner_headers,
+    )
+    assert response.status_code == 200
+    batch_operations = response.json()["items"][1]["payload"]
+
+    cached = client.get("/api/v1/admin/analytics/operations", headers=owner_headers).json()
+    analytics_cache.clear()
+    fresh = client.get("/api/v1/admin/analytics/operations", headers=owner_headers).json()
+    assert cached == fresh
+    assert batch_operations != fresh
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db.session import SessionLocal
+from app.models import Client, Operation
+from app.services import analytics_mirror_service
+from app.services.analytics_mirror_service import (
+    MIRROR_TABLES,
+    export_mirror,
+    mirror_dir,
+    reset_mirror_tables,
+)
+
+duckdb = pytest.importorskip("duckdb")
+
+
+def _add_operations(count: int) -> None:
+    with SessionLocal() as db:
+        buyer = Client(salon_id=1, full_name="Клиент зеркала")
+        db.add(buyer)
+        db.flush()
+        purchase = {"salon_id": 1, "client_id": buyer.id, "op_type": "purchase", "amount_rub": 100}
+        db.add_all(Operation(**purchase, created_at=int(time.time())) for _ in range(count))
+        db.commit()
+
+
+def _operations_in_db() -> int:
+    with SessionLocal() as db:
+        return int(db.execute(select(func.count()).select_from(Operation)).scalar_one())
+
+
+def _operations_in_mirror() -> tuple[int, int]:
+    parts = (mirror_dir() / "operations").as_posix() + "/**/*.parquet"
+    query = f"SELECT count(*), count(DISTINCT id) FROM read_parquet('{parts}')"
+    rows, ids = duckdb.sql(query).fetchone()
+    return int(rows), int(ids)
+
+
+def _pending_dirs() -> int:
+    return len(list(mirror_dir().glob("operations.pending-*")))
+
+
+def test_pending_parts_are_published_or_dropped_by_the_next_export(client, monkeypatch) -> None:
+    operations = MIRROR_TABLES["operations"]
+    with SessionLocal() as db:
+        reset_mirror_tables(db, ["operations"])
+        db.commit()
+        _add_operations(3)
+        export_mirror(db, ["operations"])
+
+        # the watermark is committed, then the process stops before the parts join the table
+        _add_operations(2)
+        with monkeypatch.context() as patch:
+            patch.setattr(analytics_mirror_service, "_publish_pending", lambda *args: None)
+            export_mirror(db, ["operations"])
+        assert _pending_dirs() == 1
+
+        # the next export publishes those parts first; its own are written, then the process stops
+        # before the watermark is committed
+        published = _operations_in_db()
+        _add_operations(4)
+        with duckdb.connect() as con:
+            analytics_mirror_service._export_table(db, con, operations, int(time.time()))
+        db.rollback()
+        assert _operations_in_mirror() == (published, published)
+        assert _pending_dirs() == 1
+
+        export_mirror(db, ["operations"])
+
+    assert _pending_dirs() == 0
+    expected = _operations_in_db()
+    assert _operations_in_mirror() == (expected, expected)
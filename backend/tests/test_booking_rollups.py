@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models import Appointment, BookingMonthStatus, Client, Salon
+from app.services.booking_analytics_service import load_booking_cells
+from app.services.cohorts_service import month_index
+from app.services.local_calendar_service import calendar_for
+
+
+def _utc(*args: int) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def test_booking_months_keep_local_hours_across_a_dst_switch(client) -> None:
+    calendar = calendar_for("Europe/Berlin")
+    with SessionLocal() as db:
+        salon = Salon(name="Салон в Берлине", timezone=calendar.timezone)
+        db.add(salon)
+        db.flush()
+        visitor = Client(salon_id=salon.id, full_name="Клиент по записи")
+        db.add(visitor)
+        db.flush()
+        # 10:00 local before (UTC+1) and after (UTC+2) the switch on 2024-03-31
+        for starts_at in (_utc(2024, 3, 20, 9), _utc(2024, 3, 31, 8)):
+            db.add(Appointment(salon_id=salon.id, client_id=visitor.id, starts_at=starts_at))
+        db.commit()
+        salon_id = salon.id
+
+    first_ts, second_ts = _utc(2025, 1, 1), _utc(2025, 1, 2)
+    with SessionLocal() as db:
+        for end_ts, now_ts in ((_utc(2024, 12, 15), first_ts), (_utc(2024, 8, 15), second_ts)):
+            cells, rollup_months = load_booking_cells(
+                db,
+                salon_id=salon_id,
+                start_ts=_utc(2024, 3, 1),
+                end_ts=end_ts,
+                calendar=calendar,
+                now_ts=now_ts,
+            )
+            db.commit()
+            assert rollup_months > 0
+            assert {cell.hour for cell in cells if cell.appointments} == {10}
+            assert sum(cell.appointments for cell in cells) == 2
+
+        computed_at = db.execute(
+            select(BookingMonthStatus.computed_at).where(
+                BookingMonthStatus.salon_id == salon_id,
+                BookingMonthStatus.month == month_index(_utc(2024, 3, 1)),
+            )
+        ).scalar_one()
+    # a summer-ending window reuses the month built by a winter-ending one
+    assert computed_at == first_ts
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from app.db.session import SessionLocal
+from app.models import Salon
+from app.services.analytics_loads_service import get_level_bounds, set_level_bounds
+from app.services.local_calendar_service import salon_calendar
+
+
+def test_level_bounds_read_before_commit_is_not_cached(client) -> None:
+    with SessionLocal() as writer, SessionLocal() as reader:
+        set_level_bounds(writer, 1, (100, 200))
+        assert get_level_bounds(writer, 1) == (100, 200)
+        # a concurrent request still sees the committed bounds and may cache them until the commit
+        previous = get_level_bounds(reader, 1)
+        assert previous != (100, 200)
+        writer.commit()
+    with SessionLocal() as db:
+        assert get_level_bounds(db, 1) == (100, 200)
+        set_level_bounds(db, 1, previous)
+        db.commit()
+
+
+def test_salon_timezone_read_before_commit_is_not_cached(client) -> None:
+    with SessionLocal() as db:
+        salon = Salon(name="Салон со сменой пояса", timezone="Europe/Moscow")
+        db.add(salon)
+        db.commit()
+        salon_id = salon.id
+    with SessionLocal() as writer, SessionLocal() as reader:
+        writer.get(Salon, salon_id).timezone = "Asia/Yekaterinburg"
+        writer.flush()
+        assert salon_calendar(writer, salon_id).timezone == "Asia/Yekaterinburg"
+        assert salon_calendar(reader, salon_id).timezone == "Europe/Moscow"
+        writer.commit()
+    with SessionLocal() as db:
+        assert salon_calendar(db, salon_id).timezone == "Asia/Yekaterinburg"
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import AuditLog, Client, ClientImportJob, Salon
+from app.services import client_import_service
+from app.services.client_import_service import run_client_import
+
+_ROWS = """full_name,phone,email
+Импорт Старый,8 (903) 111-22-33,
+Импорт Первый,+79032223344,first@example.com
+Импорт Повтор,,FIRST@example.com
+Импорт Без имени,,bad-email
+,+79035556677,
+Импорт Из API,+7 903 444-55-66,
+Импорт Второй,+79036667788,
+"""
+
+
+def _import_job(salon_id: int) -> int:
+    with SessionLocal() as db:
+        job = ClientImportJob(
+            salon_id=salon_id,
+            filename="clients.csv",
+            file_format="csv",
+            created_at=int(time.time()),
+        )
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+def _audit(db, job_id: int) -> str:  # type: ignore[no-untyped-def]
+    job_audit = (AuditLog.action == "client.import") & (AuditLog.entity_id == str(job_id))
+    return db.execute(select(AuditLog.meta_json).where(job_audit)).scalar_one()
+
+
+def test_import_dedupes_against_file_database_and_concurrent_clients(client, monkeypatch) -> None:
+    with SessionLocal() as db:
+        salon = Salon(name="Салон импорта")
+        db.add(salon)
+        db.flush()
+        db.add(Client(salon_id=salon.id, full_name="Уже есть", phone="+7 903 111-22-33"))
+        db.commit()
+        salon_id = salon.id
+
+    read_records = client_import_service._read_records
+
+    def records_with_api_client(stream, file_format):  # type: ignore[no-untyped-def]
+        # a client is added through the API after the import queued the same phone in its last batch
+        for number, (line, payload) in enumerate(read_records(stream, file_format)):
+            if number == 6:
+                with SessionLocal() as db:
+                    db.add(Client(salon_id=salon_id, full_name="Из API", phone="89034445566"))
+                    db.commit()
+            yield line, payload
+
+    monkeypatch.setattr(client_import_service, "_read_records", records_with_api_client)
+    monkeypatch.setattr(settings, "CLIENT_IMPORT_BATCH_SIZE", 4)
+    job_id = _import_job(salon_id)
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as upload:
+        upload.write(_ROWS)
+    run_client_import(job_id, upload.name)
+
+    with SessionLocal() as db:
+        job = db.get(ClientImportJob, job_id)
+        assert job.status == "done"
+        counters = (job.rows_processed, job.created_count, job.duplicate_count, job.invalid_count)
+        assert counters == (7, 2, 3, 2)
+        assert [item["line"] for item in json.loads(job.errors_json)] == [5, 6]
+        names = db.execute(
+            select(Client.full_name).where(Client.salon_id == salon_id).order_by(Client.id)
+        ).scalars()
+        assert list(names) == ["Уже есть", "Импорт Первый", "Из API", "Импорт Второй"]
+        audit = _audit(db, job_id)
+        assert audit == "status=done;rows=7;created=2;duplicates=3;invalid=2"
+
+
+def test_failed_import_is_audited_with_partial_counts(client, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "CLIENT_IMPORT_BATCH_SIZE", 2)
+    read_records = client_import_service._read_records
+
+    def records_then_failure(stream, file_format):  # type: ignore[no-untyped-def]
+        for number, record in enumerate(read_records(stream, file_format)):
+            if number == 3:
+                raise RuntimeError("диск отключён")
+            yield record
+
+    monkeypatch.setattr(client_import_service, "_read_records", records_then_failure)
+    job_id = _import_job(1)
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as upload:
+        upload.write("full_name\nСбой 1\nСбой 2\nСбой 3\nСбой 4\n")
+    run_client_import(job_id, upload.name)
+
+    with SessionLocal() as db:
+        job = db.get(ClientImportJob, job_id)
+        assert (job.status, job.error) == ("failed", "диск отключён")
+        created = select(func.count()).where(Client.full_name.like("Сбой %"))
+        assert db.execute(created).scalar_one() == 2
+        audit = _audit(db, job_id)
+        assert audit == "status=failed;rows=2;created=2;duplicates=0;invalid=0"
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal, engine
+from app.models import Client, Salon
+from app.services.client_search_service import FTS_TABLE, ensure_client_search_index
+from app.services.clients_service import list_clients
+
+
+def _found(salon_id: int, query: str) -> list[str]:
+    with SessionLocal() as db:
+        page = list_clients(db, salon_id=salon_id, query=query, page=1, page_size=20)
+        return sorted(row.full_name for row in page.rows)
+
+
+def test_phone_is_found_by_its_tail_and_in_any_prefix_form(client) -> None:
+    with SessionLocal() as db:
+        salon = Salon(name="Салон поиска")
+        db.add(salon)
+        db.flush()
+        db.add_all(
+            [
+                Client(salon_id=salon.id, full_name="Анна", phone="8 (916) 123-45-67"),
+                Client(salon_id=salon.id, full_name="Вера", phone="+7 903 765-43-21"),
+            ]
+        )
+        db.commit()
+        salon_id = salon.id
+
+    assert _found(salon_id, "4567") == ["Анна"]
+    assert _found(salon_id, "123-45") == ["Анна"]
+    assert _found(salon_id, "+7 916 123") == ["Анна"]
+    assert _found(salon_id, "89037654321") == ["Вера"]
+
+
+def test_index_built_with_older_phone_tokens_is_rebuilt(client) -> None:
+    with SessionLocal() as db:
+        salon = Salon(name="Салон со старым индексом")
+        db.add(salon)
+        db.flush()
+        db.add(Client(salon_id=salon.id, full_name="Галина", phone="+7 916 555-00-11"))
+        db.commit()
+        salon_id = salon.id
+
+    with engine.begin() as conn:
+        # the insert trigger of an older release indexed the number only as typed
+        conn.execute(text(f"DROP TRIGGER {FTS_TABLE}_ai"))
+        conn.execute(
+            text(
+                f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON clients BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, full_name) VALUES (new.id, new.full_name); END"
+            )
+        )
+        rows = "SELECT id, full_name FROM clients WHERE salon_id = :id"
+        params = {"id": salon_id}
+        stale = f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM ({rows}))"
+        conn.execute(text(stale), params)
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, full_name) {rows}"), params)
+    assert _found(salon_id, "0011") == []
+
+    with engine.begin() as conn:
+        ensure_client_search_index(conn)
+    assert _found(salon_id, "0011") == ["Галина"]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import event
+
+from app.db.session import SessionLocal, engine
+from app.models import Client, ClientAnalytics
+
+
+def _seed_clients(count: int) -> None:
+    now_ts = int(time.time())
+    with SessionLocal() as db:
+        clients = [
+            Client(salon_id=1, full_name=f"Клиент {idx}", phone=f"+7916{idx:07d}")
+            for idx in range(count)
+        ]
+        db.add_all(clients)
+        db.flush()
+        db.add_all(
+            ClientAnalytics(
+                salon_id=1, client_id=row.id, created_at=now_ts, gender="female", birth_year=1990
+            )
+            for row in clients[::2]
+        )
+        db.commit()
+
+
+def _count_statements(client, headers, page_size: int) -> int:
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        response = client.get(
+            "/api/v1/admin/clients", params={"page_size": page_size}, headers=headers
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == page_size
+    return len(statements)
+
+
+def test_client_list_statement_count_does_not_grow_with_page_size(client, owner_headers) -> None:
+    _seed_clients(200)
+    small_page = _count_statements(client, owner_headers, 20)
+    assert small_page == _count_statements(client, owner_headers, 200)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from app.db.session import SessionLocal
+from app.models import Client
+
+
+def test_first_purchase_is_kept_on_the_client(client, owner_headers) -> None:
+    with SessionLocal() as db:
+        buyer = Client(salon_id=1, full_name="Первая покупка")
+        db.add(buyer)
+        db.commit()
+        buyer_id = buyer.id
+
+    def create(op_type: str) -> int:
+        response = client.post(
+            "/api/v1/admin/operations",
+            json={"client_id": buyer_id, "op_type": op_type, "amount_rub": 300},
+            headers=owner_headers,
+        )
+        assert response.status_code == 200
+        return response.json()["created_at"]
+
+    create("order")
+    first_ts = create("purchase")
+    create("purchase")
+    with SessionLocal() as db:
+        assert db.get(Client, buyer_id).first_purchase_at == first_ts
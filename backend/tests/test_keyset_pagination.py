@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from app.db.session import SessionLocal
+from app.models import Client, Operation
+
+_TS = 1_500_000_000
+
+
+def test_cursor_pages_split_rows_with_equal_created_at(client, owner_headers) -> None:
+    with SessionLocal() as db:
+        buyer = Client(salon_id=1, full_name="Клиент курсора")
+        db.add(buyer)
+        db.flush()
+        # seven operations share one second, with a neighbour on either side
+        for created_at in (_TS - 1, *[_TS] * 7, _TS + 1):
+            db.add(
+                Operation(
+                    salon_id=1, client_id=buyer.id, op_type="purchase", amount_rub=100, created_at=created_at
+                )
+            )
+        db.commit()
+
+    window = {"date_from": _TS - 1, "date_to": _TS + 1, "page_size": 3, "with_total": False}
+    first = client.get("/api/v1/admin/operations", params=window, headers=owner_headers).json()
+    seen = [(item["created_at"], item["id"]) for item in first["items"]]
+    cursor = first["next_cursor"]
+    pages = 1
+    while cursor:
+        page = client.get(
+            "/api/v1/admin/operations", params={**window, "cursor": cursor}, headers=owner_headers
+        ).json()
+        seen += [(item["created_at"], item["id"]) for item in page["items"]]
+        cursor = page["next_cursor"]
+        pages += 1
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 9
+    assert seen == sorted(seen, reverse=True)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import threading
+
+from sqlalchemy import text
+
+from app.db import session as db_session
+from app.db.session import SessionLocal, run_parallel_reads
+
+
+def _thread_name(session) -> str:  # type: ignore[no-untyped-def]
+    session.execute(text("SELECT 1"))
+    return threading.current_thread().name
+
+
+def test_read_only_session_fans_out_before_its_first_read(monkeypatch) -> None:
+    monkeypatch.setattr(db_session.os, "cpu_count", lambda: 4)
+    reads = {"first": _thread_name, "second": _thread_name}
+    with SessionLocal(info={"read_only": True}) as db:
+        names = run_parallel_reads(db, reads)
+        assert all(name.startswith("db-fanout") for name in names.values())
+        # once the session has pinned its snapshot the reads stay on it
+        db.execute(text("SELECT 1"))
+        names = run_parallel_reads(db, reads)
+        assert set(names.values()) == {threading.current_thread().name}
+        db.rollback()
+
+
+def test_dated_control_tower_is_served(client, owner_headers, monkeypatch) -> None:
+    monkeypatch.setattr(db_session.os, "cpu_count", lambda: 4)
+    response = client.get(
+        "/api/v1/admin/analytics/control-tower",
+        params={"date_from": 1_700_000_000, "date_to": 1_700_086_400},
+        headers=owner_headers,
+    )
+    assert response.status_code == 200
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from app.services.promotion_forecast_service import (
+    PromotionInputs,
+    PromotionScenario,
+    simulate_promotion_grid,
+)
+
+
+def test_simulation_caps_the_reward_cost_at_the_budget() -> None:
+    inputs = PromotionInputs(
+        check_mean_rub=1500,
+        check_sd_rub=600,
+        conversion_cv=0.25,
+        purchases_observed=0,
+        fitted=False,
+    )
+    scenarios = [
+        PromotionScenario(budget_rub=budget, generations=3, reward_percents=(10.0, 5.0, 2.0))
+        for budget in (None, 1000.0)
+    ]
+    unlimited, capped = simulate_promotion_grid(
+        inputs,
+        scenarios,
+        initial_clients=200,
+        conversion_rate=0.2,
+        margin=0.4,
+        reward_unit="money",
+        draws=500,
+        seed=1,
+    )
+    assert capped.new_clients_p50 < unlimited.new_clients_p50
+    assert capped.break_even_p90 <= 1000 / (1500 * 0.4) * 2
+    assert 0 <= capped.profit_probability <= 1
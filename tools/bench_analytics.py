@@ -0,0 +1,175 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+parser = argparse.ArgumentParser(description="Benchmark analytics endpoints on a synthetic SQLite database")
+parser.add_argument("--endpoint", choices=["customers", "marketing", "batch", "control-tower", "dashboard"], default="customers")
+parser.add_argument("--sizes", default="10000,100000,1000000", help="comma separated operation row counts")
+parser.add_argument("--repeat", type=int, default=3)
+args = parser.parse_args()
+
+work_dir = Path(tempfile.mkdtemp()) / "data"
+work_dir.mkdir()
+os.environ["DATABASE_URL"] = f"sqlite:///{work_dir / 'bench.db'}"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from sqlalchemy import event, text  # noqa: E402
+
+from app.api.deps import AuthCtx  # noqa: E402
+from app.api.v1.admin import analytics, dashboard  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.schemas.analytics import AnalyticsBatchRequest, AnalyticsBatchTab  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import ControlTowerPolicy, ControlTowerProfile  # noqa: E402
+from app.services.analytics_cache_service import analytics_cache  # noqa: E402
+from app.services.operation_rollups_service import rebuild_operation_rollups  # noqa: E402
+
+DAY = 86400
+query_count = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+    global query_count
+    query_count += 1
+
+
+def seed(operations_total: int) -> None:
+    rnd = random.Random(operations_total)
+    now = int(time.time())
+    clients_total = max(operations_total // 10, 1)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO salons (id, name, timezone, locale, status, moderation_status) "
+                          "VALUES (1, 'bench', 'Europe/Moscow', 'ru', 'active', 'approved')"))
+        raw = conn.connection.driver_connection
+        raw.executemany(
+            "INSERT INTO traffic_channels (id, salon_id, name, channel_type, promo_code, created_at) "
+            "VALUES (?, 1, ?, 'web', '', ?)",
+            ((i, f"Channel {i}", now) for i in range(1, 6)),
+        )
+        raw.executemany(
+            "INSERT INTO clients (id, salon_id, tg_id, username, full_name, phone, whatsapp_phone, email, "
+            "telegram_username, vk_username, instagram_username, facebook_username, max_username, address, "
+            "birthday, consent_personal_data, consent_marketing, consent_sms, consent_app_push, consent_email, "
+            "status, notes, tags_csv, acquisition_channel_id, visits_count, total_spent_rub, last_visit_at) "
+            "VALUES (?, 1, ?, '', ?, ?, '', '', '', '', '', '', '', '', '', 1, ?, 0, 0, 0, 'active', '', '', ?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    i if i % 3 else None,
+                    f"Client {i}",
+                    f"+7900{i:07d}",
+                    i % 2,
+                    rnd.choice([1, 2, 3, 4, 5, None]),
+                    rnd.randint(0, 8),
+                    rnd.randint(0, 50_000),
+                    now - rnd.randint(0, 365 * DAY),
+                )
+                for i in range(1, clients_total + 1)
+            ),
+        )
+        raw.executemany(
+            "INSERT INTO client_analytics (salon_id, client_id, created_at, gender, birth_year) VALUES (1, ?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    now - rnd.randint(0, 365 * DAY),
+                    rnd.choice(["male", "female", "unknown"]),
+                    rnd.choice([None, 1960, 1975, 1988, 1995, 2003]),
+                )
+                for i in range(1, clients_total + 1)
+            ),
+        )
+        raw.executemany(
+            "INSERT INTO operations (salon_id, client_id, op_type, amount_rub, discount_rub, "
+            "referral_discount_rub, comment, created_at) VALUES (1, ?, ?, ?, ?, ?, '', ?)",
+            (
+                (
+                    rnd.randint(1, clients_total),
+                    rnd.choice(["purchase", "purchase", "order", "refund"]),
+                    rnd.randint(100, 10_000),
+                    rnd.randint(0, 500),
+                    rnd.randint(0, 200),
+                    now - rnd.randint(0, 365 * DAY),
+                )
+                for _ in range(operations_total)
+            ),
+        )
+        raw.executemany(
+            "INSERT INTO communication_campaigns (id, salon_id, title, purpose, audience_type, status, "
+            "schedule_type, created_at) VALUES (?, 1, ?, 'marketing', 'consented_marketing', 'sent', 'manual', ?)",
+            ((i, f"Campaign {i}", now - rnd.randint(0, 60 * DAY)) for i in range(1, 11)),
+        )
+        raw.executemany(
+            "INSERT INTO communication_recipients (campaign_id, client_id, status, sent_at, opened_at, clicked_at, "
+            "converted_at, delivery_channel) VALUES (?, ?, 'sent', ?, ?, ?, ?, 'app')",
+            (
+                (
+                    campaign_id,
+                    client_id,
+                    now,
+                    now if rnd.random() < 0.4 else None,
+                    now if rnd.random() < 0.1 else None,
+                    now if rnd.random() < 0.03 else None,
+                )
+                for campaign_id in range(1, 11)
+                for client_id in range(campaign_id, clients_total + 1, 2)
+            ),
+        )
+    with SessionLocal() as db:
+        rebuild_operation_rollups(db, salon_id=1)
+        db.add(ControlTowerProfile(salon_id=1, vertical="salon", goal_90d="", dashboard_focus=""))
+        db.add(ControlTowerPolicy(salon_id=1))
+        db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def run_endpoint(db, ctx: AuthCtx) -> None:  # type: ignore[no-untyped-def]
+    analytics_cache.clear()
+    now = int(time.time())
+    if args.endpoint == "customers":
+        analytics.customers_analytics(created_from=now - 90 * DAY, created_to=now, ctx=ctx, db=db)
+    elif args.endpoint == "marketing":
+        analytics.marketing_analytics(date_from=now - 90 * DAY, date_to=now, ctx=ctx, db=db)
+    elif args.endpoint == "batch":
+        tabs = [
+            AnalyticsBatchTab(tab=tab, date_from=now - 90 * DAY, date_to=now)
+            for tab in ["customers", "operations", "finance", "levels", "ratings", "marketing"]
+        ]
+        analytics.analytics_batch(req=AnalyticsBatchRequest(tabs=tabs), ctx=ctx, db=db)
+    elif args.endpoint == "control-tower":
+        analytics.control_tower_analytics(date_from=now - 90 * DAY, date_to=now, refresh=False, ctx=ctx, db=db)
+    elif args.endpoint == "dashboard":
+        dashboard.get_full_dashboard(ctx=ctx, db=db)
+
+
+ctx = AuthCtx(user_id=1, salon_id=1, role="owner", tg_id=1)
+print(f"endpoint={args.endpoint}")
+print(f"{'rows':>10} {'queries':>8} {'best_ms':>10} {'avg_ms':>10} {'peak_kb':>10}")
+for size in [int(x) for x in args.sizes.split(",") if x.strip()]:
+    seed(size)
+    timings: list[float] = []
+    queries = 0
+    for _ in range(args.repeat):
+        with SessionLocal() as db:
+            query_count = 0
+            started = time.perf_counter()
+            run_endpoint(db, ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries = query_count
+    with SessionLocal() as db:
+        tracemalloc.start()
+        run_endpoint(db, ctx)
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    print(
+        f"{size:>10} {queries:>8} {min(timings):>10.1f} {sum(timings) / len(timings):>10.1f} {peak_kb:>10.0f}"
+    )
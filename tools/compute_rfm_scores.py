@@ -0,0 +1,30 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from sqlalchemy import select  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import Salon  # noqa: E402
+from app.services.rfm_service import recompute_client_scores  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Recompute RFM scores of all clients into client_scores (run nightly)")
+parser.add_argument("--salon-id", type=int, default=None, help="score only this salon")
+args = parser.parse_args()
+
+Base.metadata.create_all(bind=engine)
+
+with SessionLocal() as db:
+    if args.salon_id is not None:
+        salon_ids = [args.salon_id]
+    else:
+        salon_ids = list(db.execute(select(Salon.id).order_by(Salon.id.asc())).scalars().all())
+    for salon_id in salon_ids:
+        started = time.perf_counter()
+        scored = recompute_client_scores(db, salon_id=salon_id)
+        db.commit()
+        print(f"salon {salon_id}: {scored} clients scored in {(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,21 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.services.analytics_mirror_service import MIRROR_TABLES, export_mirror  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Export event tables to the Parquet mirror of columnar analytics")
+parser.add_argument(
+    "--tables", nargs="*", choices=sorted(MIRROR_TABLES), default=None, help="export only these tables"
+)
+args = parser.parse_args()
+
+Base.metadata.create_all(bind=engine)
+
+with SessionLocal() as db:
+    for table, rows in export_mirror(db, args.tables).items():
+        print(f"{table}: {rows} rows exported")
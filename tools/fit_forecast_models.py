@@ -0,0 +1,37 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from sqlalchemy import select  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import Salon  # noqa: E402
+from app.services.forecast_service import fit_salon_forecasts  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Fit per-salon forecast models for the marketing forecast (run nightly)")
+parser.add_argument("--salon-id", type=int, default=None, help="fit only this salon")
+args = parser.parse_args()
+
+Base.metadata.create_all(bind=engine)
+
+with SessionLocal() as db:
+    if args.salon_id is not None:
+        salon_ids = [args.salon_id]
+    else:
+        salon_ids = list(db.execute(select(Salon.id).order_by(Salon.id.asc())).scalars().all())
+    for salon_id in salon_ids:
+        started = time.perf_counter()
+        rows = fit_salon_forecasts(db, salon_id=salon_id)
+        db.commit()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for row in rows:
+            smape = "-" if row.backtest_smape_percent is None else f"{row.backtest_smape_percent}%"
+            print(
+                f"salon {salon_id} {row.metric}: {row.method}, {row.observations} days, "
+                f"backtest {row.backtest_days}d sMAPE {smape}"
+            )
+        print(f"salon {salon_id}: fitted in {elapsed_ms:.0f} ms")
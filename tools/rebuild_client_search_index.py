@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.services.client_search_service import ensure_client_search_index, rebuild_client_search_index  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+with engine.begin() as conn:
+    if not ensure_client_search_index(conn):
+        sys.exit("sqlite is built without FTS5, nothing to rebuild")
+    print(f"{rebuild_client_search_index(conn)} clients indexed")
@@ -0,0 +1,28 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from sqlalchemy import select  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import Salon  # noqa: E402
+from app.services.operation_rollups_service import rebuild_operation_rollups  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Rebuild daily operation rollups from the operations table")
+parser.add_argument("--salon-id", type=int, default=None, help="rebuild only this salon")
+args = parser.parse_args()
+
+Base.metadata.create_all(bind=engine)
+
+with SessionLocal() as db:
+    if args.salon_id is not None:
+        salon_ids = [args.salon_id]
+    else:
+        salon_ids = list(db.execute(select(Salon.id).order_by(Salon.id.asc())).scalars().all())
+    for salon_id in salon_ids:
+        created = rebuild_operation_rollups(db, salon_id=salon_id)
+        db.commit()
+        print(f"salon {salon_id}: {created} rollup rows")